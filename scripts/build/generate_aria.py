@@ -20,9 +20,7 @@ GENERATED_LOCATION = path.join(ROOT_DIRECTORY, 'front_end', 'generated', 'ARIAPr
 READ_LOCATION = path.join(ROOT_DIRECTORY, 'third_party', 'blink', 'renderer', 'core', 'html', 'aria_properties.json5')
 
 def properties_from_file(file_name):
-    with open(os.path.abspath(file_name)) as json5_file:
-        properties = json5.loads(json5_file.read())
-        return properties
+    return json5.load_cached(os.path.abspath(file_name))
 
 
 ARIA_PROPERTIES = properties_from_file(READ_LOCATION)
@@ -33,8 +33,7 @@ EXEMPTED_FROM_DEVTOOLS_GENERATION = {
 
 
 def deprecations_from_file(file_name):
-    with open(file_name) as json5_file:
-        doc = json5.loads(json5_file.read())
+    doc = json5.load_cached(file_name)
 
     # We turn the list of deprecations into two maps, both keyed by the deprecation name.
     # One contains the message + translation note.
@@ -54,8 +54,7 @@ def _keep_only_required_keys(entry):
 
 
 def properties_from_file(file_name):
-    with open(file_name) as json5_file:
-        doc = json5.loads(json5_file.read())
+    doc = json5.load_cached(file_name)
 
     properties = []
     property_names = {}
@@ -0,0 +1,96 @@
+// Copyright 2026 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+const {assert} = require('chai');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const {Compiler, RETAINED_PROGRAMS, RETAINED_TYPECHECK_PROGRAMS} = require('../typescript/tsc_server.js');
+
+describe('tsc server', () => {
+  let directory;
+
+  beforeEach(() => {
+    directory = fs.mkdtempSync(path.join(os.tmpdir(), 'tsc-server-test-'));
+  });
+
+  afterEach(() => {
+    fs.rmSync(directory, {recursive: true, force: true});
+  });
+
+  it('reads a declaration file again when its timestamp was reset', () => {
+    const fileName = path.join(directory, 'module.d.ts');
+    fs.writeFileSync(fileName, 'export declare const a: number;\n');
+    const {mtime} = fs.statSync(fileName);
+    const compiler = new Compiler();
+    const options = {};
+
+    const before = compiler.acquireSourceFile(fileName, options, /* languageVersion */ 99);
+    assert.include(before.text, 'const a');
+
+    // Same size, and the timestamp is reset like `ts_library.py` does it.
+    fs.writeFileSync(fileName, 'export declare const b: number;\n');
+    fs.utimesSync(fileName, mtime, mtime);
+
+    const after = compiler.acquireSourceFile(fileName, options, /* languageVersion */ 99);
+    assert.include(after.text, 'const b');
+  });
+
+  it('keeps the document of an unchanged file', () => {
+    const fileName = path.join(directory, 'module.d.ts');
+    fs.writeFileSync(fileName, 'export declare const a: number;\n');
+    const compiler = new Compiler();
+    const options = {};
+
+    const before = compiler.acquireSourceFile(fileName, options, /* languageVersion */ 99);
+    const after = compiler.acquireSourceFile(fileName, options, /* languageVersion */ 99);
+    assert.strictEqual(after, before);
+  });
+
+  it('only keeps the programs of the last few targets', () => {
+    const compiler = new Compiler();
+    const {documentRegistry} = compiler;
+    const releaseDocument = documentRegistry.releaseDocument.bind(documentRegistry);
+    const released = [];
+    documentRegistry.releaseDocument = (fileName, ...args) => {
+      released.push(path.basename(fileName));
+      releaseDocument(fileName, ...args);
+    };
+
+    const targets = 10;
+    for (let i = 0; i < targets; i++) {
+      fs.writeFileSync(path.join(directory, `module${i}.ts`), `export const a${i} = ${i};\n`);
+      const tsconfig = path.join(directory, `module${i}-tsconfig.json`);
+      fs.writeFileSync(tsconfig, JSON.stringify({
+        compilerOptions: {types: [], outDir: '.', declaration: true},
+        files: [`module${i}.ts`],
+      }));
+      assert.deepEqual(compiler.compile(directory, tsconfig, false), {returncode: 0, output: ''});
+      assert.isAtMost(compiler.programs.size, RETAINED_PROGRAMS);
+    }
+
+    // The sources of the dropped programs were released from the registry.
+    const dropped = [];
+    for (let i = 0; i < targets - RETAINED_PROGRAMS; i++) {
+      dropped.push(`module${i}.ts`);
+    }
+    assert.deepEqual(released.filter(fileName => fileName.startsWith('module')), dropped);
+  });
+
+  it('keeps type check programs apart, and only the last few', () => {
+    const compiler = new Compiler();
+    for (let i = 0; i < 10; i++) {
+      fs.writeFileSync(path.join(directory, `module${i}.ts`), `export const a${i} = ${i};\n`);
+      const tsconfig = path.join(directory, `module${i}-tsconfig.json`);
+      fs.writeFileSync(tsconfig, JSON.stringify({
+        compilerOptions: {types: [], outDir: '.', declaration: true},
+        files: [`module${i}.ts`],
+      }));
+      assert.deepEqual(compiler.typecheck(directory, tsconfig), {returncode: 0, output: ''});
+      assert.isAtMost(compiler.typecheckPrograms.size, RETAINED_TYPECHECK_PROGRAMS);
+    }
+    assert.strictEqual(compiler.programs.size, 0);
+  });
+});
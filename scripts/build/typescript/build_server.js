@@ -0,0 +1,189 @@
+// Copyright 2026 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+// @ts-check
+
+// The parts shared by the long-lived build servers that `ts_library.py` talks
+// to (`tsc_server.js` and `esbuild_server.js`).
+//
+// A server listens on a Unix socket. A client sends a single line of JSON and
+// receives a single line of JSON back: the result of the request, or
+// `{"error": ...}` if the server itself failed, in which case the client does
+// the work itself. The server exits after it has been idle for
+// `--idle-timeout` seconds.
+
+const fs = require('fs');
+const net = require('net');
+
+const DEFAULT_IDLE_TIMEOUT_SECONDS = 15 * 60;
+
+/**
+ * Parses `--socket <path>` and `--idle-timeout <seconds>`, as well as the
+ * numeric options in `extraOptions`, which map flags to their defaults.
+ *
+ * @param {string[]} argv
+ * @param {Object<string, number>} extraOptions
+ * @return {{socket: string, idleTimeout: number, extra: Object<string, number>}}
+ */
+function parseArguments(argv, extraOptions = {}) {
+  const options = {
+    socket: '',
+    idleTimeout: DEFAULT_IDLE_TIMEOUT_SECONDS,
+    extra: {...extraOptions},
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const flag = argv[i];
+    if (flag === '--socket') {
+      options.socket = argv[++i];
+    } else if (flag === '--idle-timeout') {
+      options.idleTimeout = parseInt(argv[++i], 10);
+    } else if (flag.startsWith('--') && flag.substring(2) in extraOptions) {
+      options.extra[flag.substring(2)] = parseInt(argv[++i], 10);
+    } else {
+      throw new Error(`Unknown argument: ${flag}`);
+    }
+  }
+  if (!options.socket) {
+    throw new Error('Missing --socket');
+  }
+  return options;
+}
+
+/**
+ * @param {string} socketPath
+ * @return {Promise<boolean>} whether another server is listening on it
+ */
+function isServerListening(socketPath) {
+  return new Promise(resolve => {
+    const socket = net.connect(socketPath);
+    socket.on('connect', () => {
+      socket.destroy();
+      resolve(true);
+    });
+    socket.on('error', () => resolve(false));
+  });
+}
+
+/**
+ * @param {string} socketPath
+ * @return {boolean} whether the socket at `socketPath` belongs to the current user
+ */
+function isOwnSocket(socketPath) {
+  try {
+    const stats = fs.lstatSync(socketPath);
+    return stats.isSocket() && stats.uid === process.getuid?.();
+  } catch (e) {
+    return false;
+  }
+}
+
+/**
+ * Serves requests on `options.socket` until the server has been idle for
+ * `options.idleTimeout` seconds.
+ *
+ * `createHandler` is only called once the socket is ours, so that a server
+ * that loses the race to start up exits before doing any expensive setup.
+ * The handler it returns is called with each request and returns a promise
+ * of its result.
+ *
+ * @param {{socket: string, idleTimeout: number}} options
+ * @param {() => (request: Object) => Promise<Object>} createHandler
+ */
+function serve(options, createHandler) {
+  /** @type {((request: Object) => Promise<Object>)|undefined} */
+  let handler;
+  let pending = 0;
+
+  /** @type {NodeJS.Timeout|undefined} */
+  let idleTimer;
+  function resetIdleTimer() {
+    clearTimeout(idleTimer);
+    idleTimer = setTimeout(() => {
+      if (pending) {
+        resetIdleTimer();
+        return;
+      }
+      shutdown();
+    }, options.idleTimeout * 1000);
+  }
+
+  /**
+   * @param {Object} request
+   * @return {Promise<Object>}
+   */
+  async function handle(request) {
+    if (!handler) {
+      return {error: 'server is not ready'};
+    }
+    pending++;
+    try {
+      return await handler(request);
+    } catch (e) {
+      return {error: String(e && e.stack || e)};
+    } finally {
+      pending--;
+      resetIdleTimer();
+    }
+  }
+
+  const server = net.createServer(connection => {
+    resetIdleTimer();
+    let buffer = '';
+    connection.setEncoding('utf8');
+    connection.on('data', chunk => {
+      const newline = chunk.indexOf('\n');
+      if (newline === -1) {
+        buffer += chunk;
+        return;
+      }
+      const line = buffer + chunk.substring(0, newline);
+      connection.removeAllListeners('data');
+      let request;
+      try {
+        request = JSON.parse(line);
+      } catch (e) {
+        connection.end(JSON.stringify({error: `invalid request: ${e.message}`}) + '\n');
+        return;
+      }
+      handle(request).then(result => connection.end(JSON.stringify(result) + '\n'));
+    });
+    // The client going away must not take the server down with it.
+    connection.on('error', () => {});
+  });
+
+  function shutdown() {
+    server.close();
+    if (isOwnSocket(options.socket)) {
+      fs.rmSync(options.socket, {force: true});
+    }
+    process.exit(0);
+  }
+
+  server.on('listening', () => {
+    // Clients only talk to a socket that no one else can access.
+    fs.chmodSync(options.socket, 0o600);
+    handler = createHandler();
+    resetIdleTimer();
+  });
+  server.on('error', async (/** @type {NodeJS.ErrnoException} */ error) => {
+    if (error.code !== 'EADDRINUSE') {
+      throw error;
+    }
+    // Either another server got there first, in which case that one is used,
+    // or a previous server died without removing its socket.
+    // Whatever is left is only removed if it is ours.
+    if (await isServerListening(options.socket) || !isOwnSocket(options.socket)) {
+      process.exit(0);
+    }
+    fs.rmSync(options.socket, {force: true});
+    server.listen(options.socket);
+  });
+  server.listen(options.socket);
+
+  for (const signal of ['SIGINT', 'SIGTERM', 'SIGHUP']) {
+    process.on(signal, shutdown);
+  }
+}
+
+module.exports = {parseArguments, serve};
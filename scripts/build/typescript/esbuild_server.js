@@ -0,0 +1,88 @@
+// Copyright 2026 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+// @ts-check
+
+// A long-lived esbuild server for `ts_library.py --use-esbuild`.
+//
+// Run like the following (`ts_library.py --use-esbuild-server` starts it on demand):
+// $ node scripts/build/typescript/esbuild_server.js --socket /tmp/devtools-esbuild-1234.sock
+//
+// A request is `{"cwd": ..., "tsconfig": ..., "outdir": ..., "sources": [...],
+// "format": ...}`, and its result is `{"returncode": ..., "output": ...}`,
+// equivalent to the exit code and output of the `esbuild` command line that
+// `runEsbuild` in `ts_library.py` runs. See `build_server.js` for the protocol.
+//
+// The esbuild module starts a single esbuild process in service mode and talks
+// to it over its stdin and stdout, so all targets are transpiled by the same
+// process, concurrently.
+//
+// `node esbuild_server.js --stdin` instead transpiles the single request it
+// reads from stdin, prints its output and exits with its return code. The
+// esbuild command line has no response files, so `ts_library.py` uses this
+// for targets whose sources don't fit on a command line.
+
+const os = require('os');
+const path = require('path');
+
+const devtools_paths = require('../../devtools_paths.js');
+
+const {parseArguments, serve} = require('./build_server.js');
+
+// esbuild module uses binary in this path.
+const binaryName = os.type() === 'Windows_NT' ? 'esbuild.exe' : 'esbuild';
+process.env.ESBUILD_BINARY_PATH = path.join(devtools_paths.devtoolsRootPath(), 'third_party', 'esbuild', binaryName);
+
+const esbuild = require('esbuild');
+
+/**
+ * @param {{cwd: string, tsconfig: string, outdir: string, sources: string[], format?: 'cjs'}} request
+ * @return {Promise<{returncode: number, output: string}>}
+ */
+async function transpile(request) {
+  /** @type {esbuild.Message[]} */
+  let errors = [];
+  /** @type {esbuild.Message[]} */
+  let warnings = [];
+  try {
+    ({warnings} = await esbuild.build({
+      absWorkingDir: request.cwd,
+      entryPoints: request.sources,
+      tsconfig: request.tsconfig,
+      outdir: request.outdir,
+      format: request.format,
+      sourcemap: true,
+      // Messages are sent back to the client, rather than being logged here.
+      logLevel: 'silent',
+    }));
+  } catch (e) {
+    if (!e.errors) {
+      throw e;
+    }
+    ({errors, warnings} = e);
+  }
+  const output = [
+    ...await esbuild.formatMessages(errors, {kind: 'error'}),
+    ...await esbuild.formatMessages(warnings, {kind: 'warning'}),
+  ];
+  return {returncode: errors.length ? 1 : 0, output: output.join('')};
+}
+
+async function transpileFromStdin() {
+  let input = '';
+  process.stdin.setEncoding('utf8');
+  for await (const chunk of process.stdin) {
+    input += chunk;
+  }
+  const {returncode, output} = await transpile(JSON.parse(input));
+  process.stderr.write(output);
+  process.exitCode = returncode;
+  await esbuild.stop();
+}
+
+if (process.argv[2] === '--stdin') {
+  void transpileFromStdin();
+} else {
+  serve(parseArguments(process.argv.slice(2)), () => transpile);
+}
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""
+Measure how many rebuilds the API fingerprints of declaration files save.
+
+A `ts_library` target with `reset_timestamps` keeps the timestamp of a `.d.ts`
+output whose contents changed only in comments or whitespace, so that Ninja
+doesn't rebuild the targets that depend on it. This script replays the commits
+in a git range: it checks out and builds each of them in turn, with
+`TSC_TELEMETRY=1`, and then reports how often that happened and how many
+direct dependents were not rebuilt as a result, e.g.:
+
+    scripts/build/typescript/measure_declaration_fingerprints.py -C out/Default origin/main~20..origin/main
+
+The commit before the range is built first. Every commit is built with the
+`scripts/build/typescript` of the revision that is checked out when the script
+starts, so that ranges from before fingerprints were introduced can be
+measured too. The working tree must be clean, and the revision that was checked
+out is restored afterwards.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import subprocess
+import sys
+import time
+
+from os import path
+
+import summarize_ts_library_telemetry
+import ts_library
+
+
+def git(*args):
+    return subprocess.check_output(['git'] + list(args),
+                                   cwd=ts_library.ROOT_DIRECTORY_OF_REPOSITORY,
+                                   universal_newlines=True).strip()
+
+
+def build(build_directory, targets):
+    env = dict(os.environ, TSC_TELEMETRY='1')
+    ninja = 'autoninja.bat' if sys.platform == 'win32' else 'autoninja'
+    # Failing commits are still measured; their failures show in the output.
+    subprocess.run([ninja, '-C', build_directory] + targets,
+                   cwd=ts_library.ROOT_DIRECTORY_OF_REPOSITORY,
+                   env=env)
+
+
+# Builds every commit, and returns the times at which their builds started.
+def replay(build_directory, commits, targets):
+    try:
+        original = git('symbolic-ref', '-q', '--short', 'HEAD')
+    except subprocess.CalledProcessError:
+        original = git('rev-parse', 'HEAD')
+    scripts = path.relpath(path.dirname(path.abspath(__file__)),
+                           ts_library.ROOT_DIRECTORY_OF_REPOSITORY)
+    started = []
+    try:
+        for i, commit in enumerate(commits):
+            print('[%d/%d] Building %s' %
+                  (i + 1, len(commits),
+                   git('log', '-1', '--format=%h %s', commit)))
+            # The scripts restored from the original revision are the only local changes.
+            git('checkout', '-q', '-f', '--detach', commit)
+            git('checkout', '-q', original, '--', scripts)
+            started.append(time.time())
+            build(build_directory, targets)
+    finally:
+        git('checkout', '-q', '-f', original)
+    return started
+
+
+# Maps each generated tsconfig to the tsconfigs of the targets that reference it, with paths that
+# are relative to the build directory, like the targets in the telemetry.
+def find_dependents(build_directory):
+    dependents = {}
+    for directory, _, files in os.walk(path.join(build_directory, 'gen')):
+        for f in files:
+            if not f.endswith('-tsconfig.json'):
+                continue
+            tsconfig_location = path.join(directory, f)
+            try:
+                with open(tsconfig_location, encoding="utf8") as fp:
+                    tsconfig = json.load(fp)
+            except ValueError:
+                continue
+            target = path.relpath(tsconfig_location, build_directory)
+            for reference in tsconfig.get('references', []):
+                dependency = path.normpath(
+                    path.join(path.dirname(target), reference['path']))
+                dependents.setdefault(dependency, []).append(target)
+    return dependents
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-C',
+                        '--build_directory',
+                        required=True,
+                        help='Ninja build directory, e.g. out/Default')
+    parser.add_argument('range', help='Range of commits, e.g. A..B')
+    parser.add_argument('targets',
+                        nargs='*',
+                        help='Ninja targets to build (default: all)')
+    opts = parser.parse_args()
+    build_directory = path.abspath(opts.build_directory)
+
+    if git('status', '--porcelain', '--untracked-files=no'):
+        print('The working tree has uncommitted changes.')
+        return 1
+    commits = git('rev-list', '--reverse', opts.range).split()
+    if not commits:
+        print('There are no commits in %s' % opts.range)
+        return 1
+
+    # The first build only brings the build directory up to date.
+    started = replay(build_directory, [commits[0] + '^'] + commits,
+                     opts.targets)[1:]
+
+    records = [
+        r for r in summarize_ts_library_telemetry.load_records(
+            path.join(build_directory, ts_library.TELEMETRY_LOG_NAME))
+        if r['time'] >= started[0] and 'invalidates_dependents' in r
+    ]
+    dependents = find_dependents(build_directory)
+
+    per_commit = [[0, 0] for _ in commits]
+    invalidating = 0
+    rebuilt_dependents = 0
+    same_api = 0
+    avoided_dependents = 0
+    for record in records:
+        count = len(dependents.get(record['target'], []))
+        if record['invalidates_dependents']:
+            invalidating += 1
+            rebuilt_dependents += count
+        elif record.get('same_api_declarations'):
+            same_api += 1
+            avoided_dependents += count
+            commit = bisect.bisect_right(started, record['time']) - 1
+            per_commit[commit][0] += 1
+            per_commit[commit][1] += count
+
+    print('')
+    print(
+        'Replayed %d commits; %d targets with reset_timestamps were rebuilt.' %
+        (len(commits), len(records)))
+    print('  %d changed their API, which rebuilt %d direct dependents.' %
+          (invalidating, rebuilt_dependents))
+    print('  %d changed only comments in their declaration files, which '
+          'avoided rebuilding %d direct dependents.' %
+          (same_api, avoided_dependents))
+    print('')
+    print('%8s %9s  %s' % ('targets', 'avoided', 'commit'))
+    for commit, (targets, avoided) in zip(commits, per_commit):
+        print('%8d %9d  %s' %
+              (targets, avoided, git('log', '-1', '--format=%h %s', commit)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
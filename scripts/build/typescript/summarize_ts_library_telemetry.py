@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""
+Summarize the telemetry that `ts_library` actions record with `TSC_TELEMETRY=1`.
+
+Build with the variable set, e.g.:
+
+    TSC_TELEMETRY=1 autoninja -C out/Default
+    scripts/build/typescript/summarize_ts_library_telemetry.py -C out/Default
+
+This lists the targets that take longest to compile, and the targets that most
+often invalidate their dependents, i.e. rebuilds in which a `.d.ts` output
+changed, so that Ninja had to rebuild the targets depending on them. The
+latter is only known for targets that use `reset_timestamps`.
+"""
+
+import argparse
+import json
+import sys
+
+from os import path
+
+import ts_library
+
+
+def load_records(log_location):
+    records = []
+    with open(log_location, encoding="utf8") as fp:
+        for line in fp:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A record that was cut short by an interrupted build.
+                continue
+    return records
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def summarize_targets(records):
+    targets = {}
+    for record in records:
+        targets.setdefault(record['target'], []).append(record)
+
+    summaries = []
+    for target, target_records in targets.items():
+        latest = max(target_records, key=lambda r: r['time'])
+        with_reset = [
+            r for r in target_records if 'invalidates_dependents' in r
+        ]
+        invalidations = sum(1 for r in with_reset
+                            if r['invalidates_dependents'])
+        compile_times = [r['compile_ms'] for r in target_records]
+        tsconfig_times = [r['tsconfig_ms'] for r in target_records]
+        statistics = latest.get('tsc', {})
+        summaries.append({
+            'target': target,
+            'builds': len(target_records),
+            'compiler': latest.get('compiler'),
+            'median_compile_ms': median(compile_times),
+            'total_compile_ms': sum(compile_times),
+            'median_tsconfig_ms': median(tsconfig_times),
+            'files': statistics.get('files'),
+            'check_time_s': statistics.get('check_time_s'),
+            'output_bytes': latest.get('output_bytes'),
+            'tracked_builds': len(with_reset),
+            'invalidations': invalidations,
+        })
+    return summaries
+
+
+def format_optional(value, fmt):
+    return '-' if value is None else fmt % value
+
+
+def print_slowest(summaries, count):
+    print('Slowest targets, by median compile time:')
+    print('%10s %10s %6s %7s %8s %10s  %s' %
+          ('median ms', 'total ms', 'builds', 'files', 'check s', 'out KiB',
+           'target'))
+    for s in sorted(summaries, key=lambda s: -s['median_compile_ms'])[:count]:
+        print('%10.0f %10.0f %6d %7s %8s %10s  %s (%s)' %
+              (s['median_compile_ms'], s['total_compile_ms'], s['builds'],
+               format_optional(s['files'], '%d'),
+               format_optional(s['check_time_s'], '%.2f'),
+               format_optional(s['output_bytes'] and s['output_bytes'] / 1024,
+                               '%.1f'), s['target'], s['compiler']))
+
+
+def print_invalidating(summaries, count):
+    tracked = [s for s in summaries if s['invalidations']]
+    print('Targets that most often invalidated their dependents:')
+    if not tracked:
+        print(
+            '  (none recorded; only targets with reset_timestamps are tracked)'
+        )
+        return
+    print('%13s %6s  %s' % ('invalidations', 'builds', 'target'))
+    for s in sorted(tracked,
+                    key=lambda s:
+                    (-s['invalidations'], -s['total_compile_ms']))[:count]:
+        print('%13d %6d  %s' %
+              (s['invalidations'], s['tracked_builds'], s['target']))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-C',
+                        '--build_directory',
+                        default='.',
+                        help='Ninja build directory with the telemetry log')
+    parser.add_argument(
+        '-n',
+        '--count',
+        type=int,
+        default=20,
+        help='Number of targets to list (default: %(default)s)')
+    opts = parser.parse_args()
+
+    log_location = path.join(opts.build_directory,
+                             ts_library.TELEMETRY_LOG_NAME)
+    if not path.exists(log_location):
+        print('No telemetry in %s; build with TSC_TELEMETRY=1 first.' %
+              opts.build_directory)
+        return 1
+    records = load_records(log_location)
+    summaries = summarize_targets(records)
+
+    print('%d builds of %d targets, %.1fs of compile time in total.' %
+          (len(records), len(summaries),
+           sum(s['total_compile_ms'] for s in summaries) / 1000))
+    print('')
+    print_slowest(summaries, opts.count)
+    print('')
+    print_invalidating(summaries, opts.count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
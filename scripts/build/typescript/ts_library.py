@@ -3,14 +3,20 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 import argparse
+import hashlib
 import json
 import logging
 import os
 import shlex
+import socket
+import stat
 import subprocess
 import sys
 import re
+import tempfile
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 
 _CURRENT_DIR = path.join(path.dirname(__file__))
@@ -19,18 +25,114 @@ ROOT_DIRECTORY_OF_REPOSITORY = path.join(_CURRENT_DIR, '..', '..', '..')
 NODE_MODULES_DIRECTORY = path.join(ROOT_DIRECTORY_OF_REPOSITORY,
                                    'node_modules')
 TSC_LOCATION = path.join(NODE_MODULES_DIRECTORY, 'typescript', 'bin', 'tsc')
+BUILD_SERVER_LIBRARY_LOCATION = path.join(_CURRENT_DIR, 'build_server.js')
+TSC_SERVER_LOCATION = path.join(_CURRENT_DIR, 'tsc_server.js')
+ESBUILD_SERVER_LOCATION = path.join(_CURRENT_DIR, 'esbuild_server.js')
 
-try:
-    old_sys_path = sys.path[:]
-    sys.path.append(path.join(ROOT_DIRECTORY_OF_REPOSITORY, 'scripts'))
-    import devtools_paths
-finally:
-    sys.path = old_sys_path
-NODE_LOCATION = devtools_paths.node_path()
-ESBUILD_LOCATION = devtools_paths.esbuild_path()
+# How long a target may take to build on a build server before we give up on
+# the server and build it with a one-shot `tsc` or `esbuild` instead.
+BUILD_SERVER_TIMEOUT_SECONDS = 10 * 60
+
+# How long to wait for a tsc server that was just started to accept a background type check.
+TSC_SERVER_STARTUP_SECONDS = 10
+
+# The result of a background type check (see `queue_background_typecheck`) is written next to the
+# tsconfig, with this suffix.
+TYPECHECK_STAMP_SUFFIX = '.typecheck.stamp'
 
 BASE_TS_CONFIG_LOCATION = path.join(ROOT_DIRECTORY_OF_REPOSITORY, 'config',
                                     'typescript', 'tsconfig.base.json')
+
+# Resolving the toolchain means importing `devtools_paths` and `node_path.py` and parsing the base
+# tsconfig, in every one of the thousands of `ts_library` actions of a build. The first action in a
+# build directory therefore writes the results to `ts_toolchain.json`, which later actions load with
+# a single read. The manifest records the modification times of the files it was derived from, and
+# is resolved again once one of them changes, or once the binaries it points to are gone (e.g. when
+# the checkout's Node.js was updated to a different version).
+TOOLCHAIN_MANIFEST_NAME = 'ts_toolchain.json'
+TOOLCHAIN_MANIFEST_VERSION = 1
+
+
+def load_toolchain_manifest():
+    try:
+        with open(TOOLCHAIN_MANIFEST_NAME, encoding="utf8") as fp:
+            toolchain = json.load(fp)
+        if toolchain.get('version') != TOOLCHAIN_MANIFEST_VERSION:
+            return None
+        for input_location, mtime_ns in toolchain['inputs'].items():
+            if os.stat(input_location).st_mtime_ns != mtime_ns:
+                return None
+        if not path.exists(toolchain['node']) or not path.exists(
+                toolchain['esbuild']):
+            return None
+        return toolchain
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def resolve_toolchain():
+    try:
+        old_sys_path = sys.path[:]
+        sys.path.append(path.join(ROOT_DIRECTORY_OF_REPOSITORY, 'scripts'))
+        import devtools_paths
+    finally:
+        sys.path = old_sys_path
+    toolchain = {
+        'version': TOOLCHAIN_MANIFEST_VERSION,
+        'node': devtools_paths.node_path(),
+        'esbuild': devtools_paths.esbuild_path(),
+    }
+    # `node_path` is imported by `devtools_paths.node_path()`, from a location that depends on the
+    # checkout.
+    inputs = [
+        BASE_TS_CONFIG_LOCATION, devtools_paths.__file__,
+        sys.modules['node_path'].__file__
+    ]
+    toolchain['inputs'] = {
+        path.abspath(i): os.stat(i).st_mtime_ns
+        for i in inputs
+    }
+
+    with open(BASE_TS_CONFIG_LOCATION, 'rb') as fp:
+        contents = fp.read()
+    # Identifies the compiler configuration, e.g. for caches of compiler state.
+    toolchain['base_tsconfig_sha256'] = hashlib.sha256(contents).hexdigest()
+    try:
+        toolchain['base_tsconfig'] = json.loads(contents)
+    except ValueError as e:
+        # Reported by `main`. Not written to the manifest, so that the next action tries again.
+        toolchain['base_tsconfig'] = None
+        toolchain['base_tsconfig_error'] = str(e)
+    return toolchain
+
+
+def write_toolchain_manifest(toolchain):
+    # Concurrent actions may all write the manifest; each of them replaces it as a whole.
+    try:
+        fd, temporary = tempfile.mkstemp(prefix=TOOLCHAIN_MANIFEST_NAME,
+                                         dir='.')
+        with os.fdopen(fd, 'w', encoding="utf8") as fp:
+            json.dump(toolchain, fp)
+        os.replace(temporary, TOOLCHAIN_MANIFEST_NAME)
+    except OSError as e:
+        logging.info('write_toolchain_manifest: %s', e)
+
+
+def load_toolchain():
+    toolchain = load_toolchain_manifest()
+    if toolchain is not None:
+        return toolchain
+    toolchain = resolve_toolchain()
+    # Only `ts_library` actions run in a build directory. Scripts that import this module from
+    # elsewhere, like `ts_library_batch.py`, resolve the toolchain themselves.
+    if toolchain['base_tsconfig'] is not None and path.exists('args.gn'):
+        write_toolchain_manifest(toolchain)
+    return toolchain
+
+
+TOOLCHAIN = load_toolchain()
+NODE_LOCATION = TOOLCHAIN['node']
+ESBUILD_LOCATION = TOOLCHAIN['esbuild']
 TYPES_NODE_MODULES_DIRECTORY = path.join(NODE_MODULES_DIRECTORY, '@types')
 RESOURCES_INSPECTOR_PATH = path.join(os.getcwd(), 'resources', 'inspector')
 
@@ -50,8 +152,10 @@ logging.basicConfig(
     level=logging.DEBUG if os.environ.get('TSC_DEBUG') else logging.WARNING)
 
 
-def runTsc(tsconfig_location):
+def runTsc(tsconfig_location, extended_diagnostics=False):
     cmd = [NODE_LOCATION, TSC_LOCATION, '-p', tsconfig_location]
+    if extended_diagnostics:
+        cmd += ['--extendedDiagnostics']
     logging.info("runTsc: %s", ' '.join(cmd))
     process = subprocess.Popen(cmd,
                                stdout=subprocess.PIPE,
@@ -62,6 +166,202 @@ def runTsc(tsconfig_location):
     return process.returncode, stdout + stderr
 
 
+# Spawning `tsc` or `esbuild` for every target means paying for process startup, and in the case of
+# `tsc` for parsing `lib.dom.d.ts`, `global_defs.d.ts` and the `.d.ts` files of all dependencies, over
+# and over again. With `--use-tsc-server` and `--use-esbuild-server`, targets are instead built by a
+# long-lived `tsc_server.js` or `esbuild_server.js`, which keep that work around between targets.
+# A server is started on the first request for a build directory and exits by itself once it has
+# been idle for a while. See `build_server.js` for the protocol.
+#
+# The socket is specific to the build directory and to the versions of the server and of the
+# compiler, so that a server that is still running with an old compiler is never used. It lives in a
+# directory that only the current user can access: `$XDG_RUNTIME_DIR`, or else `ts_library_servers/`
+# in the build directory. Unix socket paths are limited to about a hundred characters though, so for
+# deep build directories it's a `devtools-<uid>` directory in the temporary directory instead, which
+# isn't used if it belongs to someone else.
+BUILD_SERVER_DIRECTORY_NAME = 'ts_library_servers'
+MAX_SOCKET_PATH_LENGTH = 100
+
+
+def build_server_socket_directory(length_of_name):
+    if not hasattr(os, 'getuid'):
+        return None
+    candidates = [
+        path.join(os.getcwd(), BUILD_SERVER_DIRECTORY_NAME),
+        path.join(tempfile.gettempdir(), 'devtools-%d' % os.getuid()),
+    ]
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        candidates.insert(0, os.environ['XDG_RUNTIME_DIR'])
+    for directory in candidates:
+        if len(directory) + 1 + length_of_name <= MAX_SOCKET_PATH_LENGTH:
+            break
+    else:
+        return None
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if not is_private_to_user(os.lstat(directory), stat.S_ISDIR):
+            logging.info('build_server_socket_directory: %s is not private',
+                         directory)
+            return None
+    except OSError as e:
+        logging.info('build_server_socket_directory: %s', e)
+        return None
+    return directory
+
+
+def is_private_to_user(stats, is_type):
+    return is_type(stats.st_mode) and stats.st_uid == os.getuid() and not (
+        stats.st_mode & (stat.S_IRWXG | stat.S_IRWXO))
+
+
+# Returns None if build servers can't be used safely, or at all, on this machine.
+def build_server_socket_path(name, version_files):
+    key = hashlib.sha256()
+    key.update(os.getcwd().encode('utf8'))
+    for version_file in [BUILD_SERVER_LIBRARY_LOCATION] + version_files:
+        try:
+            key.update(str(os.stat(version_file).st_mtime_ns).encode('utf8'))
+        except OSError:
+            pass
+    socket_name = 'devtools-%s-%s.sock' % (name, key.hexdigest()[:16])
+    directory = build_server_socket_directory(len(socket_name))
+    if directory is None:
+        return None
+    return path.join(directory, socket_name)
+
+
+def start_build_server(server_location, socket_path):
+    cmd = [NODE_LOCATION, server_location, '--socket', socket_path]
+    logging.info('start_build_server: %s', ' '.join(cmd))
+    try:
+        subprocess.Popen(cmd,
+                         stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+    except OSError as e:
+        # This target is built without the server anyway.
+        logging.info('start_build_server: %s', e)
+
+
+# Sends the request to the build server and returns its response, if the server is up. Otherwise,
+# starts the server for the next targets (unless `start_server` is False) and returns None, as it
+# does if anything goes wrong on the server; the caller then has to do the work itself.
+def request_from_build_server(server_location,
+                              socket_path,
+                              request,
+                              start_server=True,
+                              timeout=BUILD_SERVER_TIMEOUT_SECONDS):
+    if socket_path is None or not hasattr(socket, 'AF_UNIX'):
+        return None
+    logging.info('request_from_build_server: %s %s', socket_path, request)
+    try:
+        # Only a server that the current user started may see the sources.
+        if not is_private_to_user(os.lstat(socket_path), stat.S_ISSOCK):
+            logging.info('request_from_build_server: %s is not private',
+                         socket_path)
+            return None
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode('utf8') + b'\n')
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if start_server:
+            start_build_server(server_location, socket_path)
+        return None
+    except OSError as e:
+        logging.info('request_from_build_server: %s', e)
+        return None
+
+    try:
+        response = json.loads(b''.join(chunks).decode('utf8'))
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['returncode'], response['output']
+    except (ValueError, KeyError, TypeError) as e:
+        logging.info('request_from_build_server: invalid response: %s', e)
+        return None
+
+
+def tsc_server_socket_path():
+    return build_server_socket_path('tsc', [
+        TSC_SERVER_LOCATION,
+        path.join(NODE_MODULES_DIRECTORY, 'typescript', 'package.json')
+    ])
+
+
+def runTscWithServer(tsconfig_location, extended_diagnostics=False):
+    socket_path = tsc_server_socket_path()
+    response = request_from_build_server(
+        TSC_SERVER_LOCATION, socket_path, {
+            'cwd': os.getcwd(),
+            'tsconfig': tsconfig_location,
+            'extendedDiagnostics': extended_diagnostics,
+        })
+    if response is None:
+        return runTsc(tsconfig_location, extended_diagnostics)
+    return response
+
+
+# With `--typecheck-in-background`, a target's JavaScript is emitted by esbuild, so that its
+# dependents can be built right away, and the target is type checked off the critical path, by a
+# pool of low priority workers on the tsc server. The result is written to a stamp file next to the
+# tsconfig, which starts out as pending; `wait_for_typecheck.py` waits for the type checks to finish
+# and reports the failures. If the server can't be reached, the target is type checked right away.
+# Every check has a generation of its own, which the server only writes the result of while the stamp
+# is still for that generation, so the result of an older check never replaces that of a newer one.
+def typecheck_stamp_location(tsconfig_location):
+    return tsconfig_location + TYPECHECK_STAMP_SUFFIX
+
+
+def remove_typecheck_stamp(tsconfig_location):
+    try:
+        os.remove(typecheck_stamp_location(tsconfig_location))
+    except FileNotFoundError:
+        pass
+
+
+def queue_background_typecheck(tsconfig_location):
+    stamp_location = typecheck_stamp_location(tsconfig_location)
+    generation = '%d-%d' % (time.time_ns(), os.getpid())
+    with open(stamp_location, 'w', encoding="utf8") as fp:
+        json.dump({'pending': True, 'generation': generation}, fp)
+
+    socket_path = tsc_server_socket_path()
+    request = {
+        'cwd': os.getcwd(),
+        'tsconfig': tsconfig_location,
+        'typecheckStamp': stamp_location,
+        'typecheckGeneration': generation,
+    }
+    response = request_from_build_server(TSC_SERVER_LOCATION, socket_path,
+                                         request)
+    deadline = time.monotonic() + TSC_SERVER_STARTUP_SECONDS
+    while response is None and time.monotonic() < deadline:
+        time.sleep(0.1)
+        response = request_from_build_server(TSC_SERVER_LOCATION,
+                                             socket_path,
+                                             request,
+                                             start_server=False)
+    if response is None:
+        cmd = [
+            NODE_LOCATION, TSC_SERVER_LOCATION, '--typecheck',
+            os.getcwd(), tsconfig_location, stamp_location, generation
+        ]
+        logging.info('queue_background_typecheck: %s', ' '.join(cmd))
+        try:
+            subprocess.run(cmd)
+        except OSError as e:
+            # The stamp stays pending, which `wait_for_typecheck.py` reports.
+            logging.info('queue_background_typecheck: %s', e)
+
+
 # To ensure that Ninja only rebuilds dependents when the actual content/public API of a TypeScript target changes,
 # we need to make sure that the config only changes when it needs to. Therefore, if the content would be equivalent
 # to what is already on disk, we don't write and allow Ninja to short-circuit if it can.
@@ -86,21 +386,127 @@ def maybe_update_tsconfig_file(tsconfig_output_location, tsconfig):
     return 0
 
 
-# Obtain the timestamps and original content of any previously generated TypeScript files, if any.
+# Obtain the timestamps and content digests of any previously generated TypeScript files, if any.
 # This will be used later in `maybe_reset_timestamps_on_generated_files` to potentially reset
 # file timestamps for Ninja.
+#
+# The digests are kept in a small manifest next to the tsconfig. An output that still has the size
+# and timestamp recorded in the manifest hasn't been touched since, so its digest can be reused
+# without reading the file. The metadata of an output is `(mtime_ns, size, digest, fingerprint)`,
+# where only declaration files have a fingerprint (see `compute_declaration_fingerprint`).
+GENERATED_FILES_MANIFEST_SUFFIX = '.outputs.json'
+_DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# Comments and whitespace in a declaration file, except for those in string literals and for
+# triple-slash directives (`/// <reference ... />`), which do affect the API.
+_DECLARATION_TRIVIA = re.compile(
+    r'''('(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"|`(?:[^`\\]|\\.)*`|///[ \t]*<[^\n]*)'''
+    r'|(?:\s|//(?!/[ \t]*<)[^\n]*|/\*.*?\*/)+', re.S)
+
+
+# A digest of the API that a declaration file describes, which ignores changes to its comments
+# (including the JSDoc copied over from the sources and source map references) and whitespace.
+# Dependents only have to be rebuilt when this changes.
+def compute_declaration_fingerprint(contents):
+    normalized = _DECLARATION_TRIVIA.sub(lambda m: m.group(1) or ' ',
+                                         contents.decode('utf-8', 'replace'))
+    return hashlib.blake2b(normalized.strip().encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def compute_file_digest(file_path):
+    if file_path.endswith('.d.ts'):
+        with open(file_path, 'rb') as fp:
+            contents = fp.read()
+        return (hashlib.blake2b(contents, digest_size=16).hexdigest(),
+                compute_declaration_fingerprint(contents))
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(_DIGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest(), None
+
+
+def load_generated_files_manifest(manifest_location):
+    try:
+        with open(manifest_location, encoding="utf8") as fp:
+            return {
+                gen_fname: tuple(metadata)
+                for gen_fname, metadata in json.load(fp).items()
+                # Entries written before fingerprints were recorded are hashed again.
+                if len(metadata) == 4
+            }
+    except (OSError, ValueError, AttributeError, TypeError):
+        return {}
+
+
+def write_generated_files_manifest(manifest_location, metadata):
+    try:
+        with open(manifest_location, 'w', encoding="utf8") as fp:
+            json.dump(metadata, fp, sort_keys=True)
+    except OSError as e:
+        # The manifest only saves work on the next build.
+        logging.info('write_generated_files_manifest: %s', e)
+
+
+# Returns the `os.stat_result` of each of the given generated files that exists, listing the output
+# directory once rather than checking every file on its own.
+def scan_generated_files(gen_fnames, tsconfig_output_directory):
+    gen_fnames = set(gen_fnames)
+    stats = {}
+    try:
+        with os.scandir(tsconfig_output_directory) as entries:
+            for entry in entries:
+                if entry.name in gen_fnames:
+                    try:
+                        stats[entry.name] = entry.stat()
+                    except FileNotFoundError:
+                        pass
+    except FileNotFoundError:
+        pass
+    return stats
+
+
+# Hashes the given files on a thread pool; `hashlib` releases the GIL while hashing, so this scales
+# with the available I/O and CPU parallelism rather than with the number of files.
+def compute_file_digests(gen_fnames, tsconfig_output_directory):
+    gen_fnames = list(gen_fnames)
+    if len(gen_fnames) <= 1:
+        return {
+            gen_fname:
+            compute_file_digest(path.join(tsconfig_output_directory,
+                                          gen_fname))
+            for gen_fname in gen_fnames
+        }
+    with ThreadPoolExecutor() as executor:
+        digests = executor.map(
+            compute_file_digest,
+            [path.join(tsconfig_output_directory, f) for f in gen_fnames])
+        return dict(zip(gen_fnames, digests))
+
+
 def compute_previous_generated_file_metadata(sources,
-                                             tsconfig_output_directory):
+                                             tsconfig_output_directory,
+                                             manifest_location):
+    manifest = load_generated_files_manifest(manifest_location)
+    stats = scan_generated_files(
+        (os.path.basename(src_fname.replace('.ts', ext))
+         for src_fname in sources
+         for ext in ['.d.ts', '.js', '.js.map']), tsconfig_output_directory)
+
     gen_files = {}
-    for src_fname in sources:
-        for ext in ['.d.ts', '.js', '.js.map']:
-            gen_fname = os.path.basename(src_fname.replace('.ts', ext))
-            gen_path = os.path.join(tsconfig_output_directory, gen_fname)
-            if os.path.exists(gen_path):
-                mtime = os.stat(gen_path).st_mtime
-                with open(gen_path, encoding="utf8") as fp:
-                    contents = fp.read()
-                gen_files[gen_fname] = (mtime, contents)
+    to_hash = []
+    for gen_fname, stat in stats.items():
+        recorded = manifest.get(gen_fname)
+        if recorded and recorded[:2] == (stat.st_mtime_ns, stat.st_size):
+            gen_files[gen_fname] = recorded
+        else:
+            to_hash.append(gen_fname)
+    for gen_fname, (digest, fingerprint) in compute_file_digests(
+            to_hash, tsconfig_output_directory).items():
+        stat = stats[gen_fname]
+        gen_files[gen_fname] = (stat.st_mtime_ns, stat.st_size, digest,
+                                fingerprint)
 
     return gen_files
 
@@ -114,17 +520,58 @@ def compute_previous_generated_file_metadata(sources,
 # This also means that if the public API of a target changes, it does run the immediate dependents
 # of the target. However, if there is no functional change in the immediate dependents, the timestamps
 # of the immediate dependent would be properly reset and any transitive dependents would not be rerun.
+#
+# A declaration file whose contents changed, but whose API didn't (i.e. only a comment changed), also
+# keeps its timestamp, so that a documentation change doesn't rerun all dependents. Such a file keeps
+# its new contents, which are equivalent for the dependents.
+#
+# Outputs that `tsc` didn't rewrite at all still have their old size and timestamp, so only the
+# rewritten ones need to be hashed. The resulting metadata is written to the manifest for the next
+# build. Returns the names of the outputs whose timestamps were reset, of those that changed, and of
+# the declaration files among the reset ones whose contents changed but whose API didn't.
 def maybe_reset_timestamps_on_generated_files(
-        previously_generated_file_metadata, tsconfig_output_directory):
-    for gen_fname in previously_generated_file_metadata:
-        gen_path = os.path.join(tsconfig_output_directory, gen_fname)
-        if os.path.exists(gen_path):
-            old_mtime, old_contents = previously_generated_file_metadata[
-                gen_fname]
-            with open(gen_path, encoding="utf8") as fp:
-                new_contents = fp.read()
-            if new_contents == old_contents:
-                os.utime(gen_path, (old_mtime, old_mtime))
+        previously_generated_file_metadata, tsconfig_output_directory,
+        manifest_location):
+    stats = scan_generated_files(previously_generated_file_metadata,
+                                 tsconfig_output_directory)
+
+    manifest = {}
+    rewritten = []
+    reset = []
+    changed = []
+    same_api = []
+    for gen_fname, stat in stats.items():
+        old_metadata = previously_generated_file_metadata[gen_fname]
+        if (stat.st_mtime_ns, stat.st_size) == old_metadata[:2]:
+            manifest[gen_fname] = old_metadata
+        else:
+            rewritten.append(gen_fname)
+
+    for gen_fname, (new_digest, new_fingerprint) in compute_file_digests(
+            rewritten, tsconfig_output_directory).items():
+        old_mtime, old_size, old_digest, old_fingerprint = previously_generated_file_metadata[
+            gen_fname]
+        stat = stats[gen_fname]
+        if stat.st_size == old_size and new_digest == old_digest:
+            os.utime(path.join(tsconfig_output_directory, gen_fname),
+                     ns=(old_mtime, old_mtime))
+            manifest[gen_fname] = (old_mtime, old_size, old_digest,
+                                   old_fingerprint)
+            reset.append(gen_fname)
+        elif new_fingerprint is not None and new_fingerprint == old_fingerprint:
+            os.utime(path.join(tsconfig_output_directory, gen_fname),
+                     ns=(old_mtime, old_mtime))
+            manifest[gen_fname] = (old_mtime, stat.st_size, new_digest,
+                                   new_fingerprint)
+            reset.append(gen_fname)
+            same_api.append(gen_fname)
+        else:
+            manifest[gen_fname] = (stat.st_mtime_ns, stat.st_size, new_digest,
+                                   new_fingerprint)
+            changed.append(gen_fname)
+
+    write_generated_files_manifest(manifest_location, manifest)
+    return reset, changed, same_api
 
 
 # TypeScript generates `.tsbuildinfo` files for its incremental compilation. These files are used for
@@ -149,7 +596,116 @@ def remove_generated_tsbuildinfo_file(tsbuildinfo_output_location):
         os.remove(tsbuildinfo_output_location)
 
 
-def runEsbuild(opts, tsconfig_output_location, tsconfig_output_directory):
+# Without a `.tsbuildinfo`, every compile of a target type checks and emits all of its files again.
+# With `--incremental-tsc`, the `.tsbuildinfo` is kept in `ts_library_cache/` in the build directory,
+# outside of the GN outputs, and put back before the next compile of the target, so that `tsc` only
+# checks and emits the files that changed (and those affected by them).
+#
+# `tsc` doesn't emit outputs that the `.tsbuildinfo` says are up to date, even if they're gone. The
+# cache therefore records the size and timestamp of every output of the compile, and is only used if
+# all of them are still there, unchanged, e.g. not removed by `ninja -t clean` or overwritten by an
+# esbuild build. The cache entry of a target is keyed by the location of its tsconfig, and is only
+# used for the same tsconfig contents.
+TSBUILDINFO_CACHE_DIRECTORY = 'ts_library_cache'
+
+
+def tsbuildinfo_cache_location(tsconfig_output_location):
+    key = hashlib.blake2b(os.fsencode(tsconfig_output_location),
+                          digest_size=16).hexdigest()
+    return path.join(TSBUILDINFO_CACHE_DIRECTORY, key)
+
+
+def compute_tsconfig_digest(tsconfig):
+    return hashlib.blake2b(json.dumps(tsconfig, sort_keys=True).encode(),
+                           digest_size=16).hexdigest()
+
+
+# Moves the cached `.tsbuildinfo` of the target into place, if it is valid. Returns whether it did.
+def restore_cached_tsbuildinfo(tsconfig_output_location, tsconfig_digest,
+                               tsconfig_output_directory,
+                               tsbuildinfo_output_location):
+    # A `.tsbuildinfo` left behind by an interrupted compile can't be trusted either.
+    remove_generated_tsbuildinfo_file(tsbuildinfo_output_location)
+    cache_location = tsbuildinfo_cache_location(tsconfig_output_location)
+    try:
+        with open(cache_location + '.json', encoding="utf8") as fp:
+            entry = json.load(fp)
+        if entry['tsconfig'] != tsconfig_digest:
+            return False
+        stats = scan_generated_files(entry['outputs'],
+                                     tsconfig_output_directory)
+        for gen_fname, (mtime_ns, size) in entry['outputs'].items():
+            stat = stats.get(gen_fname)
+            if stat is None or stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return False
+        os.replace(cache_location + '.tsbuildinfo',
+                   tsbuildinfo_output_location)
+        return True
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return False
+
+
+# `ts_library_batch.py` uses the cache of the targets that have an entry, so the entry of a target
+# that is no longer compiled with `--incremental-tsc` is removed.
+def remove_cached_tsbuildinfo(tsconfig_output_location):
+    cache_location = tsbuildinfo_cache_location(tsconfig_output_location)
+    for ext in ['.json', '.tsbuildinfo']:
+        try:
+            os.remove(cache_location + ext)
+        except FileNotFoundError:
+            pass
+
+
+# Moves the `.tsbuildinfo` of a successful compile into the cache, with the state of the outputs.
+def cache_tsbuildinfo(tsconfig_output_location, tsconfig_digest, sources,
+                      tsconfig_output_directory, tsbuildinfo_output_location):
+    cache_location = tsbuildinfo_cache_location(tsconfig_output_location)
+    stats = scan_generated_files(
+        (os.path.basename(src_fname.replace('.ts', ext))
+         for src_fname in sources
+         for ext in ['.d.ts', '.js', '.js.map']), tsconfig_output_directory)
+    try:
+        os.makedirs(TSBUILDINFO_CACHE_DIRECTORY, exist_ok=True)
+        os.replace(tsbuildinfo_output_location,
+                   cache_location + '.tsbuildinfo')
+        with open(cache_location + '.json', 'w', encoding="utf8") as fp:
+            json.dump(
+                {
+                    'tsconfig': tsconfig_digest,
+                    'outputs': {
+                        gen_fname: (stat.st_mtime_ns, stat.st_size)
+                        for gen_fname, stat in stats.items()
+                    },
+                }, fp)
+    except OSError as e:
+        # The cache only saves work on the next build.
+        logging.info('cache_tsbuildinfo: %s', e)
+        remove_generated_tsbuildinfo_file(tsbuildinfo_output_location)
+
+
+# Windows limits command lines to 32767 characters. esbuild doesn't read response files, so there the
+# sources of targets that don't fit are handed to `esbuild_server.js --stdin` instead, which passes
+# them to esbuild through its JavaScript API. Other platforms allow far longer command lines, and
+# always run the esbuild binary.
+MAX_COMMAND_LINE_LENGTH = 24 * 1024
+
+
+def esbuild_request(opts, sources, tsconfig_output_location,
+                    tsconfig_output_directory):
+    request = {
+        'cwd': os.getcwd(),
+        'tsconfig': tsconfig_output_location,
+        'outdir': tsconfig_output_directory,
+        'sources': sources,
+    }
+    # TODO: Remove once we switch the repo to ESM
+    if opts.runs_in == 'node':
+        request['format'] = 'cjs'
+    return request
+
+
+def runEsbuild(opts, sources, tsconfig_output_location,
+               tsconfig_output_directory):
     cmd = [
         ESBUILD_LOCATION,
         '--tsconfig=' + tsconfig_output_location,
@@ -162,13 +718,107 @@ def runEsbuild(opts, tsconfig_output_location, tsconfig_output_directory):
     if opts.runs_in == 'node':
         cmd += ['--format=cjs']
 
-    cmd += opts.sources
+    if sys.platform == 'win32' and sum(
+            len(arg) + 1 for arg in cmd + sources) > MAX_COMMAND_LINE_LENGTH:
+        cmd = [NODE_LOCATION, ESBUILD_SERVER_LOCATION, '--stdin']
+        logging.info('runEsbuild: %s (%d sources)', ' '.join(cmd),
+                     len(sources))
+        p = subprocess.run(cmd,
+                           input=json.dumps(
+                               esbuild_request(opts, sources,
+                                               tsconfig_output_location,
+                                               tsconfig_output_directory)),
+                           universal_newlines=True)
+        return p.returncode
+
+    cmd += sources
 
     logging.info('runEsbuild: %s', ' '.join(cmd))
     p = subprocess.run(cmd)
     return p.returncode
 
 
+def runEsbuildWithServer(opts, sources, tsconfig_output_location,
+                         tsconfig_output_directory):
+    socket_path = build_server_socket_path('esbuild', [
+        ESBUILD_SERVER_LOCATION, ESBUILD_LOCATION,
+        path.join(NODE_MODULES_DIRECTORY, 'esbuild', 'package.json')
+    ])
+    request = esbuild_request(opts, sources, tsconfig_output_location,
+                              tsconfig_output_directory)
+    response = request_from_build_server(ESBUILD_SERVER_LOCATION, socket_path,
+                                         request)
+    if response is None:
+        return runEsbuild(opts, sources, tsconfig_output_location,
+                          tsconfig_output_directory)
+    returncode, output = response
+    sys.stderr.write(output)
+    return returncode
+
+
+# With `TSC_TELEMETRY=1` in the environment, every `ts_library` action appends a record of where its
+# time went to `ts_library_telemetry.jsonl` in the build directory. The records can be summarized
+# with `summarize_ts_library_telemetry.py`.
+TELEMETRY_LOG_NAME = 'ts_library_telemetry.jsonl'
+
+# The counters that `tsc --extendedDiagnostics` prints after the diagnostics, e.g. "Check time: 1.23s".
+_TSC_STATISTIC = re.compile(r'^([A-Za-z][A-Za-z/ ]*):\s+([\d.]+)([Ks]?)$')
+_TSC_STATISTICS = {
+    'Files': 'files',
+    'Lines': 'lines',
+    'Memory used': 'memory_used_kb',
+    'Parse time': 'parse_time_s',
+    'Bind time': 'bind_time_s',
+    'Check time': 'check_time_s',
+    'Emit time': 'emit_time_s',
+    'Total time': 'total_time_s',
+}
+
+
+def telemetry_enabled():
+    return bool(os.environ.get('TSC_TELEMETRY'))
+
+
+# Splits the counters printed by `--extendedDiagnostics` from the rest of the `tsc` output and
+# returns the ones in `_TSC_STATISTICS`. The line counts of the different kinds of files
+# ("Lines of Library" etc.) are added up.
+def extract_tsc_statistics(output):
+    statistics = {}
+    lines = []
+    for line in output.splitlines():
+        match = _TSC_STATISTIC.match(line.strip())
+        if not match:
+            lines.append(line)
+            continue
+        name = match[1].strip()
+        if name.startswith('Lines of '):
+            name = 'Lines'
+        if name in _TSC_STATISTICS:
+            key = _TSC_STATISTICS[name]
+            statistics[key] = statistics.get(key, 0) + float(match[2])
+    return "\n".join(lines), statistics
+
+
+def append_telemetry_record(record):
+    # A single short write to a file opened for appending is atomic, so parallel actions don't
+    # interleave their records.
+    try:
+        with open(path.join(os.getcwd(), TELEMETRY_LOG_NAME),
+                  'a',
+                  encoding="utf8") as fp:
+            fp.write(json.dumps(record, sort_keys=True) + '\n')
+    except OSError as e:
+        logging.info('append_telemetry_record: %s', e)
+
+
+def generated_file_bytes(sources, tsconfig_output_directory):
+    stats = scan_generated_files(
+        (os.path.basename(src_fname.replace('.ts', ext))
+         for src_fname in sources
+         for ext in ['.d.ts', '.js', '.js.map']), tsconfig_output_directory)
+    return sum(stat.st_size for stat in stats.values())
+
+
 def rewriteTypeScriptErrorPaths(stderr: str):
     def rewriteLine(match: re.Match[str]) -> str:
         return f"{match[1]}({match[2]}): error {match[3]}: {match[4]}"
@@ -193,6 +843,11 @@ def main():
     parser.add_argument('--sources-list',
                         type=argparse.FileType('r'),
                         help='List of TypeScript source files')
+    parser.add_argument(
+        '--sources-relative-to-tsconfig',
+        action='store_true',
+        help='The sources are relative to the generated tsconfig, rather '
+        'than to the build directory')
     parser.add_argument('-deps',
                         '--deps',
                         nargs='*',
@@ -213,21 +868,28 @@ def main():
                         required=False,
                         help='List of TypeScript declaration files')
     parser.add_argument('--use-esbuild', action='store_true')
+    parser.add_argument('--use-esbuild-server', action='store_true')
+    parser.add_argument('--typecheck-in-background', action='store_true')
     parser.add_argument('--tsconfig-only', action='store_true')
+    parser.add_argument('--use-tsc-server', action='store_true')
+    parser.add_argument('--incremental-tsc', action='store_true')
     parser.set_defaults(test_only=False,
                         no_emit=False,
                         verify_lib_check=False,
                         reset_timestamps=False,
+                        use_tsc_server=False,
+                        incremental_tsc=False,
+                        use_esbuild_server=False,
+                        typecheck_in_background=False,
                         runs_in='browser')
 
     opts = parser.parse_args()
-    with open(BASE_TS_CONFIG_LOCATION) as root_tsconfig:
-        try:
-            tsconfig = json.loads(root_tsconfig.read())
-        except Exception as e:
-            print('Encountered error while loading root tsconfig:')
-            print(e)
-            return 1
+    start_time = time.monotonic()
+    tsconfig = TOOLCHAIN['base_tsconfig']
+    if tsconfig is None:
+        print('Encountered error while loading root tsconfig:')
+        print(TOOLCHAIN['base_tsconfig_error'])
+        return 1
     tsconfig_output_location = path.join(os.getcwd(),
                                          opts.tsconfig_output_location)
     tsconfig_output_directory = path.dirname(tsconfig_output_location)
@@ -242,13 +904,22 @@ def main():
     if len(sources) == 0 and opts.sources_list:
         sources = shlex.split(opts.sources_list.read())
 
-    all_ts_files = sources + GLOBAL_TYPESCRIPT_DEFINITION_FILES
+    type_definition_files = GLOBAL_TYPESCRIPT_DEFINITION_FILES[:]
 
     if (opts.additional_type_definitions):
-        all_ts_files += opts.additional_type_definitions
+        type_definition_files += opts.additional_type_definitions
 
-    tsconfig['files'] = [
-        get_relative_path_from_output_directory(x) for x in all_ts_files
+    # GN can relativize the paths of the sources up front, which saves a `relpath` for each of the
+    # thousands of sources of large test targets.
+    if opts.sources_relative_to_tsconfig:
+        relative_sources = sources
+    else:
+        relative_sources = [
+            get_relative_path_from_output_directory(x) for x in sources
+        ]
+    tsconfig['files'] = relative_sources + [
+        get_relative_path_from_output_directory(x)
+        for x in type_definition_files
     ]
 
     if (opts.deps is not None):
@@ -287,6 +958,9 @@ def main():
     if maybe_update_tsconfig_file(tsconfig_output_location, tsconfig) == 1:
         return 1
 
+    # Any earlier result no longer applies.
+    remove_typecheck_stamp(tsconfig_output_location)
+
     # If there are no sources to compile, we can bail out and don't call tsc.
     # That's because tsc can successfully compile dependents solely on the
     # the tsconfig.json
@@ -296,21 +970,129 @@ def main():
     if opts.tsconfig_only:
         return 0
 
-    if opts.use_esbuild:
-        return runEsbuild(opts, tsconfig_output_location,
-                          tsconfig_output_directory)
+    telemetry = None
+    if telemetry_enabled():
+        telemetry = {
+            'target': opts.tsconfig_output_location,
+            'time': time.time(),
+            'sources': len(sources),
+            'tsconfig_ms': (time.monotonic() - start_time) * 1000,
+        }
+    compile_start_time = time.monotonic()
 
-    previously_generated_file_metadata = compute_previous_generated_file_metadata(
-        sources, tsconfig_output_directory)
+    # With `--typecheck-in-background`, esbuild emits the JavaScript that dependents need, and the
+    # type check is left to the tsc server. See `wait_for_typecheck.py`.
+    if opts.use_esbuild or opts.typecheck_in_background:
+        esbuild_sources = sources
+        if opts.sources_relative_to_tsconfig:
+            tsconfig_directory = path.dirname(opts.tsconfig_output_location)
+            esbuild_sources = [
+                path.normpath(path.join(tsconfig_directory, x))
+                for x in sources
+            ]
+        if opts.use_esbuild_server:
+            returncode = runEsbuildWithServer(opts, esbuild_sources,
+                                              tsconfig_output_location,
+                                              tsconfig_output_directory)
+        else:
+            returncode = runEsbuild(opts, esbuild_sources,
+                                    tsconfig_output_location,
+                                    tsconfig_output_directory)
+        compile_ms = (time.monotonic() - compile_start_time) * 1000
+        if opts.typecheck_in_background and returncode == 0:
+            queue_background_typecheck(tsconfig_output_location)
+        if telemetry is not None:
+            telemetry.update({
+                'compiler':
+                'esbuild-server' if opts.use_esbuild_server else 'esbuild',
+                'compile_ms':
+                compile_ms,
+                'returncode':
+                returncode,
+                'output_bytes':
+                generated_file_bytes(sources, tsconfig_output_directory),
+            })
+            if opts.typecheck_in_background:
+                telemetry['typecheck_queue_ms'] = (
+                    time.monotonic() - compile_start_time) * 1000 - compile_ms
+            append_telemetry_record(telemetry)
+        return returncode
 
-    found_errors, stderr = runTsc(tsconfig_location=tsconfig_output_location)
+    generated_files_manifest_location = (tsconfig_output_location +
+                                         GENERATED_FILES_MANIFEST_SUFFIX)
+    if opts.reset_timestamps:
+        previously_generated_file_metadata = compute_previous_generated_file_metadata(
+            sources, tsconfig_output_directory,
+            generated_files_manifest_location)
+    elif path.exists(generated_files_manifest_location):
+        # `ts_library_batch.py` resets the timestamps of the targets that have a manifest.
+        os.remove(generated_files_manifest_location)
 
+    # The tsc server keeps its own state, and doesn't use `.tsbuildinfo` files.
+    incremental_tsc = opts.incremental_tsc and not opts.use_tsc_server
+    tsbuildinfo_output_location = path.join(tsconfig_output_directory,
+                                            tsbuildinfo_name)
+    if incremental_tsc:
+        tsconfig_digest = compute_tsconfig_digest(tsconfig)
+        restored_tsbuildinfo = restore_cached_tsbuildinfo(
+            opts.tsconfig_output_location, tsconfig_digest,
+            tsconfig_output_directory, tsbuildinfo_output_location)
+    else:
+        remove_cached_tsbuildinfo(opts.tsconfig_output_location)
+
+    if opts.use_tsc_server:
+        found_errors, stderr = runTscWithServer(
+            tsconfig_location=tsconfig_output_location,
+            extended_diagnostics=telemetry is not None)
+    else:
+        found_errors, stderr = runTsc(
+            tsconfig_location=tsconfig_output_location,
+            extended_diagnostics=telemetry is not None)
+    compile_ms = (time.monotonic() - compile_start_time) * 1000
+
+    reset_files, changed_files, same_api_files = None, None, None
     if opts.reset_timestamps:
-        maybe_reset_timestamps_on_generated_files(
-            previously_generated_file_metadata, tsconfig_output_directory)
+        reset_files, changed_files, same_api_files = maybe_reset_timestamps_on_generated_files(
+            previously_generated_file_metadata, tsconfig_output_directory,
+            generated_files_manifest_location)
+
+    if telemetry is not None:
+        stderr, statistics = extract_tsc_statistics(stderr)
+        telemetry.update({
+            'compiler':
+            'tsc-server' if opts.use_tsc_server else 'tsc',
+            'compile_ms':
+            compile_ms,
+            'returncode':
+            found_errors,
+            'output_bytes':
+            generated_file_bytes(sources, tsconfig_output_directory),
+            'tsc':
+            statistics,
+        })
+        if incremental_tsc:
+            telemetry['incremental'] = restored_tsbuildinfo
+        if reset_files is not None:
+            # Dependents are only rerun if a declaration file changed.
+            telemetry.update({
+                'reset_outputs':
+                len(reset_files),
+                'changed_outputs':
+                len(changed_files),
+                'invalidates_dependents':
+                any(f.endswith('.d.ts') for f in changed_files),
+                # Declaration files that changed, but only in their comments.
+                'same_api_declarations':
+                len(same_api_files),
+            })
+        append_telemetry_record(telemetry)
 
-    remove_generated_tsbuildinfo_file(
-        path.join(tsconfig_output_directory, tsbuildinfo_name))
+    if incremental_tsc and not found_errors:
+        cache_tsbuildinfo(opts.tsconfig_output_location, tsconfig_digest,
+                          sources, tsconfig_output_directory,
+                          tsbuildinfo_output_location)
+    else:
+        remove_generated_tsbuildinfo_file(tsbuildinfo_output_location)
 
     if found_errors:
         # Rewrite the TypeScript error paths so you can open them directly
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""
+Compile many `ts_library` targets in a single `tsc --build` process.
+
+Every `ts_library` action type-checks its target in a `tsc` of its own, so
+rebuilding a whole panel means dozens of type-check sessions that each load
+the same declaration files. This script instead hands the tsconfigs that the
+actions generated to one `tsc --build`, which compiles them, and the targets
+they reference, in dependency order with shared program state.
+
+Run it from the root of the repository, after the targets have been built
+with Ninja at least once (so that their tsconfigs exist), e.g.:
+
+    scripts/build/typescript/ts_library_batch.py -C out/Default front_end/panels/elements
+
+Paths are either generated tsconfigs or directories; for a directory, all of
+the tsconfigs generated for targets in or below it are compiled. The outputs
+are the same as those of the individual actions, and each target is compiled
+with the options that its action used: outputs of targets with
+`reset_timestamps` whose contents didn't change keep their old timestamps, so
+that Ninja doesn't rerun the dependents of targets whose public API is
+unchanged, and the `.tsbuildinfo` of targets compiled with `--incremental-tsc`
+is taken from and put back into `ts_library_cache/`. Other `.tsbuildinfo`
+files are removed afterwards.
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from os import path
+
+import ts_library
+
+TSCONFIG_SUFFIX = '-tsconfig.json'
+
+
+def find_tsconfigs(build_directory, paths):
+    tsconfigs = []
+    for p in paths:
+        if p.endswith(TSCONFIG_SUFFIX):
+            tsconfigs.append(path.abspath(p))
+            continue
+        gen_directory = path.join(
+            build_directory, 'gen',
+            path.relpath(path.abspath(p),
+                         ts_library.ROOT_DIRECTORY_OF_REPOSITORY))
+        for directory, _, files in os.walk(gen_directory):
+            tsconfigs += [
+                path.join(directory, f) for f in files
+                if f.endswith(TSCONFIG_SUFFIX)
+            ]
+    return sorted(set(tsconfigs))
+
+
+def load_tsconfig(tsconfig_location):
+    with open(tsconfig_location, encoding="utf8") as fp:
+        return json.load(fp)
+
+
+# `tsc --build` also compiles any referenced project whose `.tsbuildinfo` doesn't show it to be up
+# to date, which is every one of them that doesn't have a valid cached `.tsbuildinfo`. The
+# bookkeeping therefore has to cover all projects that the given ones reference, directly or not.
+def collect_projects(tsconfigs):
+    projects = {}
+    pending = list(tsconfigs)
+    while pending:
+        tsconfig_location = path.normpath(pending.pop())
+        if tsconfig_location in projects:
+            continue
+        tsconfig = load_tsconfig(tsconfig_location)
+        projects[tsconfig_location] = tsconfig
+        pending += [
+            path.join(path.dirname(tsconfig_location), reference['path'])
+            for reference in tsconfig.get('references', [])
+        ]
+    return projects
+
+
+# The options that the `ts_library` action of a target was run with aren't part of its tsconfig,
+# but can be told from the files the action keeps: the manifest of the generated files only exists
+# for targets with `reset_timestamps`, and a `ts_library_cache/` entry only for targets compiled
+# with `--incremental-tsc`. Must be run from the build directory.
+class Project:
+
+    def __init__(self, tsconfig_location, tsconfig):
+        self.tsconfig_output_directory = path.dirname(tsconfig_location)
+        self.sources = tsconfig.get('files', [])
+        # The location that GN passes to `ts_library.py`, which keys the cache.
+        self.tsconfig_output_location = path.relpath(
+            tsconfig_location).replace(os.sep, '/')
+        self.tsbuildinfo_output_location = path.join(
+            self.tsconfig_output_directory,
+            tsconfig['compilerOptions']['tsBuildInfoFile'])
+        self.manifest_location = (tsconfig_location +
+                                  ts_library.GENERATED_FILES_MANIFEST_SUFFIX)
+        self.previously_generated_file_metadata = None
+        if path.exists(self.manifest_location):
+            self.previously_generated_file_metadata = ts_library.compute_previous_generated_file_metadata(
+                self.sources, self.tsconfig_output_directory,
+                self.manifest_location)
+        self.tsconfig_digest = None
+        if path.exists(
+                ts_library.tsbuildinfo_cache_location(
+                    self.tsconfig_output_location) + '.json'):
+            self.tsconfig_digest = ts_library.compute_tsconfig_digest(tsconfig)
+
+    def before_compile(self):
+        if self.tsconfig_digest is not None:
+            ts_library.restore_cached_tsbuildinfo(
+                self.tsconfig_output_location, self.tsconfig_digest,
+                self.tsconfig_output_directory,
+                self.tsbuildinfo_output_location)
+        else:
+            ts_library.remove_generated_tsbuildinfo_file(
+                self.tsbuildinfo_output_location)
+
+    def after_compile(self, succeeded):
+        if self.previously_generated_file_metadata is not None:
+            ts_library.maybe_reset_timestamps_on_generated_files(
+                self.previously_generated_file_metadata,
+                self.tsconfig_output_directory, self.manifest_location)
+        if self.tsconfig_digest is not None and succeeded:
+            ts_library.cache_tsbuildinfo(self.tsconfig_output_location,
+                                         self.tsconfig_digest, self.sources,
+                                         self.tsconfig_output_directory,
+                                         self.tsbuildinfo_output_location)
+        else:
+            ts_library.remove_generated_tsbuildinfo_file(
+                self.tsbuildinfo_output_location)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-C',
+                        '--build_directory',
+                        required=True,
+                        help='Ninja build directory, e.g. out/Default')
+    parser.add_argument('paths',
+                        nargs='+',
+                        help='Generated tsconfigs, or directories of targets')
+    opts = parser.parse_args()
+
+    build_directory = path.abspath(opts.build_directory)
+    tsconfigs = find_tsconfigs(build_directory, opts.paths)
+    if not tsconfigs:
+        print('No generated tsconfigs found for %s in %s' %
+              (' '.join(opts.paths), opts.build_directory))
+        return 1
+
+    projects = collect_projects(tsconfigs)
+
+    # Like Ninja, run from the build directory, so that errors are reported with the same paths.
+    os.chdir(build_directory)
+    projects = [
+        Project(tsconfig_location, tsconfig)
+        for tsconfig_location, tsconfig in projects.items()
+    ]
+    for project in projects:
+        project.before_compile()
+
+    cmd = [ts_library.NODE_LOCATION, ts_library.TSC_LOCATION, '--build'
+           ] + [path.relpath(t) for t in tsconfigs]
+    if os.environ.get('TSC_DEBUG'):
+        cmd += ['--verbose']
+    logging.info('ts_library_batch: %s', ' '.join(cmd))
+    process = subprocess.Popen(cmd,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    stdout, stderr = process.communicate()
+
+    for project in projects:
+        project.after_compile(process.returncode == 0)
+
+    output = stdout + stderr
+    if process.returncode:
+        print('')
+        print('TypeScript compilation of %d project(s) failed.' %
+              len(projects))
+        print('')
+        print(ts_library.rewriteTypeScriptErrorPaths(output))
+        print('')
+        return 1
+    if output.strip():
+        print(output)
+    print('Compiled %d project(s) with a single tsc --build.' % len(projects))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
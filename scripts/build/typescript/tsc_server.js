@@ -0,0 +1,565 @@
+// Copyright 2026 The Chromium Authors. All rights reserved.
+// Use of this source code is governed by a BSD-style license that can be
+// found in the LICENSE file.
+
+// @ts-check
+
+// A long-lived TypeScript compile server for `ts_library.py`.
+//
+// Run like the following (`ts_library.py --use-tsc-server` starts it on demand):
+// $ node scripts/build/typescript/tsc_server.js --socket /tmp/devtools-tsc-1234.sock
+//
+// A request is `{"cwd": ..., "tsconfig": ..., "extendedDiagnostics": ...}`, and
+// its result is `{"returncode": ..., "output": ...}`, equivalent to the exit
+// code and output of `tsc -p <tsconfig> [--extendedDiagnostics]` run in `cwd`.
+// See `build_server.js` for the protocol.
+//
+// With `"typecheckStamp": ...` instead, the project is only type checked, in
+// the background, on a separate pool of low priority workers, and the result
+// is written to the stamp file, unless the stamp has moved on to a newer
+// `"typecheckGeneration"` by then. `{"wait": true}` returns once all type checks
+// queued so far are done.
+//
+// Compilations are spread over a pool of worker threads. Every worker keeps a
+// `DocumentRegistry`, so that source files that are shared between targets
+// (`lib.dom.d.ts`, `global_defs.d.ts` and the `.d.ts` files of dependencies)
+// are only parsed again when they change, as well as the last few programs it
+// compiled, which `tsc` can reuse the structure of when such a target is rebuilt
+// on the same worker. Each program holds a type checker and all of its source
+// files, so keeping one for every target would take gigabytes over a clean
+// build.
+
+const crypto = require('crypto');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const {Worker, isMainThread, parentPort, workerData} = require('worker_threads');
+
+const {parseArguments, serve} = require('./build_server.js');
+
+const ts = require(path.join(__dirname, '..', '..', '..', 'node_modules', 'typescript'));
+
+// The number of programs each worker keeps for reuse. Type check programs use
+// the sources of all projects that the target references, directly or not, so
+// they are much larger, and are kept apart from the programs that emit.
+const RETAINED_PROGRAMS = 2;
+const RETAINED_TYPECHECK_PROGRAMS = 1;
+
+/**
+ * A snapshot that only reads the file when the `DocumentRegistry` needs its
+ * text, i.e. when the file isn't already in the registry with the same version.
+ *
+ * @implements {ts.IScriptSnapshot}
+ */
+class LazyFileSnapshot {
+  /**
+   * @param {string} fileName
+   * @param {string=} text the contents of the file, if they were already read
+   */
+  constructor(fileName, text) {
+    this.fileName = fileName;
+    /** @type {string|undefined} */
+    this.text = text;
+  }
+
+  getFullText() {
+    if (this.text === undefined) {
+      this.text = ts.sys.readFile(this.fileName) || '';
+    }
+    return this.text;
+  }
+
+  /**
+   * @param {number} start
+   * @param {number} end
+   */
+  getText(start, end) {
+    return this.getFullText().substring(start, end);
+  }
+
+  getLength() {
+    return this.getFullText().length;
+  }
+
+  getChangeRange() {
+    // Forces a full reparse of changed files.
+    return undefined;
+  }
+}
+
+/**
+ * The most recently used programs, by key. A program that is replaced or
+ * dropped releases its source files from the `DocumentRegistry`, which removes
+ * those that no other retained program uses.
+ */
+class ProgramCache {
+  /**
+   * @param {ts.DocumentRegistry} documentRegistry
+   * @param {number} capacity
+   */
+  constructor(documentRegistry, capacity) {
+    this.documentRegistry = documentRegistry;
+    this.capacity = capacity;
+    /** @type {Map<string, ts.Program>} in order of use, the most recent last */
+    this.programs = new Map();
+  }
+
+  get size() {
+    return this.programs.size;
+  }
+
+  /**
+   * @param {string} key
+   * @return {ts.Program|undefined}
+   */
+  get(key) {
+    return this.programs.get(key);
+  }
+
+  /**
+   * @param {string} key
+   * @param {ts.Program} program
+   */
+  set(key, program) {
+    const previous = this.programs.get(key);
+    this.programs.delete(key);
+    if (previous && previous !== program) {
+      this.release(previous);
+    }
+    this.programs.set(key, program);
+    for (const [oldestKey, oldest] of this.programs) {
+      if (this.programs.size <= this.capacity) {
+        break;
+      }
+      this.programs.delete(oldestKey);
+      this.release(oldest);
+    }
+  }
+
+  /**
+   * Every program acquired each of its source files from the registry once.
+   *
+   * @param {ts.Program} program
+   */
+  release(program) {
+    const options = program.getCompilerOptions();
+    for (const sourceFile of program.getSourceFiles()) {
+      const {scriptKind} = /** @type {ts.SourceFile & {scriptKind: ts.ScriptKind}} */ (sourceFile);
+      this.documentRegistry.releaseDocument(sourceFile.fileName, options, scriptKind, sourceFile.impliedNodeFormat);
+    }
+  }
+}
+
+/**
+ * The compiler side of the server; one per worker thread.
+ */
+class Compiler {
+  constructor() {
+    this.documentRegistry = ts.createDocumentRegistry(ts.sys.useCaseSensitiveFileNames);
+    this.programs = new ProgramCache(this.documentRegistry, RETAINED_PROGRAMS);
+    this.typecheckPrograms = new ProgramCache(this.documentRegistry, RETAINED_TYPECHECK_PROGRAMS);
+    /** @type {Map<string, {stats: string, version: string}>} */
+    this.fileVersions = new Map();
+  }
+
+  /**
+   * @param {string} cwd
+   * @param {string} tsconfig
+   * @param {boolean} extendedDiagnostics whether to append counters like `tsc --extendedDiagnostics`
+   * @return {{returncode: number, output: string}}
+   */
+  compile(cwd, tsconfig, extendedDiagnostics) {
+    const startTime = performance.now();
+    /** @type {ts.Diagnostic[]} */
+    const configDiagnostics = [];
+    const parsed = this.parseConfig(cwd, tsconfig, configDiagnostics);
+    if (!parsed) {
+      return this.result(cwd, configDiagnostics, true);
+    }
+
+    const program = this.createProgram(cwd, this.programs, tsconfig, parsed, parsed.options, false);
+
+    const checkStartTime = performance.now();
+    const diagnostics = ts.getPreEmitDiagnostics(program).slice();
+    const emitStartTime = performance.now();
+    const {emitSkipped, diagnostics: emitDiagnostics} = program.emit();
+    diagnostics.push(...emitDiagnostics);
+    const result = this.result(cwd, diagnostics, emitSkipped);
+    if (extendedDiagnostics) {
+      const endTime = performance.now();
+      const sourceFiles = program.getSourceFiles();
+      const lines = sourceFiles.reduce((total, sourceFile) => total + sourceFile.getLineStarts().length, 0);
+      /** @param {number} ms */
+      const seconds = ms => `${(ms / 1000).toFixed(2)}s`;
+      result.output += [
+        `Files: ${sourceFiles.length}`,
+        `Lines: ${lines}`,
+        `Memory used: ${Math.round(process.memoryUsage().heapUsed / 1024)}K`,
+        `Check time: ${seconds(emitStartTime - checkStartTime)}`,
+        `Emit time: ${seconds(endTime - emitStartTime)}`,
+        `Total time: ${seconds(endTime - startTime)}`,
+      ].join(ts.sys.newLine) + ts.sys.newLine;
+    }
+    return result;
+  }
+
+  /**
+   * Type checks the project without emitting anything, for targets whose
+   * JavaScript is emitted by esbuild. Those don't have declaration files for
+   * their dependencies to use, so the program uses the sources of the
+   * referenced projects instead, like editors do. Only the project's own files
+   * are checked, though.
+   *
+   * @param {string} cwd
+   * @param {string} tsconfig
+   * @return {{returncode: number, output: string}}
+   */
+  typecheck(cwd, tsconfig) {
+    /** @type {ts.Diagnostic[]} */
+    const configDiagnostics = [];
+    const parsed = this.parseConfig(cwd, tsconfig, configDiagnostics);
+    if (!parsed) {
+      return this.result(cwd, configDiagnostics, true);
+    }
+
+    const options = {
+      ...parsed.options,
+      noEmit: true,
+      composite: false,
+      declaration: false,
+      emitDeclarationOnly: false,
+      incremental: false,
+      tsBuildInfoFile: undefined,
+    };
+    const program = this.createProgram(cwd, this.typecheckPrograms, tsconfig, parsed, options, true);
+
+    const diagnostics = [
+      ...program.getConfigFileParsingDiagnostics(),
+      ...program.getOptionsDiagnostics(),
+      ...program.getGlobalDiagnostics(),
+    ];
+    for (const fileName of parsed.fileNames) {
+      const sourceFile = program.getSourceFile(fileName);
+      if (sourceFile) {
+        diagnostics.push(...program.getSyntacticDiagnostics(sourceFile));
+        diagnostics.push(...program.getSemanticDiagnostics(sourceFile));
+      }
+    }
+    return this.result(cwd, diagnostics, true);
+  }
+
+  /**
+   * @param {string} cwd
+   * @param {string} tsconfig
+   * @param {ts.Diagnostic[]} configDiagnostics
+   * @return {ts.ParsedCommandLine|undefined}
+   */
+  parseConfig(cwd, tsconfig, configDiagnostics) {
+    return ts.getParsedCommandLineOfConfigFile(tsconfig, {}, {
+      ...ts.sys,
+      getCurrentDirectory: () => cwd,
+      onUnRecoverableConfigFileDiagnostic: diagnostic => configDiagnostics.push(diagnostic),
+    });
+  }
+
+  /**
+   * @param {string} cwd
+   * @param {ProgramCache} programs
+   * @param {string} programKey the key of the previous program to reuse
+   * @param {ts.ParsedCommandLine} parsed
+   * @param {ts.CompilerOptions} options
+   * @param {boolean} useSourceOfProjectReferences
+   * @return {ts.Program}
+   */
+  createProgram(cwd, programs, programKey, parsed, options, useSourceOfProjectReferences) {
+    const host = ts.createCompilerHost(options);
+    host.getCurrentDirectory = () => cwd;
+    host.getSourceFile = (fileName, languageVersionOrOptions, onError) => {
+      return this.acquireSourceFile(fileName, options, languageVersionOrOptions, onError);
+    };
+    if (useSourceOfProjectReferences) {
+      /** @type {ts.CompilerHost & {useSourceOfProjectReferenceRedirect: () => boolean}} */ (host)
+          .useSourceOfProjectReferenceRedirect = () => true;
+    }
+
+    const program = ts.createProgram({
+      rootNames: parsed.fileNames,
+      options,
+      projectReferences: parsed.projectReferences,
+      configFileParsingDiagnostics: ts.getConfigFileParsingDiagnostics(parsed),
+      host,
+      oldProgram: programs.get(programKey),
+    });
+    programs.set(programKey, program);
+    return program;
+  }
+
+  /**
+   * @param {string} fileName
+   * @param {ts.CompilerOptions} options
+   * @param {ts.ScriptTarget|ts.CreateSourceFileOptions} languageVersionOrOptions
+   * @param {((message: string) => void)|undefined} onError
+   * @return {ts.SourceFile|undefined}
+   */
+  acquireSourceFile(fileName, options, languageVersionOrOptions, onError) {
+    let stats;
+    try {
+      stats = fs.statSync(fileName);
+    } catch (e) {
+      if (onError) {
+        onError(e.message);
+      }
+      return undefined;
+    }
+    // Outputs of dependencies are rewritten in place, and `ts_library.py`
+    // gives a declaration file whose API didn't change its old timestamp back,
+    // even if its size is the same as well. The version is therefore a digest
+    // of the contents. Those are only read again once the file was touched,
+    // which always updates its ctime.
+    const fileStats = `${stats.mtimeMs}:${stats.ctimeMs}:${stats.size}`;
+    let fileVersion = this.fileVersions.get(fileName);
+    let text;
+    if (fileVersion?.stats !== fileStats) {
+      text = ts.sys.readFile(fileName) || '';
+      fileVersion = {stats: fileStats, version: crypto.createHash('sha1').update(text).digest('hex')};
+      this.fileVersions.set(fileName, fileVersion);
+    }
+    return this.documentRegistry.acquireDocument(
+        fileName, options, new LazyFileSnapshot(fileName, text), fileVersion.version, undefined,
+        languageVersionOrOptions);
+  }
+
+  /**
+   * @param {string} cwd
+   * @param {readonly ts.Diagnostic[]} diagnostics
+   * @param {boolean} emitSkipped
+   * @return {{returncode: number, output: string}}
+   */
+  result(cwd, diagnostics, emitSkipped) {
+    const sorted = ts.sortAndDeduplicateDiagnostics(diagnostics);
+    const errors = sorted.filter(d => d.category === ts.DiagnosticCategory.Error);
+    const output = ts.formatDiagnostics(sorted, {
+      getCanonicalFileName: fileName => fileName,
+      getCurrentDirectory: () => cwd,
+      getNewLine: () => ts.sys.newLine,
+    });
+    let returncode = ts.ExitStatus.Success;
+    if (errors.length) {
+      returncode = emitSkipped ? ts.ExitStatus.DiagnosticsPresent_OutputsSkipped :
+                                 ts.ExitStatus.DiagnosticsPresent_OutputsGenerated;
+    }
+    return {returncode, output};
+  }
+}
+
+/**
+ * @param {string} stamp
+ * @param {{returncode: number, output: string, generation: string}} result
+ */
+function writeTypecheckStamp(stamp, result) {
+  const temporary = `${stamp}.${process.pid}.tmp`;
+  fs.writeFileSync(temporary, JSON.stringify(result));
+  fs.renameSync(temporary, stamp);
+}
+
+/**
+ * @param {string} stamp
+ * @return {string|undefined} the generation of the type check that the stamp is for
+ */
+function readTypecheckGeneration(stamp) {
+  try {
+    return JSON.parse(fs.readFileSync(stamp, 'utf8')).generation;
+  } catch (e) {
+    return undefined;
+  }
+}
+
+/**
+ * Nobody is waiting for a background type check to fall back on, so a check
+ * that fails with an exception is recorded as a failed check.
+ *
+ * Once the target is built again, the stamp is for the type check that that
+ * build queued, so a check of an older generation is skipped, and its result
+ * is dropped if it only finishes after that.
+ *
+ * @param {Compiler} compiler
+ * @param {string} cwd
+ * @param {string} tsconfig
+ * @param {string} stamp
+ * @param {string} generation
+ * @return {{returncode: number, output: string}}
+ */
+function typecheckToStamp(compiler, cwd, tsconfig, stamp, generation) {
+  if (readTypecheckGeneration(stamp) !== generation) {
+    return {returncode: 0, output: ''};
+  }
+  let result;
+  try {
+    result = compiler.typecheck(cwd, tsconfig);
+  } catch (e) {
+    result = {returncode: 1, output: `Type checking failed: ${e && e.stack || e}\n`};
+  }
+  if (readTypecheckGeneration(stamp) === generation) {
+    writeTypecheckStamp(stamp, {...result, generation});
+  }
+  return result;
+}
+
+function runWorker() {
+  // Background type checks must not slow down the rest of the build. On
+  // Linux, priorities are per thread, so this only affects this worker.
+  if (workerData?.lowPriority && process.platform === 'linux') {
+    os.setPriority(os.constants.priority.PRIORITY_LOW);
+  }
+  const compiler = new Compiler();
+  parentPort?.on('message', ({id, cwd, tsconfig, extendedDiagnostics, typecheckStamp, typecheckGeneration}) => {
+    let result;
+    try {
+      if (typecheckStamp) {
+        result = typecheckToStamp(compiler, cwd, tsconfig, typecheckStamp, typecheckGeneration);
+      } else {
+        result = compiler.compile(cwd, tsconfig, Boolean(extendedDiagnostics));
+      }
+    } catch (e) {
+      // Reported separately from compile errors, so that the client can fall
+      // back to running tsc itself.
+      result = {error: String(e && e.stack || e)};
+    }
+    parentPort?.postMessage({id, ...result});
+  });
+}
+
+/**
+ * Hands out requests to the first idle worker, in the order they came in.
+ */
+class WorkerPool {
+  /**
+   * @param {number} size
+   * @param {boolean} lowPriority
+   */
+  constructor(size, lowPriority) {
+    /** @type {Worker[]} */
+    this.idle = [];
+    /** @type {Function[]} */
+    this.drainCallbacks = [];
+    /** @type {{request: Object, resolve: Function}[]} */
+    this.queue = [];
+    /** @type {Map<number, Function>} */
+    this.callbacks = new Map();
+    this.nextId = 0;
+    for (let i = 0; i < size; i++) {
+      const worker = new Worker(__filename, {workerData: {lowPriority}});
+      worker.on('message', ({id, ...result}) => {
+        const resolve = this.callbacks.get(id);
+        this.callbacks.delete(id);
+        this.idle.push(worker);
+        this.dispatch();
+        resolve?.(result);
+        if (!this.callbacks.size && !this.queue.length) {
+          this.drainCallbacks.splice(0).forEach(callback => callback());
+        }
+      });
+      worker.on('error', error => {
+        process.stderr.write(`tsc_server: worker failed: ${error.stack}\n`);
+        process.exit(1);
+      });
+      this.idle.push(worker);
+    }
+  }
+
+  /**
+   * @param {Object} request
+   * @return {Promise<Object>}
+   */
+  compile(request) {
+    return new Promise(resolve => {
+      this.queue.push({request, resolve});
+      this.dispatch();
+    });
+  }
+
+  /**
+   * @return {Promise<void>} resolved once all requests so far are done
+   */
+  drain() {
+    if (!this.callbacks.size && !this.queue.length) {
+      return Promise.resolve();
+    }
+    return new Promise(resolve => this.drainCallbacks.push(resolve));
+  }
+
+  dispatch() {
+    while (this.idle.length && this.queue.length) {
+      const worker = this.idle.pop();
+      const {request, resolve} = this.queue.shift() || {};
+      const id = this.nextId++;
+      this.callbacks.set(id, /** @type {Function} */ (resolve));
+      worker?.postMessage({id, ...request});
+    }
+  }
+}
+
+/**
+ * @typedef {{cwd: string, tsconfig: string, extendedDiagnostics?: boolean, typecheckStamp?: string, typecheckGeneration?: string, wait?: boolean}} Request
+ */
+
+function runServer() {
+  const cpus = os.cpus().length;
+  const options = parseArguments(process.argv.slice(2), {
+    jobs: cpus,
+    'typecheck-jobs': Math.max(1, Math.floor(cpus / 2)),
+  });
+  serve(options, () => {
+    const pool = new WorkerPool(Math.max(1, options.extra.jobs), false);
+    /** @type {WorkerPool|undefined} */
+    let typecheckPool;
+    return (/** @type {Request} */ request) => {
+      // Waits for the type checks queued so far, so that their stamps can be
+      // read.
+      if (request.wait) {
+        return (typecheckPool?.drain() || Promise.resolve()).then(() => ({returncode: 0, output: ''}));
+      }
+      // Type checks run in the background, on a pool of their own; the client
+      // gets its answer as soon as the type check is queued.
+      if (request.typecheckStamp) {
+        typecheckPool ??= new WorkerPool(Math.max(1, options.extra['typecheck-jobs']), true);
+        void typecheckPool.compile({
+          cwd: request.cwd,
+          tsconfig: request.tsconfig,
+          typecheckStamp: request.typecheckStamp,
+          typecheckGeneration: request.typecheckGeneration,
+        });
+        return Promise.resolve({returncode: 0, output: ''});
+      }
+      return pool.compile({
+        cwd: request.cwd,
+        tsconfig: request.tsconfig,
+        extendedDiagnostics: request.extendedDiagnostics,
+      });
+    };
+  });
+}
+
+/**
+ * Type checks a single project like the server does in the background, for
+ * when the server can't be reached:
+ * $ node tsc_server.js --typecheck <cwd> <tsconfig> <stamp> <generation>
+ *
+ * @param {string[]} argv
+ */
+function runTypecheckOnce([cwd, tsconfig, stamp, generation]) {
+  const {returncode} = typecheckToStamp(new Compiler(), cwd, tsconfig, stamp, generation);
+  process.exitCode = returncode;
+}
+
+if (require.main === module) {
+  if (isMainThread && process.argv[2] === '--typecheck') {
+    runTypecheckOnce(process.argv.slice(3));
+  } else if (isMainThread) {
+    runServer();
+  } else {
+    runWorker();
+  }
+}
+
+module.exports = {Compiler, RETAINED_PROGRAMS, RETAINED_TYPECHECK_PROGRAMS};
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""
+Wait for the background type checks of a build and report their errors.
+
+With `devtools_typecheck_in_background = true`, `ts_library` targets are
+emitted by esbuild and type checked in the background by the tsc server (see
+`ts_library.py`). This script waits until the server has finished the type
+checks queued so far, then reports every target of the current build whose type
+check failed or never finished. Type checks that never finished, e.g. because
+the server was stopped, are queued once more first. The script exits with a
+non-zero status if there were any failures.
+
+    scripts/build/typescript/wait_for_typecheck.py -C out/Default
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from os import path
+
+import ts_library
+
+
+# Stamps of targets that were removed or renamed stay behind in `gen/`, so only the tsconfigs that
+# are outputs of the current build graph are considered.
+def find_tsconfigs(build_directory):
+    ninja = 'autoninja.bat' if os.name == 'nt' else 'autoninja'
+    output = subprocess.check_output(
+        [ninja, '-C', build_directory, '-t', 'targets', 'all'],
+        cwd=ts_library.ROOT_DIRECTORY_OF_REPOSITORY,
+        universal_newlines=True)
+    for line in output.splitlines():
+        target, separator, _ = line.rpartition(': ')
+        if separator and target.endswith('-tsconfig.json'):
+            yield target
+
+
+def read_typecheck_stamp(tsconfig_location):
+    try:
+        with open(ts_library.typecheck_stamp_location(tsconfig_location),
+                  encoding="utf8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        # Not type checked in the background.
+        return None
+    except (OSError, ValueError):
+        return {'pending': True}
+
+
+def wait_for_server():
+    ts_library.request_from_build_server(ts_library.TSC_SERVER_LOCATION,
+                                         ts_library.tsc_server_socket_path(),
+                                         {'wait': True},
+                                         start_server=False,
+                                         timeout=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-C',
+                        '--build_directory',
+                        required=True,
+                        help='Ninja build directory, e.g. out/Default')
+    opts = parser.parse_args()
+
+    tsconfigs = sorted(find_tsconfigs(path.abspath(opts.build_directory)))
+    # The server is specific to the build directory it was started from.
+    os.chdir(opts.build_directory)
+    wait_for_server()
+
+    results = {}
+    for tsconfig_location in tsconfigs:
+        result = read_typecheck_stamp(tsconfig_location)
+        if result is not None and result.get('pending'):
+            ts_library.queue_background_typecheck(tsconfig_location)
+        results[tsconfig_location] = result
+    if any(result and result.get('pending') for result in results.values()):
+        wait_for_server()
+
+    checked = 0
+    failures = 0
+    for tsconfig_location, result in results.items():
+        if result is None:
+            continue
+        if result.get('pending'):
+            result = read_typecheck_stamp(tsconfig_location) or result
+        checked += 1
+        if result.get('pending'):
+            failures += 1
+            print('Type checking with tsconfig %s did not finish. '
+                  'Rebuild the target to check it again.' % tsconfig_location)
+            print('')
+        elif result.get('returncode'):
+            failures += 1
+            print('TypeScript compilation failed. Used tsconfig %s' %
+                  tsconfig_location)
+            print('')
+            print(ts_library.rewriteTypeScriptErrorPaths(result['output']))
+            print('')
+
+    if failures:
+        print('Type checking failed for %d of %d target(s).' %
+              (failures, checked))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
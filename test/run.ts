@@ -65,7 +65,7 @@ function runProcess(exe: string, args: string[], options: childProcess.SpawnSync
   return childProcess.spawnSync(exe, args, options);
 }
 
-function ninja(stdio: 'inherit'|'pipe', ...args: string[]) {
+function findBuildRoot() {
   let buildRoot = path.dirname(GEN_DIR);
   while (!fs.existsSync(path.join(buildRoot, 'args.gn'))) {
     const parent = path.dirname(buildRoot);
@@ -74,6 +74,11 @@ function ninja(stdio: 'inherit'|'pipe', ...args: string[]) {
     }
     buildRoot = parent;
   }
+  return buildRoot;
+}
+
+function ninja(stdio: 'inherit'|'pipe', ...args: string[]) {
+  const buildRoot = findBuildRoot();
   const ninjaCommand = os.platform() === 'win32' ? 'autoninja.bat' : 'autoninja';
   // autoninja can't always find ninja if not run from the checkout root, so
   // run it from there and pass the build root as an argument.
@@ -85,6 +90,36 @@ function ninja(stdio: 'inherit'|'pipe', ...args: string[]) {
   return {status, output};
 }
 
+function gnArg(name: string) {
+  const buildRoot = findBuildRoot();
+  const gnCommand = os.platform() === 'win32' ? 'gn.bat' : 'gn';
+  const result = runProcess(
+      gnCommand, ['args', buildRoot, `--list=${name}`, '--json'], {encoding: 'utf-8', cwd: CHECKOUT_ROOT, stdio: 'pipe'});
+  if (result.error) {
+    throw result.error;
+  }
+  if (result.status) {
+    throw new Error(`gn args failed:\n${result.stderr}`);
+  }
+  const [arg] = JSON.parse(result.stdout);
+  return arg && (arg.current ?? arg.default).value;
+}
+
+// With `devtools_typecheck_in_background`, the build finishes before its
+// TypeScript targets have been type checked, so wait for and report those.
+function waitForTypecheck() {
+  if (gnArg('devtools_typecheck_in_background') !== 'true') {
+    return 0;
+  }
+  const buildRoot = findBuildRoot();
+  const script = path.join(SOURCE_ROOT, 'scripts', 'build', 'typescript', 'wait_for_typecheck.py');
+  const result = runProcess('vpython3', [script, '-C', buildRoot], {encoding: 'utf-8', stdio: 'inherit'});
+  if (result.error) {
+    throw result.error;
+  }
+  return result.status;
+}
+
 class Tests {
   readonly suite: PathPair;
   readonly extraPaths: PathPair[];
@@ -240,6 +275,10 @@ function main() {
     if (status) {
       return status;
     }
+    const typecheckStatus = waitForTypecheck();
+    if (typecheckStatus) {
+      return typecheckStatus;
+    }
   }
 
   const suites = new Map<MochaTests, PathPair[]>();
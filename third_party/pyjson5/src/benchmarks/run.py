@@ -13,13 +13,45 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Benchmarks for json5.
+
+Each case is run a few times to warm up, then timed over a number of
+repetitions; the min, median and 90th percentile times are reported, along
+with the peak memory (from tracemalloc) of one more, separate run. For the
+loads cases on plain JSON files, the ratio of the median time to that of
+json.loads is reported too.
+
+Results can be saved with --output and used as the --baseline for a later
+run, which then fails if any case's median time has grown by more than
+--threshold percent.
+
+With --memory, nothing is timed; instead, every backend loads each file, and
+the peak and retained memory (from tracemalloc), the number of memory blocks
+left allocated, and the number of blocks allocated during the parse are
+reported. The last one shows the churn of short-lived objects, which doesn't
+show in the sizes: blocks are counted with sys.getallocatedblocks() at every
+function call and return, so it leaves out blocks that are freed again before
+the next one (and large allocations, which don't come from pymalloc), and is a
+lower bound. With --compare-rev, the json5 package as of a git revision is
+measured as well, e.g. to check a change to a parser against its previous
+version.
+"""
+
 from __future__ import print_function
 
 import argparse
+import importlib.util
+import io
 import json
 import os
+import re
+import shutil
+import subprocess
 import sys
+import tarfile
+import tempfile
 import time
+import tracemalloc
 
 THIS_DIR = os.path.abspath(os.path.dirname(__file__))
 REPO_DIR  = os.path.dirname(THIS_DIR)
@@ -35,57 +67,360 @@ ALL_BENCHMARKS = (
     'chromium.perf.json',
 )
 
-DEFAULT_ITERATIONS = 1
+# The Blink inputs that Chromium's devtools-frontend build scripts parse,
+# when pyjson5 is checked out as part of that tree.
+BLINK_DIR = os.path.join(REPO_DIR, '..', '..', 'blink', 'renderer', 'core')
+BLINK_INPUTS = (
+    os.path.join('css', 'css_properties.json5'),
+    os.path.join('html', 'aria_properties.json5'),
+    os.path.join('frame', 'deprecation', 'deprecation.json5'),
+)
+
+DEFAULT_WARMUP = 1
+DEFAULT_REPETITIONS = 5
+DEFAULT_THRESHOLD = 10.0
+
 
 def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--pure', action='store_true')
-    parser.add_argument('-n', '--num-iterations', default=DEFAULT_ITERATIONS,
-                        type=int)
-    parser.add_argument('benchmarks', nargs='*')
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pure', action='store_true',
+                        help='compare against the pure Python JSON decoder')
+    parser.add_argument('--try-json', action='store_true',
+                        help='let json5 try the C JSON decoder first')
+    parser.add_argument('--backend', default=json5.lib.DEFAULT_BACKEND,
+                        choices=json5.lib._BACKENDS,
+                        help='json5 parser to benchmark')
+    parser.add_argument('--memory', action='store_true',
+                        help='report the memory each backend allocates '
+                             'to load the files, instead of timing them')
+    parser.add_argument('--compare-rev', metavar='REV',
+                        help='with --memory, also report the json5 package '
+                             'as of the git revision REV')
+    parser.add_argument('-n', '--repetitions', default=DEFAULT_REPETITIONS,
+                        type=int, help='timed runs per case (default: '
+                                       '%(default)s)')
+    parser.add_argument('-w', '--warmup', default=DEFAULT_WARMUP, type=int,
+                        help='untimed runs per case (default: %(default)s)')
+    parser.add_argument('-k', '--filter', metavar='REGEX',
+                        help='only run the cases whose names match')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('-b', '--baseline', metavar='FILE',
+                        help='compare against results saved with --output')
+    parser.add_argument('-t', '--threshold', default=DEFAULT_THRESHOLD,
+                        type=float,
+                        help='percentage by which a median may exceed the '
+                             'baseline (default: %(default)s)')
+    parser.add_argument('benchmarks', nargs='*',
+                        help='files to run the loads and dumps cases on '
+                             '(default: the files in this directory and '
+                             'the Blink inputs, if present)')
     args = parser.parse_args()
-    if not args.benchmarks:
-        args.benchmarks = [os.path.join(THIS_DIR, d) for d in ALL_BENCHMARKS]
-
-    file_contents = []
-    for f in args.benchmarks:
-        with open(f) as fp:
-            file_contents.append(fp.read())
-
-
-    # json.decoder.c_scanstring = py_scanstring
-    def py_maker(*_args, **_kwargs):
-        decoder = json.JSONDecoder()
-        decoder.scan_once = json.scanner.py_make_scanner(decoder)
-        decoder.parse_string = json.decoder.py_scanstring
-        json.decoder.scanstring = decoder.parse_string
-        return decoder
-
-    maker = py_maker if args.pure else json.JSONDecoder
-
-    all_times = []
-    for i, c in enumerate(file_contents):
-        times = []
-        for _ in range(args.num_iterations):
-            start = time.time()
-            json_obj = json.loads(c, cls=maker)
-            mid = time.time()
-            json5_obj = json5.loads(c)
-            end = time.time()
-
-            json_time = mid - start
-            json5_time = end - mid
-            times.append((json_time, json5_time))
-            assert(json5_obj == json_obj)
-        all_times.append(times)
-
-    for i, times in enumerate(all_times):
-        avg = sum((json5_time / json_time)
-                  for json_time, json5_time in times) / args.num_iterations
-        print("%-20s: %5.1f" % (args.benchmarks[i], avg))
 
+    if args.memory:
+        _report_memory(args)
+        return 0
+
+    cases = _cases(args)
+    if args.filter:
+        cases = [c for c in cases if re.search(args.filter, c[0])]
+
+    results = {}
+    for name, fn, json_fn in cases:
+        result = _stats(_time(fn, args.warmup, args.repetitions))
+        result['peak_kib'] = _peak_kib(fn)
+        if json_fn:
+            json_times = _time(json_fn, args.warmup, args.repetitions)
+            result['vs_json'] = result['median'] / _stats(json_times)['median']
+        results[name] = result
+        _print_result(name, result)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({
+                'json5': json5.VERSION,
+                'python': sys.version.split()[0],
+                'backend': args.backend,
+                'try_json': args.try_json,
+                'results': results,
+            }, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)['results']
+        return compare(results, baseline, args.threshold)
     return 0
 
 
+def _cases(args):
+    """Returns a list of (name, fn, json_fn) tuples, where json_fn is the
+    equivalent json.loads call, if there is one."""
+
+    if args.pure:
+        maker = _py_maker
+    else:
+        maker = json.JSONDecoder
+
+    def loads(s):
+        return json5.loads(s, backend=args.backend, try_json=args.try_json)
+
+    cases = []
+    for path in _paths(args):
+        with open(path) as fp:
+            contents = fp.read()
+        name = os.path.basename(path)
+        json_fn = None
+        if path.endswith('.json'):
+            json_fn = lambda c=contents: json.loads(c, cls=maker)
+            assert loads(contents) == json_fn()
+        obj = loads(contents)
+        cases.append(('loads:' + name, lambda c=contents: loads(c), json_fn))
+        cases.append(('load_path:' + name,
+                      lambda p=path: json5.load_path(
+                          p, backend=args.backend, try_json=args.try_json),
+                      None))
+        cases.append(('dumps:' + name,
+                      lambda o=obj: json5.dumps(o, compact=True), None))
+
+        # A one-character edit in the middle of the document, just before
+        # the innermost node there.
+        doc = json5.spans.parse(contents)
+        _, span = doc.node_at(len(contents) // 2)
+        cases.append(('spans.parse:' + name,
+                      lambda c=contents: json5.spans.parse(c), None))
+        cases.append(('spans.reparse:' + name,
+                      lambda d=doc, s=span.start: json5.spans.reparse(
+                          d, s, s, ' '),
+                      None))
+
+    # Synthetic inputs that stress particular parts of the implementation.
+    # The scanner recurses on nested containers, so keep the loads depth
+    # well under the recursion limit.
+    deep = '{a:' * 200 + '[' * 200 + '1' + ']' * 200 + '}' * 200
+    escapes = '[%s]' % ','.join(
+        ['"\\t\\u00e9\\n\\\\ \\x41\\"\'"'] * 5000 +
+        ["'line\\\ncontinued \\u2028'"] * 5000)
+    comments = '\n'.join(
+        ['// leading comment'] + ['{'] +
+        ['  /* block %d */ k%d: %d, // trailing\n' % (i, i, i)
+         for i in range(5000)] + ['}'])
+    deep_obj = []
+    for _ in range(10000):
+        deep_obj = [deep_obj]
+    cases.extend([
+        ('loads:deep_nesting', lambda: loads(deep), None),
+        ('loads:escapes', lambda: loads(escapes), None),
+        ('loads:comments', lambda: loads(comments), None),
+        ('dumps:deep_nesting',
+         lambda: json5.dumps(deep_obj, compact=True), None),
+    ])
+    return cases
+
+
+def _paths(args):
+    if args.benchmarks:
+        return args.benchmarks
+    paths = [os.path.join(THIS_DIR, f) for f in ALL_BENCHMARKS]
+    paths += [p for p in (os.path.join(BLINK_DIR, f) for f in BLINK_INPUTS)
+              if os.path.exists(p)]
+    return paths
+
+
+def _report_memory(args):
+    packages = [(json5, '')]
+    tmpdir = None
+    try:
+        if args.compare_rev:
+            tmpdir = tempfile.mkdtemp()
+            packages.append((_import_json5_at(args.compare_rev, tmpdir),
+                             '@' + args.compare_rev))
+        for path in _paths(args):
+            name = 'loads:' + os.path.basename(path)
+            if args.filter and not re.search(args.filter, name):
+                continue
+            with open(path) as fp:
+                contents = fp.read()
+            for package, suffix in packages:
+                for backend, fn in _loads_fns(package, contents, args):
+                    print('%-36s %-16s %s' % (name, backend + suffix,
+                                              _format_memory(_memory(fn))))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+
+def _import_json5_at(rev, tmpdir):
+    """Imports the json5 package as of the git revision rev, from a copy in
+    tmpdir, under the name json5_at_rev."""
+    # `git archive` only archives the current directory when it isn't run
+    # from the top of the checkout.
+    top, prefix = subprocess.check_output(
+        ['git', 'rev-parse', '--show-toplevel', '--show-prefix'],
+        cwd=REPO_DIR,
+        universal_newlines=True).splitlines()
+    archive = subprocess.check_output(
+        ['git', 'archive', '%s:%sjson5' % (rev, prefix)], cwd=top)
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(tmpdir)
+    spec = importlib.util.spec_from_file_location(
+        'json5_at_rev', os.path.join(tmpdir, '__init__.py'),
+        submodule_search_locations=[tmpdir])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = package
+    spec.loader.exec_module(package)
+    return package
+
+
+def _loads_fns(package, contents, args):
+    """Returns a (backend, fn) pair for each backend of the package, where fn
+    loads contents with it. Revisions from before there were several
+    backends only have the PEG parser."""
+    backends = getattr(package.lib, '_BACKENDS', None)
+    if backends is None:
+        return [('peg', lambda: package.loads(contents))]
+    fns = []
+    for backend in backends:
+        try_json = args.try_json and backend == 'scanner'
+        fns.append((backend,
+                    lambda b=backend, t=try_json: package.loads(
+                        contents, backend=b, try_json=t)))
+    return fns
+
+
+def _memory(fn):
+    """Returns the peak and retained sizes (in KiB) of the memory fn
+    allocates, the number of blocks it leaves allocated, which is about one
+    per object of the result, and the number of blocks it allocates along
+    the way (see _count_allocated_blocks())."""
+    allocated_blocks = _count_allocated_blocks(fn)
+    tracemalloc.start()
+    try:
+        obj = fn()
+        snapshot = tracemalloc.take_snapshot()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj
+    snapshot = snapshot.filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)])
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return {
+        'peak_kib': peak / 1024.0,
+        'retained_kib': retained / 1024.0,
+        'retained_blocks': blocks,
+        'allocated_blocks': allocated_blocks,
+    }
+
+
+def _count_allocated_blocks(fn):
+    """Returns the number of blocks that fn allocates, summing up the
+    increases of sys.getallocatedblocks() from one function call or return
+    to the next."""
+    state = [sys.getallocatedblocks(), 0]
+
+    def profile(_frame, _event, _arg):
+        blocks = sys.getallocatedblocks()
+        if blocks > state[0]:
+            state[1] += blocks - state[0]
+        state[0] = blocks
+
+    sys.setprofile(profile)
+    try:
+        obj = fn()
+    finally:
+        sys.setprofile(None)
+    del obj
+    return state[1]
+
+
+def _format_memory(memory):
+    return ('peak %9.1f KiB  retained %9.1f KiB  %8d blocks  '
+            '%9d allocated' % (memory['peak_kib'], memory['retained_kib'],
+                               memory['retained_blocks'],
+                               memory['allocated_blocks']))
+
+
+def _py_maker(*_args, **_kwargs):
+    decoder = json.JSONDecoder()
+    decoder.scan_once = json.scanner.py_make_scanner(decoder)
+    decoder.parse_string = json.decoder.py_scanstring
+    json.decoder.scanstring = decoder.parse_string
+    return decoder
+
+
+def _time(fn, warmup, repetitions):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _stats(times):
+    times = sorted(times)
+    return {
+        'min': times[0],
+        'median': _percentile(times, 50),
+        'p90': _percentile(times, 90),
+    }
+
+
+def _percentile(sorted_times, pct):
+    # Linear interpolation between the closest ranks.
+    k = (len(sorted_times) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_times) - 1)
+    return sorted_times[lo] + (sorted_times[hi] - sorted_times[lo]) * (k - lo)
+
+
+def _peak_kib(fn):
+    # Measured separately, since tracing slows everything down.
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024.0
+
+
+def _print_result(name, result):
+    line = '%-36s min %8.2fms  median %8.2fms  p90 %8.2fms  peak %9.1f KiB' % (
+        name, result['min'] * 1000, result['median'] * 1000,
+        result['p90'] * 1000, result['peak_kib'])
+    if 'vs_json' in result:
+        line += '  %6.1fx json' % result['vs_json']
+    print(line)
+
+
+def compare(results, baseline, threshold, metric='median', label='median',
+            scale=1000.0):
+    """Prints the cases whose metric grew by more than threshold percent over
+    the baseline, and returns 1 if there are any, else 0. Values are printed
+    as milliseconds, after being multiplied by scale. Also used by
+    startup.py."""
+    regressions = 0
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        old, new = baseline[name][metric], result[metric]
+        change = (new - old) / old * 100.0
+        if change > threshold:
+            regressions += 1
+            print('REGRESSION: %s %s %.2fms -> %.2fms (%+.1f%%)' % (
+                name, label, old * scale, new * scale, change))
+    if regressions:
+        print('%d case(s) regressed by more than %.1f%%' % (regressions,
+                                                             threshold))
+        return 1
+    print('No regressions of more than %.1f%%' % threshold)
+    return 0
+
 if __name__ == '__main__':
     sys.exit(main())
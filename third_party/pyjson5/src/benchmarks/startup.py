@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Startup-time benchmarks for json5.
+
+Each case is a snippet that is run in a fresh interpreter with
+`-X importtime` a number of times; the median of the cumulative import
+time of every json5 module (and of the modules they pull in) is reported,
+along with the median wall time of the whole process.
+
+Results can be saved with --output and used as the --baseline for a later
+run, which then fails if any case's median import time has grown by more
+than --threshold percent.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import run
+
+THIS_DIR = os.path.abspath(os.path.dirname(__file__))
+REPO_DIR = os.path.dirname(THIS_DIR)
+
+CASES = (
+    ('import', 'import json5'),
+    ('loads', 'import json5; json5.loads("{a: 1}")'),
+    ('load_cached', 'import json5; json5.load_cached'),
+    ('dumps', 'import json5; json5.dumps({"a": 1}, compact=True)'),
+    ('tool', 'import json5.tool'),
+)
+
+DEFAULT_REPETITIONS = 10
+DEFAULT_THRESHOLD = 10.0
+
+# A line of -X importtime output: "import time: self | cumulative | name".
+_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--repetitions', default=DEFAULT_REPETITIONS,
+                        type=int, help='runs per case (default: '
+                                       '%(default)s)')
+    parser.add_argument('-k', '--filter', metavar='REGEX',
+                        help='only run the cases whose names match')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='also list the slowest modules of each case')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('-b', '--baseline', metavar='FILE',
+                        help='compare against results saved with --output')
+    parser.add_argument('-t', '--threshold', default=DEFAULT_THRESHOLD,
+                        type=float,
+                        help='percentage by which a median may exceed the '
+                             'baseline (default: %(default)s)')
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in CASES:
+        if args.filter and not re.search(args.filter, name):
+            continue
+        runs = [_run(code) for _ in range(args.repetitions)]
+        result = {
+            'import_ms': _median([r[0] for r in runs]),
+            'wall_ms': _median([r[1] for r in runs]),
+        }
+        results[name] = result
+        print('%-12s import %7.2fms  wall %7.2fms  %s' % (
+            name, result['import_ms'], result['wall_ms'], code))
+        if args.verbose:
+            modules = runs[-1][2]
+            for module, self_ms in sorted(modules.items(),
+                                          key=lambda kv: -kv[1])[:10]:
+                print('    %7.2fms  %s' % (self_ms, module))
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({
+                'python': sys.version.split()[0],
+                'results': results,
+            }, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)['results']
+        return run.compare(results, baseline, args.threshold,
+                           metric='import_ms', label='import', scale=1.0)
+    return 0
+
+
+def _run(code):
+    """Returns the import time (in ms) of code's top-level imports, the
+    wall time of the process, and the self time of every module."""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(
+        [REPO_DIR] + [p for p in [env.get('PYTHONPATH')] if p])
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          env=env, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True,
+                          check=True)
+    wall = (time.perf_counter() - start) * 1000
+
+    # Modules imported by the interpreter itself come before the first
+    # json5 import; everything from there on is json5's doing (or the
+    # snippet's). Only top-level (unindented) entries are summed, since
+    # the cumulative times of those include the nested ones.
+    total = 0
+    modules = {}
+    started = False
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, module = m.groups()
+        if module == 'json5' or module.startswith('json5.'):
+            started = True
+        modules[module] = int(self_us) / 1000.0
+        if not indent:
+            total += int(cumulative_us)
+            if not started:
+                total = 0
+    return total / 1000.0, wall, modules
+
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
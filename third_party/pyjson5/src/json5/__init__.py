@@ -14,16 +14,64 @@
 
 """A pure Python implementation of the JSON5 configuration language."""
 
-from . import tool
-from .lib import load, loads, dump, dumps
+import importlib
+import sys
+
+from .errors import JSON5DecodeError
 from .version import VERSION
 
 
 __all__ = [
+    'JSON5DecodeError',
     'VERSION',
     'dump',
     'dumps',
+    'iterload',
     'load',
+    'load_cached',
+    'load_path',
     'loads',
+    'spans',
     'tool',
 ]
+
+# The functions below, and the submodules, are imported on first use (by
+# __getattr__()), so that importing the package stays cheap.
+_LAZY_FUNCTIONS = {
+    'dump': 'lib',
+    'dumps': 'lib',
+    'iterload': 'lib',
+    'load': 'lib',
+    'load_cached': 'cache',
+    'load_path': 'lib',
+    'loads': 'lib',
+}
+_SUBMODULES = frozenset([
+    'arg_parser', 'bytescanner', 'cache', 'encoder', 'errors', 'host', 'lib',
+    'parser', 'scanner', 'spans', 'stream', 'tool', 'version',
+])
+
+
+def __getattr__(name):
+    if name in _LAZY_FUNCTIONS:
+        module = importlib.import_module('.' + _LAZY_FUNCTIONS[name],
+                                         __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__,
+                                                                 name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_FUNCTIONS) | _SUBMODULES)
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__() is only called by Python 3.7 and later.
+    for _name in sorted(_LAZY_FUNCTIONS) + ['spans', 'tool']:
+        __getattr__(_name)
+    del _name
@@ -0,0 +1,259 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The scanner in scanner.py, for documents in UTF-8 encoded bytes.
+
+This is only used by lib.load_path(), so it's kept out of scanner.py to
+spare everything else the cost of compiling its patterns.
+"""
+
+import re
+import sys
+import unicodedata
+
+from .errors import JSON5DecodeError, LineIndex, unexpected
+from .scanner import (Scanner, _ESCAPE_CHARS, _HEX_DIGITS,
+                      _LINE_TERMINATORS, _NUMBER, _WHITESPACE,
+                      _ID_CONTINUE_CATEGORIES, _ID_START_CATEGORIES)
+
+
+if sys.version_info[0] < 3:
+    # pylint: disable=redefined-builtin
+    chr = unichr
+
+
+# The patterns in scanner.py, for UTF-8 encoded bytes, built from the same
+# character sets. Every non-ASCII character is a sequence of bytes >= 0x80,
+# so only the non-ASCII ones in those sets need spelling out.
+def _ascii(chars):
+    return b''.join(re.escape(c.encode('ascii')) for c in chars
+                    if c < u'\x80')
+
+
+def _non_ascii(chars):
+    return [re.escape(c.encode('utf-8')) for c in chars if c >= u'\x80']
+
+
+# A run of characters other than the ASCII ones in `excluded` and the line
+# terminators. The lead bytes of the non-ASCII line terminators are only
+# allowed when they don't start one.
+def _run(excluded):
+    leads = b''.join(sorted(set(c[:1] for c in _non_ascii(_LINE_TERMINATORS))))
+    other = b'[^' + _ascii(excluded + _LINE_TERMINATORS) + leads + b']*'
+    return (other + b'(?:(?!' + b'|'.join(_non_ascii(_LINE_TERMINATORS)) +
+            b')[' + leads + b']' + other + b')*')
+
+
+# A valid UTF-8 sequence for a non-ASCII character (and no surrogates), which
+# is what the codec accepts. Comments are skipped without being decoded, so
+# this is how their contents are validated.
+_UTF8_NON_ASCII = (
+    b'[\xc2-\xdf][\x80-\xbf]|\xe0[\xa0-\xbf][\x80-\xbf]'
+    b'|[\xe1-\xec\xee\xef][\x80-\xbf]{2}|\xed[\x80-\x9f][\x80-\xbf]'
+    b'|\xf0[\x90-\xbf][\x80-\xbf]{2}|[\xf1-\xf3][\x80-\xbf]{3}'
+    b'|\xf4[\x80-\x8f][\x80-\xbf]{2}')
+
+_B_WS = re.compile(
+    b'(?:[' + _ascii(_WHITESPACE) + b']+|' +
+    b'|'.join(_non_ascii(_WHITESPACE)) +
+    b'|//[^\x80-\xff' + _ascii(_LINE_TERMINATORS) + b']*(?:(?!' +
+    b'|'.join(_non_ascii(_LINE_TERMINATORS)) + b')(?:' + _UTF8_NON_ASCII +
+    b')[^\x80-\xff' + _ascii(_LINE_TERMINATORS) + b']*)*'
+    b'|/\\*[^*\x80-\xff]*(?:(?:\\*(?!/)|' + _UTF8_NON_ASCII +
+    b')[^*\x80-\xff]*)*\\*/)*')
+
+_B_NUMBER = re.compile(_NUMBER.pattern.encode('ascii'))
+
+_B_SQ_SIMPLE = re.compile(b"'(" + _run(u"'\\") + b")'")
+_B_DQ_SIMPLE = re.compile(b'"(' + _run(u'"\\') + b')"')
+_B_SQ_CHUNK = re.compile(b"(" + _run(u"'\\") + b")(['\\\\]?)")
+_B_DQ_CHUNK = re.compile(b'(' + _run(u'"\\') + b')(["\\\\]?)')
+
+_B_ESCAPE = re.compile(
+    b'\\\\(?:([bfnrtv\'"\\\\])|x([0-9a-fA-F]{2})|u([0-9a-fA-F]{4})'
+    b'|(\\r\\n|[' + _ascii(_LINE_TERMINATORS) + b']|' +
+    b'|'.join(_non_ascii(_LINE_TERMINATORS)) + b'))')
+
+_B_UNICODE_ESC = re.compile(b'\\\\u([0-9a-fA-F]{4})')
+_B_ASCII_IDENT = re.compile(b'[a-zA-Z$_][a-zA-Z0-9$_]*')
+_B_ASCII_ID_START = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ$_'
+
+
+class ByteScanner(Scanner):
+    """A Scanner for UTF-8 encoded bytes, or any buffer holding them (such
+    as an mmap).
+
+    The document is never decoded as a whole: only the strings, keys and
+    numbers in it are, as the values are constructed. Errors are reported
+    at the same (character) offsets as if the document had been decoded
+    first. The json_decoder argument isn't supported."""
+
+    _ws = _B_WS.match
+    _VALUE_STARTS = dict((c.encode('ascii'), kind)
+                         for c, kind in Scanner._VALUE_STARTS.items())
+    _KEYWORDS = dict((kind, (keyword.encode('ascii'), value))
+                     for kind, (keyword, value) in Scanner._KEYWORDS.items())
+    _OBJECT_TOKENS = tuple(t.encode('ascii') for t in Scanner._OBJECT_TOKENS)
+    _ARRAY_TOKENS = tuple(t.encode('ascii') for t in Scanner._ARRAY_TOKENS)
+    _COMMENT_START = Scanner._COMMENT_START.encode('ascii')
+    _HEX_ESCAPE = Scanner._HEX_ESCAPE.encode('ascii')
+    _UNICODE_ESCAPE = Scanner._UNICODE_ESCAPE.encode('ascii')
+    _HEX_DIGITS = frozenset(c.encode('ascii') for c in _HEX_DIGITS)
+
+    def __init__(self, msg, fname, dictify=dict, parse_float=float,
+                 parse_int=int, parse_constant=float, intern_keys=False,
+                 intern_strings=False):
+        super(ByteScanner, self).__init__(
+            u'', fname, dictify, parse_float, parse_int, parse_constant,
+            intern_keys=intern_keys, intern_strings=intern_strings)
+        self.msg = msg
+        self.end = len(msg)
+
+    def _error(self, expected):
+        # Only now is the whole document decoded, which raises
+        # UnicodeDecodeError if it isn't valid UTF-8, just as loads() would.
+        text = self.msg[:].decode('utf-8')
+        self.errpos = len(self.msg[:self.errpos].decode('utf-8', 'replace'))
+        lineno, colno = LineIndex(text).position(self.errpos)
+        return JSON5DecodeError(unexpected(text, self.errpos), self.fname,
+                                self.errpos, lineno, colno, expected)
+
+    def _decode_error(self):
+        # Report the first invalid byte of the document, as loads() does.
+        self.msg[:].decode('utf-8')
+
+    def _string(self, pos):
+        msg = self.msg
+        if msg[pos:pos + 1] == b"'":
+            m = _B_SQ_SIMPLE.match(msg, pos)
+            chunk = _B_SQ_CHUNK.match
+        else:
+            m = _B_DQ_SIMPLE.match(msg, pos)
+            chunk = _B_DQ_CHUNK.match
+        if m:
+            try:
+                return m.group(1).decode('utf-8'), m.end()
+            except UnicodeDecodeError:
+                self._decode_error()
+                raise
+
+        chunks = []
+        start = pos
+        pos += 1
+        while True:
+            m = chunk(msg, pos)
+            content, terminator = m.groups()
+            if content:
+                try:
+                    chunks.append(content.decode('utf-8'))
+                except UnicodeDecodeError:
+                    self._decode_error()
+                    raise
+            pos = m.end()
+            if not terminator:
+                self._fail(pos, (msg[start:start + 1].decode('ascii'),))
+            if terminator != b'\\':
+                return u''.join(chunks), pos
+            pos -= 1
+            m = _B_ESCAPE.match(msg, pos)
+            if not m:
+                self._bad_escape(pos)
+            ch, hex2, hex4, _ = m.groups()
+            if ch:
+                chunks.append(_ESCAPE_CHARS[ch.decode('ascii')])
+            elif hex2 or hex4:
+                chunks.append(chr(int(hex2 or hex4, base=16)))
+            pos = m.end()
+
+    def _number(self, pos):
+        m = _B_NUMBER.match(self.msg, pos)
+        if not m:
+            while self.msg[pos:pos + 1] == b'-':
+                pos += 1
+            if self.msg[pos:pos + 1] == b'+':
+                pos += 1
+            self._fail(pos, ('value',))
+        sign, hex_lit, dec_lit, name = m.groups()
+        sign = sign.decode('ascii')
+        end = m.end()
+        if hex_lit:
+            hex_lit = hex_lit.decode('ascii')
+            if sign:
+                return self.parse_int(sign + '0x' + hex_lit[2:]), end
+            return self.parse_int('0x' + hex_lit[2:], base=16), end
+        if dec_lit is not None:
+            if self._is_id_start(end):
+                self._fail(end, ('digit',))
+            v = sign + dec_lit.decode('ascii').replace('E', 'e')
+            if '.' in v or 'e' in v:
+                return self.parse_float(v), end
+            return self.parse_int(v), end
+        return self.parse_constant(sign + name.decode('ascii')), end
+
+    def _is_id_start(self, pos):
+        c = self.msg[pos:pos + 1]
+        if c and (c in _B_ASCII_ID_START or c == b'\\' or c >= b'\x80'):
+            return self._ident_char(pos, _ID_START_CATEGORIES)[0] is not None
+        return False
+
+    def _ident(self, pos):
+        msg = self.msg
+        m = _B_ASCII_IDENT.match(msg, pos)
+        if m:
+            pos = m.end()
+            c = msg[pos:pos + 1]
+            if c != b'\\' and not c >= b'\x80':
+                return m.group(0).decode('ascii'), pos
+            chars = [m.group(0).decode('ascii')]
+        else:
+            c, pos = self._ident_char(pos, _ID_START_CATEGORIES)
+            if c is None:
+                self._fail(pos, ('string', 'identifier'))
+            chars = [c]
+
+        while True:
+            c, pos = self._ident_char(pos, _ID_CONTINUE_CATEGORIES)
+            if c is None:
+                return u''.join(chars), pos
+            chars.append(c)
+
+    def _ident_char(self, pos, categories):
+        msg = self.msg
+        c = msg[pos:pos + 1]
+        if not c:
+            return None, pos
+        if c == b'\\':
+            m = _B_UNICODE_ESC.match(msg, pos)
+            if m:
+                return chr(int(m.group(1), base=16)), m.end()
+            return None, pos
+        if c < b'\x80':
+            if c in _B_ASCII_ID_START or (
+                    categories is _ID_CONTINUE_CATEGORIES and c.isdigit()):
+                return c.decode('ascii'), pos + 1
+            return None, pos
+
+        # Decode the one (multi-byte) character.
+        lead = ord(c)
+        end = pos + (2 if lead < 0xe0 else 3 if lead < 0xf0 else 4)
+        try:
+            c = msg[pos:end].decode('utf-8')
+        except UnicodeDecodeError:
+            return None, pos
+        if unicodedata.category(c) in categories:
+            return c, end
+        if (categories is _ID_CONTINUE_CATEGORIES and
+                c in (u'\u200c', u'\u200d')):
+            return c, end
+        return None, pos
@@ -0,0 +1,141 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An on-disk cache of parsed JSON5 documents.
+
+Entries are the marshalled Python values, stored under a hash of the
+document's bytes, so an unchanged file can be loaded without parsing it
+again. The cache is bounded in size; the least recently used entries are
+removed first.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+
+from .lib import loads
+from .version import VERSION
+
+
+# Bump this when a change to the parser changes what it returns for some
+# document without changing VERSION.
+_FORMAT = 2
+
+_SUFFIX = '.marshal'
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_replace = getattr(os, 'replace', os.rename)
+
+try:
+    _IMPLEMENTATION = sys.implementation.name
+except AttributeError:  # Python 2
+    import platform
+    _IMPLEMENTATION = platform.python_implementation().lower()
+
+
+def default_cache_dir():
+    """Returns $JSON5_CACHE_DIR, or a pyjson5 directory in the user's cache
+    directory."""
+    if os.environ.get('JSON5_CACHE_DIR'):
+        return os.environ['JSON5_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pyjson5')
+
+
+def load_cached(path, cache_dir=None, encoding=None,
+                max_bytes=DEFAULT_MAX_BYTES):
+    """Deserialize the JSON5 file at ``path``, reusing the value stored in
+    ``cache_dir`` (see default_cache_dir()) if the file hasn't changed.
+
+    The cache never holds more than about ``max_bytes`` bytes of entries.
+    Problems reading or writing the cache are ignored; the file is then
+    simply parsed. Only the default parse is cached, so none of the hooks
+    accepted by loads() are supported. Keys and short strings are interned
+    (see loads()); marshal preserves the sharing, so cached values share
+    them too."""
+
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    cache_dir = cache_dir or default_cache_dir()
+    entry = os.path.join(cache_dir, _key(data, encoding) + _SUFFIX)
+
+    try:
+        with open(entry, 'rb') as fp:
+            obj = marshal.load(fp)
+        os.utime(entry, None)
+        return obj
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        pass
+
+    obj = loads(data, encoding=encoding, intern_keys=True,
+                intern_strings=True)
+    try:
+        _store(cache_dir, entry, obj)
+        _evict(cache_dir, max_bytes)
+    except (IOError, OSError, ValueError):
+        pass
+    return obj
+
+
+def _key(data, encoding):
+    h = hashlib.sha256()
+    h.update(('%s:%d:%s:%d.%d:%d:%s\n' % (
+        VERSION, _FORMAT, _IMPLEMENTATION,
+        sys.version_info[0], sys.version_info[1], marshal.version,
+        encoding or 'utf-8')).encode('ascii'))
+    h.update(data)
+    return h.hexdigest()
+
+
+def _store(cache_dir, entry, obj):
+    # tempfile is slow to import, and only needed on a cache miss.
+    import tempfile
+
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            marshal.dump(obj, fp)
+        _replace(tmp, entry)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _evict(cache_dir, max_bytes):
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(_SUFFIX):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
@@ -0,0 +1,256 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An iterative JSON5 encoder.
+
+iterencode() produces the JSON5 text for a value as a sequence of chunks,
+walking nested containers with an explicit stack rather than by recursion,
+so that deeply nested values can be written out and the whole document
+never has to be held in memory at once.
+"""
+
+import math
+import re
+import sys
+
+
+if sys.version_info[0] < 3:
+    # pylint: disable=redefined-builtin,invalid-name
+    _INT_TYPES = (int, long)
+    _STRING_TYPES = (str, unicode)
+    str = unicode
+else:
+    _INT_TYPES = (int,)
+    _STRING_TYPES = (str,)
+
+
+_ASCII_IDENT = re.compile(r'[a-zA-Z$_][a-zA-Z0-9$_]*\Z')
+
+_ESCAPES = {
+    u'\\': u'\\\\',
+    u'"': u'\\"',
+    u"'": u"\\'",
+    u'\b': u'\\b',
+    u'\f': u'\\f',
+    u'\n': u'\\n',
+    u'\r': u'\\r',
+    u'\t': u'\\t',
+}
+_NEEDS_ESCAPE = {
+    u"'": re.compile(u"[\\\\'\x00-\x1f\u2028\u2029]"),
+    u'"': re.compile(u'[\\\\"\x00-\x1f\u2028\u2029]'),
+}
+
+# The number of pieces iterencode() joins into each chunk it yields.
+_BATCH = 1024
+
+# The number of distinct keys iterencode() remembers the encoding of.
+_MAX_KEYS = 4096
+
+
+def iterencode(obj, indent=None, sort_keys=False, quote=None):
+    """Yields the pieces of the JSON5 text for ``obj``.
+
+    With no ``indent``, no whitespace is emitted at all; otherwise each
+    element and member goes on its own line, indented by ``indent`` (a
+    string, or a number of spaces) per level. ``quote`` is the quote
+    character to use for all strings and keys that need one. By default,
+    strings are single-quoted unless they contain a single quote, and keys
+    are double-quoted.
+
+    Raises TypeError for values that aren't JSON5 serializable and
+    ValueError for circular references."""
+
+    if indent is not None and not isinstance(indent, _STRING_TYPES):
+        indent = u' ' * indent
+    colon = u':' if indent is None else u': '
+    if quote is None:
+        key_quote = u'"'
+    elif quote in _NEEDS_ESCAPE:
+        key_quote = quote
+    else:
+        raise ValueError('quote must be None, "\'" or \'"\'')
+
+    if not isinstance(obj, (dict, list)) or not obj:
+        yield _encode_value(obj, quote)
+        return
+
+    # One (is_dict, item iterator, container) frame per open container.
+    # `markers` holds the ids of the open containers, to detect cycles.
+    # Pieces are collected in `buf` and yielded in batches.
+    stack = []
+    markers = set()
+    buf = []
+    append = buf.append
+    keys = {}
+    sq_needs_escape = _NEEDS_ESCAPE[u"'"].search
+    value = obj
+    while True:
+        # `value` is a non-empty container; open it.
+        if id(value) in markers:
+            raise ValueError('Circular reference detected')
+        markers.add(id(value))
+        if isinstance(value, dict):
+            items = value.items()
+            if sort_keys:
+                items = sorted(items, key=lambda kv: kv[0])
+            stack.append((True, iter(items), value))
+            append(u'{')
+        else:
+            stack.append((False, iter(value), value))
+            append(u'[')
+        first = True
+
+        # Encode items until another container needs to be opened.
+        while stack:
+            is_dict, it, container = stack[-1]
+            if indent is None:
+                sep = u'' if first else u','
+                next_sep = u','
+            else:
+                next_sep = u'\n' + indent * len(stack)
+                sep = next_sep if first else u',' + next_sep
+                next_sep = u',' + next_sep
+            for item in it:
+                if is_dict:
+                    key, value = item
+                    # Only str keys are cached, since 1 == 1.0 == True.
+                    k = keys.get(key) if type(key) is str else None
+                    if k is None:
+                        k = _encode_key(key, key_quote) + colon
+                        if type(key) is str and len(keys) < _MAX_KEYS:
+                            keys[key] = k
+                    prefix = sep + k
+                else:
+                    value = item
+                    prefix = sep
+                sep = next_sep
+                t = type(value)
+                if t is str:
+                    if (quote is None and u"'" not in value and
+                            not sq_needs_escape(value)):
+                        append(prefix + u"'" + value + u"'")
+                    else:
+                        append(prefix + _encode_str(value, quote))
+                elif t is bool:
+                    append(prefix + (u'true' if value else u'false'))
+                elif t is int:
+                    append(prefix + int.__repr__(value))
+                elif value and (t is dict or t is list or
+                                isinstance(value, (dict, list))):
+                    append(prefix)
+                    break
+                else:
+                    append(prefix + _encode_value(value, quote))
+                if len(buf) >= _BATCH:
+                    yield u''.join(buf)
+                    del buf[:]
+            else:
+                stack.pop()
+                markers.discard(id(container))
+                if indent is not None:
+                    append(u'\n' + indent * len(stack))
+                append(u'}' if is_dict else u']')
+                first = False
+                continue
+            break
+        else:
+            yield u''.join(buf)
+            return
+
+
+def _encode_value(obj, quote):
+    # Encodes a scalar or an empty container.
+    if isinstance(obj, dict) and not obj:
+        return u'{}'
+    if isinstance(obj, list) and not obj:
+        return u'[]'
+    return _encode_scalar(obj, quote)
+
+
+def _encode_scalar(obj, quote):
+    if obj is True:
+        return u'true'
+    if obj is False:
+        return u'false'
+    if obj is None:
+        return u'null'
+    if isinstance(obj, _STRING_TYPES):
+        return _encode_str(obj, quote)
+    if isinstance(obj, float):
+        if math.isnan(obj):
+            return u'NaN'
+        if math.isinf(obj):
+            return u'Infinity' if obj > 0 else u'-Infinity'
+        return str(float.__repr__(obj))
+    if isinstance(obj, _INT_TYPES):
+        return str(int.__repr__(obj)) if isinstance(obj, int) else str(obj)
+    raise TypeError('Object of type %s is not JSON5 serializable' %
+                    type(obj).__name__)
+
+
+def _is_ident(s):
+    # A key is only written unquoted if it is an IdentifierName, with the
+    # same character classes as the scanner: \w also matches characters like
+    # u'\u00b2', which can't appear in one, and digits like u'\u0660',
+    # which can't start one.
+    if _ASCII_IDENT.match(s):
+        return True
+    if not s or max(s) < u'\x80':
+        return False
+
+    import unicodedata
+
+    from .scanner import (_ASCII_ID_START, _DIGITS, _ID_CONTINUE_CATEGORIES,
+                          _ID_START_CATEGORIES)
+
+    categories = _ID_START_CATEGORIES
+    for c in s:
+        if not (c in _ASCII_ID_START or
+                (categories is _ID_CONTINUE_CATEGORIES and
+                 (c in _DIGITS or c in (u'\u200c', u'\u200d'))) or
+                unicodedata.category(c) in categories):
+            return False
+        categories = _ID_CONTINUE_CATEGORIES
+    return True
+
+
+def _encode_key(key, quote):
+    if isinstance(key, _STRING_TYPES):
+        if _is_ident(key):
+            return key
+        return _encode_str(key, quote)
+    if key is True or key is False or key is None:
+        return _encode_scalar(key, quote)
+    if isinstance(key, _INT_TYPES) or isinstance(key, float):
+        return _encode_str(_encode_scalar(key, quote), quote)
+    raise TypeError('Keys must be strings, not %s' % type(key).__name__)
+
+
+def _encode_str(s, quote):
+    if quote is None:
+        # Use whichever quote doesn't need escaping, preferring "'".
+        if u"'" not in s:
+            quote = u"'"
+        else:
+            quote = u'"'
+    needs_escape = _NEEDS_ESCAPE[quote]
+    if needs_escape.search(s):
+        s = needs_escape.sub(_escape, s)
+    return quote + s + quote
+
+
+def _escape(m):
+    c = m.group(0)
+    return _ESCAPES.get(c) or u'\\u%04x' % ord(c)
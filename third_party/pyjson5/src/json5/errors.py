@@ -0,0 +1,69 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+
+
+class JSON5DecodeError(ValueError):
+    """Subclass of ValueError describing where a JSON5 document is invalid.
+
+    ``msg`` is the unformatted message (e.g. ``'Unexpected "x"'``), ``pos``
+    the 0-based offset into the document, ``lineno`` and ``colno`` the
+    1-based line and column of that offset, and ``expected`` a tuple naming
+    the tokens that would have been valid there (it may be empty)."""
+
+    def __init__(self, msg, fname, pos, lineno, colno, expected=()):
+        ValueError.__init__(self, '%s:%d %s at column %d' % (
+            fname, lineno, msg, colno))
+        self.msg = msg
+        self.fname = fname
+        self.pos = pos
+        self.lineno = lineno
+        self.colno = colno
+        self.expected = tuple(expected)
+
+    def __reduce__(self):
+        return self.__class__, (self.msg, self.fname, self.pos, self.lineno,
+                                self.colno, self.expected)
+
+
+def unexpected(doc, pos):
+    """Returns the ``msg`` for an error at offset ``pos`` in ``doc``."""
+    if pos >= len(doc):
+        return 'Unexpected end of input'
+    return 'Unexpected "%s"' % doc[pos]
+
+
+class LineIndex(object):
+    """Maps offsets in a string to 1-based line and column numbers.
+
+    The offsets of the line starts are found on the first lookup (with
+    str.find, so the scan runs in C), after which every lookup is a binary
+    search. Only '\\n' starts a new line."""
+
+    def __init__(self, text):
+        self.text = text
+        self._starts = None
+
+    def position(self, pos):
+        starts = self._starts
+        if starts is None:
+            starts = self._starts = [0]
+            find = self.text.find
+            i = find('\n')
+            while i != -1:
+                starts.append(i + 1)
+                i = find('\n', i + 1)
+        line = bisect.bisect_right(starts, pos) - 1
+        return line + 1, pos - starts[line] + 1
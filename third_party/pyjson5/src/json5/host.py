@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import fileinput
+import io
 import os
 import shutil
 import sys
@@ -52,6 +53,10 @@ class Host(object):
         stream.write(str(msg) + end)
         stream.flush()
 
+    def read_text_file(self, path):
+        with io.open(path, encoding='utf-8') as f:
+            return f.read()
+
     def rmtree(self, path):
         shutil.rmtree(path, ignore_errors=True)
 
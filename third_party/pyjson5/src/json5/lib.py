@@ -12,11 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import re
+import codecs
+import mmap
+import os
 import json
 import sys
 
-from .parser import Parser
+from .encoder import iterencode
+from .scanner import Scanner
+
+# The PEG parser, the bytes scanner and the streaming parser are imported
+# when they're first used, since most callers never need them.
 
 
 if sys.version_info[0] < 3:
@@ -24,8 +30,18 @@ if sys.version_info[0] < 3:
     str = unicode
 
 
+# The PEG parser, which follows json5.g, is the reference implementation;
+# the hand-written scanner accepts the same language and is much faster.
+# The PEG parser produces an AST that _walk_ast() turns into Python values,
+# while the scanner constructs the values as it goes.
+_BACKENDS = ('peg', 'scanner')
+DEFAULT_BACKEND = 'scanner'
+
+
 def load(fp, encoding=None, cls=None, object_hook=None, parse_float=None,
-         parse_int=None, parse_constant=None, object_pairs_hook=None):
+         parse_int=None, parse_constant=None, object_pairs_hook=None,
+         backend=DEFAULT_BACKEND, try_json=False, intern_keys=False,
+         intern_strings=False):
     """Deserialize ``fp`` (a ``.read()``-supporting file-like object
     containing a JSON document) to a Python object."""
 
@@ -33,15 +49,93 @@ def load(fp, encoding=None, cls=None, object_hook=None, parse_float=None,
     return loads(s, encoding=encoding, cls=cls, object_hook=object_hook,
                  parse_float=parse_float, parse_int=parse_int,
                  parse_constant=parse_constant,
-                 object_pairs_hook=object_pairs_hook)
+                 object_pairs_hook=object_pairs_hook, backend=backend,
+                 try_json=try_json, intern_keys=intern_keys,
+                 intern_strings=intern_strings)
+
+
+def load_path(path, encoding=None, cls=None, object_hook=None,
+              parse_float=None, parse_int=None, parse_constant=None,
+              object_pairs_hook=None, backend=DEFAULT_BACKEND,
+              try_json=False, intern_keys=False, intern_strings=False):
+    """Deserialize the JSON5 file at ``path`` to a Python object.
+
+    The file is memory-mapped rather than read in, and (with the default
+    backend, and unless ``try_json`` is given) a UTF-8 file is scanned as
+    bytes: only its strings, keys and numbers are decoded, so neither the
+    file's contents nor the decoded text of the whole document are ever
+    held in memory. Otherwise this is the same as load()."""
+
+    assert cls is None, 'Custom decoders are not supported'
+    if backend not in _BACKENDS:
+        raise ValueError('Unknown backend: %r' % (backend,))
+    kwargs = dict(encoding=encoding, object_hook=object_hook,
+                  parse_float=parse_float, parse_int=parse_int,
+                  parse_constant=parse_constant,
+                  object_pairs_hook=object_pairs_hook, backend=backend,
+                  try_json=try_json, intern_keys=intern_keys,
+                  intern_strings=intern_strings)
+    with open(path, 'rb') as fp:
+        if (backend != 'scanner' or try_json or
+                codecs.lookup(encoding or 'utf-8').name != 'utf-8' or
+                not os.fstat(fp.fileno()).st_size):
+            return load(fp, **kwargs)
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    from .bytescanner import ByteScanner
+
+    try:
+        scanner = ByteScanner(data, path,
+                              _dictify(object_hook, object_pairs_hook),
+                              parse_float or float, parse_int or int,
+                              parse_constant or _fp_constant_parser,
+                              intern_keys=intern_keys,
+                              intern_strings=intern_strings)
+        obj, err, _ = scanner.parse()
+    finally:
+        data.close()
+    if err:
+        raise err
+    return obj
 
 
 def loads(s, encoding=None, cls=None, object_hook=None, parse_float=None,
-          parse_int=None, parse_constant=None, object_pairs_hook=None):
+          parse_int=None, parse_constant=None, object_pairs_hook=None,
+          backend=DEFAULT_BACKEND, try_json=False, intern_keys=False,
+          intern_strings=False):
     """Deserialize ``s`` (a ``str`` or ``unicode`` instance containing a
-    JSON5 document) to a Python object."""
+    JSON5 document) to a Python object.
+
+    ``backend`` selects the parser implementation: ``'scanner'`` (the
+    default) or ``'peg'``, the slower parser generated from the grammar.
+
+    If ``try_json`` is true, the document (and, failing that, each nested
+    object and array) is first handed to the stdlib's C JSON decoder, and
+    only the parts that actually use JSON5 extensions are parsed as JSON5.
+    The result is the same either way. Only the scanner backend supports
+    this.
+
+    With ``intern_keys``, equal object keys are all the same ``str``
+    object, looked up in a table kept for the duration of the parse, so
+    they take up memory only once and compare faster; ``intern_strings``
+    does the same for string values of up to 32 characters. Only the
+    scanner backend supports these, and with ``try_json`` they don't apply
+    to the values decoded by the C decoder (which shares keys by itself).
+
+    Syntax errors raise JSON5DecodeError, a ValueError that also records
+    where the error is and what was expected there. The scanner reports
+    the first character that can't continue the document; the PEG parser
+    reports the furthest position it tried, which may be later, and
+    doesn't record what was expected (see scanner.py)."""
 
     assert cls is None, 'Custom decoders are not supported'
+    if backend not in _BACKENDS:
+        raise ValueError('Unknown backend: %r' % (backend,))
+    if try_json and backend != 'scanner':
+        raise ValueError('try_json is only supported by the scanner backend')
+    if (intern_keys or intern_strings) and backend != 'scanner':
+        raise ValueError('intern_keys and intern_strings are only supported '
+                         'by the scanner backend')
 
     if sys.version_info[0] < 3:
         decodable_type = type('')
@@ -53,26 +147,125 @@ def loads(s, encoding=None, cls=None, object_hook=None, parse_float=None,
 
     if not s:
         raise ValueError('Empty strings are not legal JSON5')
-    parser = Parser(s, '<string>')
-    ast, err, newpos = parser.parse()
-    if err:
-        raise ValueError(err)
 
-    def _fp_constant_parser(s):
-        return float(s.replace('Infinity', 'inf').replace('NaN', 'nan'))
+    dictify = _dictify(object_hook, object_pairs_hook)
 
-    if object_pairs_hook:
-        dictify = object_pairs_hook
-    elif object_hook:
-        dictify = lambda pairs: object_hook(dict(pairs))
-    else:
-        dictify = dict
+    json_decoder = None
+    if try_json:
+        json_decoder = _json_decoder(object_hook, parse_float, parse_int,
+                                     parse_constant, object_pairs_hook)
 
     parse_float = parse_float or float
     parse_int = parse_int or int
     parse_constant = parse_constant or _fp_constant_parser
 
-    return _walk_ast(ast, dictify, parse_float, parse_int, parse_constant)
+    if backend == 'peg':
+        from .parser import Parser
+        ast, err, _ = Parser(s, '<string>').parse()
+        if err:
+            raise err
+        return _walk_ast(ast, dictify, parse_float, parse_int, parse_constant)
+
+    scanner = Scanner(s, '<string>', dictify, parse_float, parse_int,
+                      parse_constant, json_decoder=json_decoder,
+                      intern_keys=intern_keys, intern_strings=intern_strings)
+    obj, err, _ = scanner.parse()
+    if err:
+        raise err
+    return obj
+
+
+def iterload(fp, encoding=None, object_hook=None, parse_float=None,
+             parse_int=None, parse_constant=None, object_pairs_hook=None,
+             chunk_size=65536):
+    """Incrementally deserialize the JSON5 document in ``fp``.
+
+    ``fp`` is read ``chunk_size`` characters (or bytes, which are decoded
+    with ``encoding``) at a time. If the document is an array, each element
+    is yielded as soon as it is complete, so only one element at a time is
+    held in memory; otherwise the single top-level value is yielded. The
+    parser does not recurse, so arbitrarily deep nesting is fine."""
+
+    from .stream import StreamParser
+
+    dictify = _dictify(object_hook, object_pairs_hook)
+
+    parser = StreamParser(parse_float=parse_float or float,
+                          parse_int=parse_int or int,
+                          parse_constant=(parse_constant or
+                                          _fp_constant_parser))
+    decoder = None
+
+    # Each entry is the list of values (or key/value pairs) of an open
+    # container, followed by the key most recently seen in it.
+    stack = []
+    top_level_array = False
+    while True:
+        chunk = fp.read(chunk_size)
+        data = chunk
+        if not isinstance(data, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding or 'utf-8')()
+            data = decoder.decode(chunk, final=not chunk)
+        events = parser.feed(data)
+        if not chunk:
+            events += parser.close()
+
+        for event, value in events:
+            if event == 'start_map' or event == 'start_array':
+                if not stack and not top_level_array and (
+                        event == 'start_array'):
+                    top_level_array = True
+                    continue
+                stack.append([[], None])
+                continue
+            if event == 'map_key':
+                stack[-1][1] = value
+                continue
+            if event == 'end_map':
+                value = dictify(stack.pop()[0])
+            elif event == 'end_array':
+                if not stack:
+                    continue
+                value = stack.pop()[0]
+
+            if stack:
+                container = stack[-1]
+                if container[1] is None:
+                    container[0].append(value)
+                else:
+                    container[0].append((container[1], value))
+                    container[1] = None
+            else:
+                yield value
+
+        if not chunk:
+            return
+
+
+def _dictify(object_hook, object_pairs_hook):
+    if object_pairs_hook:
+        return object_pairs_hook
+    if object_hook:
+        return lambda pairs: object_hook(dict(pairs))
+    return dict
+
+
+def _fp_constant_parser(s):
+    return float(s.replace('Infinity', 'inf').replace('NaN', 'nan'))
+
+
+def _json_decoder(object_hook, parse_float, parse_int, parse_constant,
+                  object_pairs_hook):
+    if parse_float:
+        # The JSON5 grammar normalizes exponents to a lowercase 'e' before
+        # they reach parse_float; the json module passes the literal text.
+        user_parse_float = parse_float
+        parse_float = lambda s: user_parse_float(s.replace('E', 'e'))
+    return json.JSONDecoder(object_hook=object_hook, parse_float=parse_float,
+                            parse_int=parse_int,
+                            parse_constant=parse_constant,
+                            object_pairs_hook=object_pairs_hook)
 
 
 def _walk_ast(el, dictify, parse_float, parse_int, parse_constant):
@@ -107,53 +300,32 @@ def _walk_ast(el, dictify, parse_float, parse_int, parse_constant):
     raise Exception('unknown el: ' + el)  # pragma: no cover
 
 
-_notletter = re.compile('\W')
-
-
-def _dumpkey(k):
-    if _notletter.search(k):
-        return json.dumps(k)
-    else:
-        return str(k)
-
-
 def dumps(obj, compact=False, as_json=False, **kwargs):
-    """Serialize ``obj`` to a JSON5-formatted ``str``."""
+    """Serialize ``obj`` to a JSON5-formatted ``str``.
+
+    Unless ``compact`` is true (or ``as_json`` is), this is just
+    json.dumps(). With ``compact``, the JSON5 encoder is used instead: it
+    leaves out all whitespace and quotes only the keys that need it. It
+    also accepts ``indent``, ``sort_keys`` and ``quote`` (see
+    encoder.iterencode()) and never recurses, so deep values are fine."""
 
     if as_json or not compact:
         return json.dumps(obj, **kwargs)
-
-    t = type(obj)
-    if obj == True:
-        return u'true'
-    elif obj == False:
-        return u'false'
-    elif obj == None:
-        return u'null'
-    elif t == type('') or t == type(u''):
-        single = "'" in obj
-        double = '"' in obj
-        if single and double:
-            return json.dumps(obj)
-        elif single:
-            return '"' + obj + '"'
-        else:
-            return "'" + obj + "'"
-    elif t is float or t is int:
-        return str(obj)
-    elif t is dict:
-        return u'{' + u','.join([
-            _dumpkey(k) + u':' + dumps(v) for k, v in obj.items()
-        ]) + '}'
-    elif t is list:
-        return u'[' + ','.join([dumps(el) for el in obj]) + u']'
-    else:  # pragma: no cover
-        return u''
+    return u''.join(iterencode(obj, **kwargs))
 
 
 def dump(obj, fp, **kwargs):
     """Serialize ``obj`` to a JSON5-formatted stream to ``fp`` (a ``.write()``-
-    supporting file-like object)."""
+    supporting file-like object).
+
+    With ``compact``, the text is written out in pieces as it is produced,
+    so only a bounded amount of it is held in memory at a time."""
+
+    compact = kwargs.pop('compact', False)
+    as_json = kwargs.pop('as_json', False)
+    if as_json or not compact:
+        fp.write(str(json.dumps(obj, **kwargs)))
+        return
 
-    s = dumps(obj, **kwargs)
-    fp.write(str(s))
+    for chunk in iterencode(obj, **kwargs):
+        fp.write(chunk)
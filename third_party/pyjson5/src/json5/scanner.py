@@ -0,0 +1,439 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A hand-written, regex-driven scanner for JSON5.
+
+This accepts the same language as the PEG parser in parser.py
+(which follows json5.g and is kept around as the reference
+implementation), but it tokenizes with compiled regular expressions instead
+of dispatching a method call per character, and it constructs the Python
+values as it goes instead of building an AST for lib._walk_ast().
+
+Syntax errors are reported at the first character that can't continue the
+document, along with the tokens that could have: '[1 2]' fails at the "2",
+where ',' or ']' was expected. The PEG parser reports the furthest position
+that any of the alternatives it tried got to instead, which is often later
+('[1 2]' fails at the "]" there, since "2" could have continued a number),
+so the two backends can report different positions and messages for the same
+document. They agree on errors inside strings and escape sequences, and on
+unterminated strings and block comments, which both report at the end of the
+input. Malformed numbers like '1e' and '.' are syntax errors here; the PEG
+parser accepts them and then fails to convert them with a plain ValueError.
+"""
+
+import re
+import sys
+import unicodedata
+
+from .errors import JSON5DecodeError, LineIndex, unexpected
+
+
+if sys.version_info[0] < 3:
+    # pylint: disable=redefined-builtin
+    chr = unichr
+    str = unicode
+
+
+# `ws` and `comment` from the grammar: the explicit whitespace list plus every
+# character in the Unicode 'Zs' category, and the line terminators, which end
+# single-line comments and may not appear unescaped in strings. bytescanner.py
+# builds its UTF-8 patterns from these as well.
+_WHITESPACE = (u' \t\n\r\v\f\u00a0\u1680' +
+               u''.join(chr(c) for c in range(0x2000, 0x200b)) +
+               u'\u2028\u2029\u202f\u205f\u3000\ufeff')
+_LINE_TERMINATORS = u'\r\n\u2028\u2029'
+
+
+def _chars(chars):
+    return u''.join(re.escape(c) for c in chars)
+
+
+_WS_CHARS = u'[' + _chars(_WHITESPACE) + u']'
+_WS = re.compile(
+    u'(?:' + _WS_CHARS + u'+'
+    u'|//[^' + _chars(_LINE_TERMINATORS) + u']*'
+    u'|/\\*[\\s\\S]*?\\*/)*')
+
+_NUMBER = re.compile(
+    r'(-*)(?:'
+    r'(0[xX][0-9a-fA-F]+)'
+    r'|\+?((?:0|[1-9][0-9]*)(?:\.[0-9]*)?(?:[eE][+-]?[0-9]+)?'
+    r'|\.[0-9]+(?:[eE][+-]?[0-9]+)?)'
+    r'|(Infinity|NaN))')
+
+_SQ_SIMPLE = re.compile(u"'([^'\\\\" + _chars(_LINE_TERMINATORS) + u"]*)'")
+_DQ_SIMPLE = re.compile(u'"([^"\\\\' + _chars(_LINE_TERMINATORS) + u']*)"')
+_SQ_CHUNK = re.compile(
+    u"([^'\\\\" + _chars(_LINE_TERMINATORS) + u"]*)(['\\\\]?)")
+_DQ_CHUNK = re.compile(
+    u'([^"\\\\' + _chars(_LINE_TERMINATORS) + u']*)(["\\\\]?)')
+
+_ESCAPE = re.compile(
+    u'\\\\(?:([bfnrtv\'"\\\\])|x([0-9a-fA-F]{2})|u([0-9a-fA-F]{4})'
+    u'|(\\r\\n|[' + _chars(_LINE_TERMINATORS) + u']))')
+_ESCAPE_CHARS = {
+    'b': u'\b',
+    'f': u'\f',
+    'n': u'\n',
+    'r': u'\r',
+    't': u'\t',
+    'v': u'\v',
+    "'": u"'",
+    '"': u'"',
+    '\\': u'\\',
+}
+
+# Documents the json module would decode differently than the JSON5
+# grammar does: '\/' isn't a JSON5 escape, json combines escaped surrogate
+# pairs into one character, and JSON5 doesn't allow raw line separators
+# inside strings.
+_JSON_INCOMPATIBLE = re.compile(
+    u'\\\\/|\\\\u[dD][89abAB]|[\\u2028\\u2029]')
+
+_JSON_WS = re.compile(r'[ \t\n\r]*')
+
+_UNICODE_ESC = re.compile(r'\\u([0-9a-fA-F]{4})')
+_ASCII_IDENT = re.compile(r'[a-zA-Z$_][a-zA-Z0-9$_]*')
+_ASCII_ID_START = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ$_')
+
+_DIGITS = frozenset('0123456789')
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+# With intern_strings, string values up to this long are interned.
+_INTERN_MAX_LEN = 32
+
+_ID_START_CATEGORIES = frozenset(['Ll', 'Lm', 'Lo', 'Lt', 'Lu', 'Nl'])
+_ID_CONTINUE_CATEGORIES = _ID_START_CATEGORIES | frozenset(
+    ['Mn', 'Mc', 'Nd', 'Pc'])
+
+
+# What a value is, from its first character.
+_OBJECT, _ARRAY, _STRING, _NULL, _TRUE, _FALSE = range(6)
+
+
+class _ScanError(Exception):
+    def __init__(self, pos, expected):
+        super(_ScanError, self).__init__(pos)
+        self.pos = pos
+        self.expected = expected
+
+
+class Scanner(object):
+    # The patterns and tokens of the grammar, which ByteScanner replaces with
+    # their UTF-8 encoded equivalents.
+    _ws = _WS.match
+    _VALUE_STARTS = {
+        u'{': _OBJECT,
+        u'[': _ARRAY,
+        u'"': _STRING,
+        u"'": _STRING,
+        u'n': _NULL,
+        u't': _TRUE,
+        u'f': _FALSE,
+    }
+    _KEYWORDS = {
+        _NULL: (u'null', None),
+        _TRUE: (u'true', True),
+        _FALSE: (u'false', False),
+    }
+    # The tokens that _object() and _array() look for.
+    _OBJECT_TOKENS = (u'}', u',', u':', u'"', u"'")
+    _ARRAY_TOKENS = (u']', u',')
+    _COMMENT_START = u'/*'
+    _HEX_ESCAPE = u'x'
+    _UNICODE_ESCAPE = u'u'
+    _HEX_DIGITS = _HEX_DIGITS
+
+    def __init__(self, msg, fname, dictify=dict, parse_float=float,
+                 parse_int=int, parse_constant=float, json_decoder=None,
+                 intern_keys=False, intern_strings=False):
+        self.msg = str(msg)
+        self.end = len(self.msg)
+        self.fname = fname
+        self.pos = 0
+        self.errpos = 0
+        self.dictify = dictify
+        self.parse_float = parse_float
+        self.parse_int = parse_int
+        self.parse_constant = parse_constant
+
+        # Equal keys (and, with intern_strings, short string values) are
+        # replaced by the first such string seen, so that they share
+        # storage and compare by identity.
+        memo = {} if intern_keys or intern_strings else None
+        self.key_memo = memo if intern_keys else None
+        self.str_memo = memo if intern_strings else None
+
+        # When a json.JSONDecoder is given, objects and arrays are first
+        # handed to its C scanner; only the ones that use JSON5 extensions
+        # (and the values nested in them) are scanned here. The first such
+        # attempt covers the whole document, and a failed attempt still lets
+        # the children that precede the offending token be decoded in C.
+        self._json_scan = None
+        if (json_decoder is not None and
+                not _JSON_INCOMPATIBLE.search(self.msg)):
+            self._json_scan = json_decoder.scan_once
+
+    def parse(self):
+        try:
+            pos = self._ws(self.msg, 0).end()
+            v, pos = self._value(pos)
+            pos = self._ws(self.msg, pos).end()
+            if pos != self.end:
+                self._fail(pos, ('end of input',))
+        except _ScanError as e:
+            self.errpos = e.pos
+            return None, self._error(e.expected), self.errpos
+        self.pos = pos
+        return v, None, pos
+
+    def _error(self, expected):
+        lineno, colno = LineIndex(self.msg).position(self.errpos)
+        return JSON5DecodeError(unexpected(self.msg, self.errpos), self.fname,
+                                self.errpos, lineno, colno, expected)
+
+    def _fail(self, pos, expected=()):
+        # An unterminated block comment stops the whitespace regex at the
+        # '/*'; like the PEG parser, report it at the end of the input.
+        if self.msg[pos:pos + 2] == self._COMMENT_START:
+            pos = self.end
+            expected = ('*/',)
+        raise _ScanError(pos, expected)
+
+    def _value(self, pos):
+        msg = self.msg
+        kind = self._VALUE_STARTS.get(msg[pos:pos + 1])
+        if kind is None:
+            return self._number(pos)
+        if kind == _STRING:
+            if self.str_memo is not None:
+                return self._interned_string(pos)
+            return self._string(pos)
+        if kind == _OBJECT or kind == _ARRAY:
+            if self._json_scan and self._may_be_json(pos):
+                try:
+                    return self._json_scan(msg, pos)
+                except (ValueError, StopIteration):
+                    pass
+            if kind == _OBJECT:
+                return self._object(pos)
+            return self._array(pos)
+        keyword, value = self._KEYWORDS[kind]
+        end = pos + len(keyword)
+        if msg[pos:end] == keyword:
+            return value, end
+        return self._number(pos)
+
+    def _may_be_json(self, pos):
+        # A failed attempt is expensive (the json module computes the line
+        # and column of every error), so don't bother with objects that
+        # start with an unquoted key or containers that start with a comment.
+        msg = self.msg
+        start = _JSON_WS.match(msg, pos + 1).end()
+        c = msg[start:start + 1]
+        if msg[pos] == '{':
+            return c == '"' or c == '}'
+        return c != '/' and c != "'"
+
+    def _object(self, pos):
+        msg = self.msg
+        ws = self._ws
+        memo = self.key_memo
+        rbrace, comma, colon, dquote, squote = self._OBJECT_TOKENS
+        pairs = []
+        pos = ws(msg, pos + 1).end()
+        if msg[pos:pos + 1] == rbrace:
+            return self.dictify(pairs), pos + 1
+        while True:
+            c = msg[pos:pos + 1]
+            if c == dquote or c == squote:
+                key, pos = self._string(pos)
+            else:
+                key, pos = self._ident(pos)
+            if memo is not None:
+                key = memo.setdefault(key, key)
+            pos = ws(msg, pos).end()
+            if msg[pos:pos + 1] != colon:
+                self._fail(pos, (':',))
+            pos = ws(msg, pos + 1).end()
+            val, pos = self._value(pos)
+            pairs.append((key, val))
+            pos = ws(msg, pos).end()
+            c = msg[pos:pos + 1]
+            if c == comma:
+                pos = ws(msg, pos + 1).end()
+                if msg[pos:pos + 1] == rbrace:
+                    return self.dictify(pairs), pos + 1
+            elif c == rbrace:
+                return self.dictify(pairs), pos + 1
+            else:
+                self._fail(pos, (',', '}'))
+
+    def _array(self, pos):
+        msg = self.msg
+        ws = self._ws
+        rbracket, comma = self._ARRAY_TOKENS
+        values = []
+        pos = ws(msg, pos + 1).end()
+        if msg[pos:pos + 1] == rbracket:
+            return values, pos + 1
+        while True:
+            val, pos = self._value(pos)
+            values.append(val)
+            pos = ws(msg, pos).end()
+            c = msg[pos:pos + 1]
+            if c == comma:
+                pos = ws(msg, pos + 1).end()
+                if msg[pos:pos + 1] == rbracket:
+                    return values, pos + 1
+            elif c == rbracket:
+                return values, pos + 1
+            else:
+                self._fail(pos, (',', ']'))
+
+    def _interned_string(self, pos):
+        s, pos = self._string(pos)
+        if len(s) <= _INTERN_MAX_LEN:
+            s = self.str_memo.setdefault(s, s)
+        return s, pos
+
+    def _string(self, pos):
+        msg = self.msg
+        if msg[pos] == "'":
+            m = _SQ_SIMPLE.match(msg, pos)
+            chunk = _SQ_CHUNK.match
+        else:
+            m = _DQ_SIMPLE.match(msg, pos)
+            chunk = _DQ_CHUNK.match
+        if m:
+            return m.group(1), m.end()
+
+        chunks = []
+        start = pos
+        pos += 1
+        while True:
+            m = chunk(msg, pos)
+            content, terminator = m.groups()
+            if content:
+                chunks.append(content)
+            pos = m.end()
+            if not terminator:
+                self._fail(pos, (msg[start],))
+            if terminator != '\\':
+                return u''.join(chunks), pos
+            pos -= 1
+            m = _ESCAPE.match(msg, pos)
+            if not m:
+                self._bad_escape(pos)
+            ch, hex2, hex4, _ = m.groups()
+            if ch:
+                chunks.append(_ESCAPE_CHARS[ch])
+            elif hex2 or hex4:
+                chunks.append(chr(int(hex2 or hex4, base=16)))
+            pos = m.end()
+
+    def _bad_escape(self, pos):
+        # Report the first character that doesn't fit the escape sequence.
+        msg = self.msg
+        kind = msg[pos + 1:pos + 2]
+        if kind == self._HEX_ESCAPE:
+            limit = 2
+        elif kind == self._UNICODE_ESCAPE:
+            limit = 4
+        else:
+            self._fail(pos + 1, ('escape sequence',))
+        pos += 2
+        while limit and msg[pos:pos + 1] in self._HEX_DIGITS:
+            pos += 1
+            limit -= 1
+        self._fail(pos, ('hex digit',))
+
+    def _number(self, pos):
+        m = _NUMBER.match(self.msg, pos)
+        if not m:
+            while self.msg[pos:pos + 1] == '-':
+                pos += 1
+            if self.msg[pos:pos + 1] == '+':
+                pos += 1
+            self._fail(pos, ('value',))
+        sign, hex_lit, dec_lit, name = m.groups()
+        end = m.end()
+        if hex_lit:
+            if sign:
+                # lib._walk_ast() only honors the base for unsigned hex
+                # literals; match it.
+                return self.parse_int(sign + '0x' + hex_lit[2:]), end
+            return self.parse_int('0x' + hex_lit[2:], base=16), end
+        if dec_lit is not None:
+            if self._is_id_start(end):
+                self._fail(end, ('digit',))
+            v = sign + dec_lit.replace('E', 'e')
+            if '.' in v or 'e' in v:
+                return self.parse_float(v), end
+            return self.parse_int(v), end
+        return self.parse_constant(sign + name), end
+
+    def _is_id_start(self, pos):
+        c = self.msg[pos:pos + 1]
+        if not c:
+            return False
+        if c in _ASCII_ID_START:
+            return True
+        if c == '\\':
+            return _UNICODE_ESC.match(self.msg, pos) is not None
+        return c > u'\x7f' and (
+            unicodedata.category(c) in _ID_START_CATEGORIES)
+
+    def _ident(self, pos):
+        msg = self.msg
+        m = _ASCII_IDENT.match(msg, pos)
+        if m:
+            pos = m.end()
+            c = msg[pos:pos + 1]
+            if c != '\\' and not c > u'\x7f':
+                return m.group(0), pos
+            chars = [m.group(0)]
+        else:
+            c, pos = self._ident_char(pos, _ID_START_CATEGORIES)
+            if c is None:
+                self._fail(pos, ('string', 'identifier'))
+            chars = [c]
+
+        while True:
+            c, pos = self._ident_char(pos, _ID_CONTINUE_CATEGORIES)
+            if c is None:
+                return u''.join(chars), pos
+            chars.append(c)
+
+    def _ident_char(self, pos, categories):
+        msg = self.msg
+        c = msg[pos:pos + 1]
+        if not c:
+            return None, pos
+        if c == '\\':
+            m = _UNICODE_ESC.match(msg, pos)
+            if m:
+                return chr(int(m.group(1), base=16)), m.end()
+            return None, pos
+        if c in _ASCII_ID_START or (
+                categories is _ID_CONTINUE_CATEGORIES and c in _DIGITS):
+            return c, pos + 1
+        if c > u'\x7f':
+            if unicodedata.category(c) in categories:
+                return c, pos + 1
+            if (categories is _ID_CONTINUE_CATEGORIES and
+                    c in (u'\u200c', u'\u200d')):
+                return c, pos + 1
+        return None, pos
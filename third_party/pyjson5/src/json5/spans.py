@@ -0,0 +1,368 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""JSON5 values annotated with where they are in the document.
+
+parse() returns a Document, a tree of Nodes with the Python value of
+every object, array, key and scalar in the document and the span of text
+it came from. reparse() applies a text edit to a Document and rescans only
+the smallest part of the tree that the edit can affect: the token or the
+container members around the edit. Everything else is shared with the
+previous Document, which stays valid.
+
+A node's offset is relative to the start of its parent (the root's is
+relative to the start of the document), so an edit only moves the nodes
+on the path to it and the siblings that follow them.
+"""
+
+import collections
+
+from .errors import LineIndex
+from .scanner import Scanner, _ScanError
+
+
+Span = collections.namedtuple(
+    'Span', ['start', 'end', 'lineno', 'colno', 'end_lineno', 'end_colno'])
+Span.__doc__ = """Where a node is: the offsets of its first character and of
+the character just past it, and the 1-based lines and columns of both."""
+
+
+class Node(object):
+    """A value in a JSON5 document.
+
+    ``kind`` is one of ``'object'``, ``'array'``, ``'key'``, ``'string'``,
+    ``'number'``, ``'bool'`` and ``'null'``; ``value`` is the Python value
+    (shared with the enclosing nodes' values, so it shouldn't be modified);
+    ``offset`` and ``length`` locate the text the node came from, relative
+    to the start of the enclosing node. The ``children`` of an array are
+    its elements; those of an object are its keys and values, alternating.
+    """
+
+    __slots__ = ('kind', 'value', 'offset', 'length', 'children')
+
+    def __init__(self, kind, value, offset, length, children=()):
+        self.kind = kind
+        self.value = value
+        self.offset = offset
+        self.length = length
+        self.children = children
+
+    def __repr__(self):
+        return 'Node(%r, %r, %d, %d)' % (self.kind, self.value, self.offset,
+                                         self.length)
+
+    def _moved(self, delta):
+        return Node(self.kind, self.value, self.offset + delta, self.length,
+                    self.children)
+
+
+class Document(object):
+    """The result of parse() or reparse()."""
+
+    def __init__(self, text, root, fname):
+        self.text = text
+        self.root = root
+        self.fname = fname
+        self._lines = LineIndex(text)
+        self._starts = None
+
+    @property
+    def value(self):
+        return self.root.value
+
+    def walk(self):
+        """Yields a (node, span) pair for every node, in document order."""
+        stack = [(self.root, 0)]
+        while stack:
+            node, base = stack.pop()
+            start = base + node.offset
+            yield node, self._span(start, start + node.length)
+            stack.extend((child, start) for child in reversed(node.children))
+
+    def span(self, node):
+        """Returns the Span of ``node``, which must be in this document."""
+        if self._starts is None:
+            self._starts = dict((n, s.start) for n, s in self.walk())
+        start = self._starts[node]
+        return self._span(start, start + node.length)
+
+    def node_at(self, offset):
+        """Returns the innermost node that contains ``offset``, and its
+        Span, or (None, None) if the offset is outside the root value."""
+        found, found_start = None, None
+        node, base = self.root, 0
+        while node is not None:
+            start = base + node.offset
+            if not start <= offset < start + node.length:
+                break
+            found, found_start = node, start
+            node, base = _child_after(node, start, offset), start
+        if found is None:
+            return None, None
+        return found, self._span(found_start, found_start + found.length)
+
+    def _span(self, start, end):
+        lineno, colno = self._lines.position(start)
+        end_lineno, end_colno = self._lines.position(end)
+        return Span(start, end, lineno, colno, end_lineno, end_colno)
+
+
+def parse(s, fname='<string>'):
+    """Parses the JSON5 document ``s`` (a ``str``) into a Document.
+
+    Raises JSON5DecodeError for syntax errors, just like json5.loads()."""
+    if not s:
+        raise ValueError('Empty strings are not legal JSON5')
+    scanner = _SpanScanner(s, fname)
+    err = None
+    try:
+        pos = scanner._ws(s, 0).end()
+        root, pos = scanner._node(pos)
+        pos = scanner._ws(s, pos).end()
+        if pos != scanner.end:
+            scanner._fail(pos, ('end of input',))
+    except _ScanError as e:
+        scanner.errpos = e.pos
+        err = scanner._error(e.expected)
+    if err:
+        raise err
+    return Document(s, root, fname)
+
+
+def reparse(doc, start, end, text):
+    """Returns the Document for ``doc``'s text with the characters from
+    offset ``start`` up to ``end`` replaced by ``text``.
+
+    Only the token containing the edit is rescanned or, failing that, the
+    members of the innermost container around it, starting just before the
+    edit and stopping as soon as the scan is back at a member that was
+    there before. If the rescan still doesn't end where it should, the
+    members of the next container out are rescanned, and so on. The result
+    is the same as parse() would return for the new text."""
+    new_text = doc.text[:start] + text + doc.text[end:]
+    delta = len(text) - (end - start)
+    scanner = _SpanScanner(new_text, doc.fname)
+    path = _path_to(doc.root, start, end)
+    try:
+        root = _rescan(scanner, path, start, end, delta)
+    except _ScanError:
+        root = None
+    if root is None:
+        return parse(new_text, doc.fname)
+    return Document(new_text, root, doc.fname)
+
+
+def _path_to(root, start, end):
+    # Returns the (node, absolute start) pairs from the root down to the
+    # innermost node whose text strictly contains the range [start, end),
+    # i.e. includes at least one character on either side of it. Key nodes
+    # count, but the range can't be in one if it's in the following value.
+    path = []
+    node, base = root, 0
+    while node is not None:
+        node_start = base + node.offset
+        if not node_start < start or not end < node_start + node.length:
+            break
+        path.append((node, node_start))
+        node, base = _child_after(node, node_start, start), node_start
+    return path
+
+
+def _child_after(node, node_start, offset):
+    # Returns the first child of ``node`` that ends after ``offset``.
+    children = node.children
+    lo, hi = 0, len(children)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        child = children[mid]
+        if node_start + child.offset + child.length <= offset:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < len(children):
+        return children[lo]
+    return None
+
+
+def _rescan(scanner, path, start, end, delta):
+    # Rescans the innermost node on the path that the edit can be contained
+    # in, widening the edit to the whole of each node that can't, and
+    # returns the new root, or None if the whole document needs parsing.
+    level = len(path) - 1
+    replaced = None
+    while level >= 0:
+        node, node_start = path[level]
+        if node.kind == 'object' or node.kind == 'array':
+            replaced = _rescan_members(scanner, node, node_start, start, end,
+                                       delta)
+        else:
+            replaced = _rescan_token(scanner, node, node_start, delta)
+        if replaced is not None:
+            break
+        start, end = node_start, node_start + node.length
+        level -= 1
+    if replaced is None:
+        return None
+
+    # Rebuild the nodes above the rescanned one.
+    for parent, _ in reversed(path[:level]):
+        children = list(parent.children)
+        child = path[level][0]
+        i = _index(children, child)
+        children[i] = replaced
+        children[i + 1:] = [c._moved(delta) for c in children[i + 1:]]
+        replaced = _container(parent.kind, parent.offset,
+                              parent.length + delta, children)
+        level -= 1
+    return replaced
+
+
+def _index(children, child):
+    for i, c in enumerate(children):
+        if c is child:
+            return i
+    raise AssertionError('node not found')  # pragma: no cover
+
+
+def _rescan_token(scanner, node, node_start, delta):
+    msg = scanner.msg
+    if node.kind == 'key':
+        c = msg[node_start:node_start + 1]
+        if c == '"' or c == "'":
+            key, pos = scanner._string(node_start)
+        else:
+            key, pos = scanner._ident(node_start)
+        new = Node('key', key, node.offset, pos - node_start)
+    else:
+        new, pos = scanner._node(node_start)
+        new.offset = node.offset
+    if pos != node_start + node.length + delta:
+        return None
+    return new
+
+
+def _rescan_members(scanner, node, node_start, start, end, delta):
+    # The members before the edit and the ones after it are kept; the scan
+    # starts after the last member that ends before the edit and stops at
+    # the (moved) start of the first member that starts after it.
+    is_object = node.kind == 'object'
+    step = 2 if is_object else 1
+    children = node.children
+    before = 0
+    while before < len(children):
+        last = children[before + step - 1]
+        if node_start + last.offset + last.length >= start:
+            break
+        before += step
+    after = before
+    while (after < len(children) and
+           node_start + children[after].offset <= end):
+        after += step
+
+    if before:
+        last = children[before - 1]
+        pos = node_start + last.offset + last.length
+    else:
+        pos = node_start + 1
+    stop = None
+    if after < len(children):
+        stop = node_start + children[after].offset + delta
+    scanned, pos, synced = scanner._members(node_start, pos, is_object,
+                                            before > 0, stop)
+    if not synced and pos != node_start + node.length + delta:
+        return None
+
+    new_children = list(children[:before])
+    new_children.extend(scanned)
+    if synced:
+        new_children.extend(c._moved(delta) for c in children[after:])
+    return _container(node.kind, node.offset, node.length + delta,
+                      new_children)
+
+
+def _container(kind, offset, length, children):
+    if kind == 'object':
+        value = dict((children[i].value, children[i + 1].value)
+                     for i in range(0, len(children), 2))
+    else:
+        value = [c.value for c in children]
+    return Node(kind, value, offset, length, children)
+
+
+class _SpanScanner(Scanner):
+    # Builds Nodes (with offsets relative to the enclosing node) rather
+    # than values, and can scan the members of a container starting and
+    # stopping between any two of them.
+
+    def _node(self, pos):
+        msg = self.msg
+        c = msg[pos:pos + 1]
+        if c == '{' or c == '[':
+            is_object = c == '{'
+            children, end, _ = self._members(pos, pos + 1, is_object, False,
+                                             None)
+            return _container('object' if is_object else 'array', pos,
+                              end - pos, children), end
+        value, end = self._value(pos)
+        if value is None:
+            kind = 'null'
+        elif value is True or value is False:
+            kind = 'bool'
+        elif c == '"' or c == "'":
+            kind = 'string'
+        else:
+            kind = 'number'
+        return Node(kind, value, pos, end - pos), end
+
+    def _members(self, container_start, pos, is_object, after_value, stop):
+        # Scans members from ``pos``, which is either just past the opening
+        # bracket or a comma (``after_value`` false) or just past a member.
+        # Returns the member nodes, the position just past the closing
+        # bracket, and False; or, if a member starts at ``stop``, the nodes
+        # before it, ``stop`` and True.
+        msg = self.msg
+        ws = self._ws
+        close = '}' if is_object else ']'
+        children = []
+        while True:
+            if after_value:
+                pos = ws(msg, pos).end()
+                c = msg[pos:pos + 1]
+                if c == close:
+                    return children, pos + 1, False
+                if c != ',':
+                    self._fail(pos, (',', close))
+                pos += 1
+            pos = ws(msg, pos).end()
+            if msg[pos:pos + 1] == close:
+                return children, pos + 1, False
+            if pos == stop:
+                return children, pos, True
+            if is_object:
+                c = msg[pos:pos + 1]
+                if c == '"' or c == "'":
+                    key, end = self._string(pos)
+                else:
+                    key, end = self._ident(pos)
+                children.append(Node('key', key, pos - container_start,
+                                     end - pos))
+                pos = ws(msg, end).end()
+                if msg[pos:pos + 1] != ':':
+                    self._fail(pos, (':',))
+                pos = ws(msg, pos + 1).end()
+            node, end = self._node(pos)
+            node.offset -= container_start
+            children.append(node)
+            pos = end
+            after_value = True
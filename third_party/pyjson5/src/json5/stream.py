@@ -0,0 +1,260 @@
+# Copyright 2024 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An incremental, non-recursive JSON5 parser.
+
+StreamParser accepts a document in arbitrarily sized pieces and turns it
+into a flat sequence of events. It only holds on to the unconsumed tail of
+the input and a stack of open containers, so memory use is bounded by the
+largest single token and nesting depth is not limited by Python's
+recursion limit. Scalars are tokenized by the Scanner from scanner.py.
+"""
+
+import re
+import sys
+
+from .errors import JSON5DecodeError
+from .scanner import (Scanner, _ScanError, _LINE_TERMINATORS, _WS_CHARS,
+                      _chars)
+
+
+if sys.version_info[0] < 3:
+    # pylint: disable=redefined-builtin
+    str = unicode
+
+
+_WS_RUN = re.compile(_WS_CHARS + u'*')
+_EOL = re.compile(u'[' + _chars(_LINE_TERMINATORS) + u']')
+
+# Any of these ends a number, literal or identifier, so once one of them is
+# in the buffer the scalar before it is complete.
+_DELIMITER = re.compile(u'[,:\\[\\]{}"\'/]|' + _WS_CHARS)
+
+# Parser states: what the next token may be.
+_VALUE = 0          # a value (at the top level or after ':')
+_ARRAY_FIRST = 1    # a value or ']' (after '[' or ',')
+_ARRAY_NEXT = 2     # ',' or ']'
+_OBJECT_FIRST = 3   # a key or '}' (after '{' or ',')
+_OBJECT_NEXT = 4    # ',' or '}'
+_COLON = 5          # ':'
+_DONE = 6           # nothing but whitespace and comments
+
+# What an error in each state reports as having been expected.
+_EXPECTED = {
+    _VALUE: ('value',),
+    _ARRAY_FIRST: ('value', ']'),
+    _ARRAY_NEXT: (',', ']'),
+    _OBJECT_FIRST: ('string', 'identifier', '}'),
+    _OBJECT_NEXT: (',', '}'),
+    _COLON: (':',),
+    _DONE: ('end of input',),
+}
+
+
+class _NeedMoreData(Exception):
+    pass
+
+
+class StreamParser(object):
+    """Parses a JSON5 document that is fed to it in pieces.
+
+    feed() and close() return lists of ``(event, value)`` tuples, where the
+    event is one of ``'start_map'``, ``'map_key'``, ``'end_map'``,
+    ``'start_array'``, ``'end_array'`` or ``'value'``. Only ``'map_key'``
+    and ``'value'`` events carry a value; scalars are converted with the
+    given parse_* hooks. Syntax errors raise JSON5DecodeError."""
+
+    def __init__(self, fname='<stream>', parse_float=float, parse_int=int,
+                 parse_constant=float):
+        self.fname = fname
+        self._scanner = Scanner(u'', fname, parse_float=parse_float,
+                                parse_int=parse_int,
+                                parse_constant=parse_constant)
+        self._buf = u''
+        self._pos = 0
+        self._pending_cr = False
+        self._empty = True
+
+        # Offset, line number and column (0-based) of self._buf[0], for
+        # errors.
+        self._offset = 0
+        self._lineno = 1
+        self._col = 0
+
+        self._state = _VALUE
+        self._stack = []  # True for an open object, False for an array.
+
+    def feed(self, data):
+        if data:
+            self._empty = False
+        if self._pending_cr:
+            data = u'\r' + data
+        # A '\r' might be the first half of a '\r\n' that is split across
+        # two pieces, so hold on to it until we see what comes next.
+        self._pending_cr = data.endswith(u'\r')
+        if self._pending_cr:
+            data = data[:-1]
+        self._discard_consumed()
+        self._buf += data
+        return self._parse(final=False)
+
+    def close(self):
+        if self._empty:
+            raise ValueError('Empty strings are not legal JSON5')
+        if self._pending_cr:
+            self._pending_cr = False
+            self._buf += u'\r'
+        events = self._parse(final=True)
+        if self._state != _DONE:
+            self._fail(len(self._buf), _EXPECTED[self._state], final=True)
+        return events
+
+    def _discard_consumed(self):
+        buf, pos = self._buf, self._pos
+        if not pos:
+            return
+        newlines = buf.count('\n', 0, pos)
+        if newlines:
+            self._lineno += newlines
+            self._col = pos - buf.rfind('\n', 0, pos) - 1
+        else:
+            self._col += pos
+        self._offset += pos
+        self._buf = buf[pos:]
+        self._pos = 0
+
+    def _fail(self, pos, expected, final=False):
+        buf = self._buf
+        lineno = self._lineno + buf.count('\n', 0, pos)
+        nl = buf.rfind('\n', 0, pos)
+        colno = pos - nl if nl >= 0 else self._col + pos + 1
+        if pos >= len(buf) and final:
+            msg = 'Unexpected end of input'
+        else:
+            msg = 'Unexpected "%s"' % buf[pos]
+        raise JSON5DecodeError(msg, self.fname, self._offset + pos, lineno,
+                               colno, expected)
+
+    def _parse(self, final):
+        events = []
+        buf = self._buf
+        scanner = self._scanner
+        scanner.msg = buf
+        scanner.end = len(buf)
+        stack = self._stack
+        state = self._state
+        pos = self._pos
+        try:
+            while True:
+                pos = self._skip(pos, final)
+                self._pos = pos
+                if pos == len(buf):
+                    break
+                c = buf[pos]
+                if state == _COLON:
+                    if c != ':':
+                        self._fail(pos, _EXPECTED[state])
+                    state = _VALUE
+                    pos += 1
+                    continue
+                if ((c == '}' and state in (_OBJECT_FIRST, _OBJECT_NEXT)) or
+                        (c == ']' and state in (_ARRAY_FIRST, _ARRAY_NEXT))):
+                    stack.pop()
+                    events.append(
+                        ('end_map' if c == '}' else 'end_array', None))
+                    pos += 1
+                elif state == _OBJECT_NEXT or state == _ARRAY_NEXT:
+                    if c != ',':
+                        self._fail(pos, _EXPECTED[state])
+                    state = (_OBJECT_FIRST if state == _OBJECT_NEXT
+                             else _ARRAY_FIRST)
+                    pos += 1
+                    continue
+                elif state == _OBJECT_FIRST:
+                    if c == '"' or c == "'":
+                        key, pos = self._scalar(pos, final, scanner._string)
+                    else:
+                        key, pos = self._scalar(pos, final, scanner._ident)
+                    events.append(('map_key', key))
+                    state = _COLON
+                    continue
+                elif state == _DONE:
+                    self._fail(pos, _EXPECTED[state])
+                elif c == '{':
+                    stack.append(True)
+                    events.append(('start_map', None))
+                    state = _OBJECT_FIRST
+                    pos += 1
+                    continue
+                elif c == '[':
+                    stack.append(False)
+                    events.append(('start_array', None))
+                    state = _ARRAY_FIRST
+                    pos += 1
+                    continue
+                else:
+                    v, pos = self._scalar(pos, final, scanner._value)
+                    events.append(('value', v))
+
+                # A value is complete; see what its container expects next.
+                if not stack:
+                    state = _DONE
+                elif stack[-1]:
+                    state = _OBJECT_NEXT
+                else:
+                    state = _ARRAY_NEXT
+        except _NeedMoreData:
+            pass
+        finally:
+            self._state = state
+        return events
+
+    def _skip(self, pos, final):
+        buf = self._buf
+        while True:
+            pos = _WS_RUN.match(buf, pos).end()
+            if buf.startswith('//', pos):
+                m = _EOL.search(buf, pos)
+                if m:
+                    pos = m.start()
+                    continue
+                if final:
+                    return len(buf)
+            elif buf.startswith('/*', pos):
+                end = buf.find('*/', pos + 2)
+                if end != -1:
+                    pos = end + 2
+                    continue
+                if final:
+                    self._fail(len(buf), ('*/',), final=True)
+            elif final or pos != len(buf) - 1 or buf[pos] != '/':
+                return pos
+            # An unterminated comment, or a '/' that may start one.
+            self._pos = pos
+            raise _NeedMoreData()
+
+    def _scalar(self, pos, final, scan):
+        buf = self._buf
+        c = buf[pos]
+        if not final and c != '"' and c != "'" and not _DELIMITER.search(
+                buf, pos):
+            raise _NeedMoreData()
+        try:
+            return scan(pos)
+        except _ScanError as e:
+            # The token may just be incomplete; the last character could
+            # also be the '/' of a comment the scanner would skip.
+            if not final and e.pos >= len(buf) - 1:
+                raise _NeedMoreData()
+            self._fail(e.pos, e.expected, final=final)
@@ -15,7 +15,10 @@
 import io
 import math
 import os
+import pickle
+import shutil
 import sys
+import tempfile
 import unittest
 
 import json5
@@ -23,13 +26,17 @@ import json5
 
 class TestLoads(unittest.TestCase):
     maxDiff = None
+    backend = 'scanner'
+
+    def loads(self, s, **kwargs):
+        return json5.loads(s, backend=self.backend, **kwargs)
 
     def check(self, s, obj):
-        self.assertEqual(json5.loads(s), obj)
+        self.assertEqual(self.loads(s), obj)
 
     def check_fail(self, s, err=None):
         try:
-            json5.loads(s)
+            self.loads(s)
             self.fail()  # pragma: no cover
         except ValueError as e:
             if err:
@@ -46,7 +53,7 @@ class TestLoads(unittest.TestCase):
         self.check('false', False)
 
     def test_cls_is_not_supported(self):
-        self.assertRaises(AssertionError, json5.loads, '1', cls=lambda x: x)
+        self.assertRaises(AssertionError, self.loads, '1', cls=lambda x: x)
 
     def test_empty_strings_are_errors(self):
         self.check_fail('', 'Empty strings are not legal JSON5')
@@ -56,7 +63,7 @@ class TestLoads(unittest.TestCase):
           s = '"\xf6"'
         else:
           s = b'"\xf6"'
-        self.assertEqual(json5.loads(s, encoding='iso-8859-1'),
+        self.assertEqual(self.loads(s, encoding='iso-8859-1'),
                          u"\xf6")
 
 
@@ -81,8 +88,8 @@ class TestLoads(unittest.TestCase):
         # names
         self.check('Infinity', float('inf'))
         self.check('-Infinity', float('-inf'))
-        self.assertTrue(math.isnan(json5.loads('NaN')))
-        self.assertTrue(math.isnan(json5.loads('-NaN')))
+        self.assertTrue(math.isnan(self.loads('NaN')))
+        self.assertTrue(math.isnan(self.loads('-NaN')))
 
         # syntax errors
         self.check_fail('14d', '<string>:1 Unexpected "d" at column 3')
@@ -101,18 +108,31 @@ class TestLoads(unittest.TestCase):
     def test_identifiers_unicode(self):
         self.check(u'{\xc3: 1}', {u'\xc3': 1})
 
+    def test_intern_keys(self):
+        a, b = self.loads(u"[{name: 'auto'}, {'name': 'auto'}]",
+                          intern_keys=True)
+        self.assertIs(list(a)[0], list(b)[0])
+
+    def test_intern_strings(self):
+        text = 'z' * 40
+        a, b = self.loads(u"[{a: 'auto', b: '%s'}, {a: 'auto', b: '%s'}]" %
+                          (text, text), intern_strings=True)
+        self.assertIs(a['a'], b['a'])
+        self.assertIsNot(a['b'], b['b'])
+        self.assertEqual(a, b)
+
     def test_null(self):
         self.check('null', None)
 
     def test_object_hook(self):
         hook = lambda d: [d]
-        self.assertEqual(json5.loads('{foo: 1}', object_hook=hook),
+        self.assertEqual(self.loads('{foo: 1}', object_hook=hook),
                          [{"foo": 1}])
 
     def test_object_pairs_hook(self):
         hook = lambda pairs: pairs
-        self.assertEqual(json5.loads('{foo: 1, bar: 2}',
-                                     object_pairs_hook=hook),
+        self.assertEqual(self.loads('{foo: 1, bar: 2}',
+                                    object_pairs_hook=hook),
                          [('foo', 1), ('bar', 2)])
 
     def test_objects(self):
@@ -123,24 +143,34 @@ class TestLoads(unittest.TestCase):
 
     def test_parse_constant(self):
         hook = lambda x: x
-        self.assertEqual(json5.loads('-Infinity', parse_constant=hook),
+        self.assertEqual(self.loads('-Infinity', parse_constant=hook),
                          '-Infinity')
-        self.assertEqual(json5.loads('NaN', parse_constant=hook),
+        self.assertEqual(self.loads('NaN', parse_constant=hook),
                          'NaN')
 
     def test_parse_float(self):
         hook = lambda x: x
-        self.assertEqual(json5.loads('1.0', parse_float=hook), '1.0')
+        self.assertEqual(self.loads('1.0', parse_float=hook), '1.0')
 
     def test_parse_int(self):
         hook = lambda x, base=10: x
-        self.assertEqual(json5.loads('1', parse_int=hook), '1')
+        self.assertEqual(self.loads('1', parse_int=hook), '1')
+
+        hook = lambda x, base=10: (x, base)
+        self.assertEqual(self.loads('[0X1f, 2]', parse_int=hook),
+                         [('0x1f', 16), ('2', 10)])
+
+    def test_nested_hooks(self):
+        self.assertEqual(
+            self.loads('{a: [{b: 1.5}], c: {}}', object_pairs_hook=list,
+                       parse_float=lambda x: x),
+            [('a', [[('b', '1.5')]]), ('c', [])])
 
     def test_sample_file(self):
         path = os.path.join(os.path.dirname(__file__), '..', '..',
                             'sample.json5')
         with open(path) as fp:
-            obj = json5.load(fp)
+            obj = json5.load(fp, backend=self.backend)
         self.assertEqual({
             u'oh': [
                 u"we shouldn't forget",
@@ -208,12 +238,499 @@ class TestLoads(unittest.TestCase):
         self.check(u'\u2029 1', 1)
 
 
+class TestLoadsPEG(TestLoads):
+    backend = 'peg'
+
+    def test_intern_keys(self):
+        self.assertRaises(ValueError, self.loads, '{a: 1}', intern_keys=True)
+
+    def test_intern_strings(self):
+        self.assertRaises(ValueError, self.loads, '"a"', intern_strings=True)
+
+
+class TestLoadsTryJSON(TestLoads):
+    def loads(self, s, **kwargs):
+        return json5.loads(s, try_json=True, **kwargs)
+
+    def check_same(self, s, **kwargs):
+        self.assertEqual(json5.loads(s, **kwargs),
+                         json5.loads(s, try_json=True, **kwargs))
+
+    def test_json5_extensions_in_nested_values(self):
+        self.check_same('// header\n{"a": [1, 2], "b": {c: 3}, "d": [4,]}')
+        self.check_same('[{"a": 1}, {"b": 2,}, [3, /* x */ 4], {"e": [5]}]')
+        self.check_same("{'a': {\"b\": 1}}")
+
+    def test_json_only_escapes(self):
+        # '\/' is legal in JSON but not in this JSON5 grammar, and json
+        # combines escaped surrogate pairs into a single character.
+        self.check_fail('["\\/"]')
+        self.check_same('["\\ud83d\\ude00"]')
+        self.assertEqual(len(self.loads('"\\ud83d\\ude00"')), 2)
+        self.check_fail(u'["\u2028"]')
+
+    def test_hooks(self):
+        hook = lambda x: x
+        self.check_same('[1E5, 1.5e+3]', parse_float=hook)
+        self.check_same('[NaN, -Infinity]', parse_constant=hook)
+        self.check_same('{"a": {"b": 1}}', object_pairs_hook=list)
+        self.check_same('{"a": {"b": 1}}', object_hook=lambda d: [d])
+
+    def test_peg_backend_is_not_supported(self):
+        self.assertRaises(ValueError, json5.loads, '1', backend='peg',
+                          try_json=True)
+
+
+class TestLoadPath(TestLoads):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json5')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def loads(self, s, **kwargs):
+        if not isinstance(s, bytes):
+            s = s.encode('utf-8')
+        with open(self.path, 'wb') as fp:
+            fp.write(s)
+        return json5.load_path(self.path, **kwargs)
+
+    def check_fail(self, s, err=None):
+        if err:
+            err = err.replace('<string>', self.path)
+        super(TestLoadPath, self).check_fail(s, err)
+
+    def test_error_offsets_are_in_characters(self):
+        try:
+            self.loads(u'{a: "\u00e9\u4e2d",\n b: "\U0001f600" x}')
+            self.fail()  # pragma: no cover
+        except json5.JSON5DecodeError as e:
+            self.assertEqual((e.pos, e.lineno, e.colno, e.expected),
+                             (18, 2, 9, (',', '}')))
+            self.assertEqual(e.fname, self.path)
+
+    def test_invalid_utf8(self):
+        self.assertRaises(UnicodeDecodeError, self.loads, b'"\xff"')
+        self.assertRaises(UnicodeDecodeError, self.loads, b'[1 \xff]')
+
+    def test_invalid_utf8_in_comments(self):
+        # Comments are skipped without being decoded, but must still be
+        # valid UTF-8, as they are for loads().
+        self.assertRaises(UnicodeDecodeError, self.loads, b'[1 /* \xff */]')
+        self.assertRaises(UnicodeDecodeError, self.loads, b'[1 // \xff\n]')
+        self.assertRaises(UnicodeDecodeError, self.loads,
+                          b'[1 /* \xed\xa0\x80 */]')
+        self.assertRaises(UnicodeDecodeError, self.loads, b'[1 // \xe2\x80]')
+        self.check(u'[1 /* \u00e9 \U0001f600 */, // \u4e2d\n 2]', [1, 2])
+        try:
+            self.loads(b'[1, "\xc3\xa9", /* \xff */ "\xff"]')
+            self.fail()  # pragma: no cover
+        except UnicodeDecodeError as e:
+            self.assertEqual(e.start, 13)
+
+    def test_unicode_whitespace_and_identifiers(self):
+        self.check(u'\ufeff{\u00e9\u200c: 1,\u3000/* \u2028 */ '
+                   u'b\u0301: 2}\u00a0// x\u2029',
+                   {u'\u00e9\u200c': 1, u'b\u0301': 2})
+        self.check_fail(u'"a\u2028b"')
+        self.check_fail(u'1\u00e9')
+
+
+class TestBackendConformance(unittest.TestCase):
+    maxDiff = None
+
+    def check_same(self, s):
+        self.assertEqual(json5.loads(s, backend='peg'),
+                         json5.loads(s, backend='scanner'))
+
+    def check_both_fail(self, s):
+        self.assertRaises(ValueError, json5.loads, s, backend='peg')
+        self.assertRaises(ValueError, json5.loads, s, backend='scanner')
+
+    def test_benchmark_files(self):
+        for fname in ('ios-simulator.json', 'mb_config.json'):
+            path = os.path.join(os.path.dirname(__file__), '..', '..',
+                                'benchmarks', fname)
+            with open(path) as fp:
+                self.check_same(fp.read())
+
+    def test_comments_and_whitespace(self):
+        self.check_same('// leading\n/* block\n */ [1, /* x */ 2,]\n// end')
+        self.check_same(u'\u3000{\u2028a:\u00a0"b"}')
+        self.check_both_fail('[1] /* unterminated')
+
+    def test_identifiers(self):
+        self.check_same(u'{\\u0041b: 1, \xe9t\xe9: 2, a\u200cb: 3}')
+        self.check_same('{null: 1, true: 2, $_0: 3}')
+        self.check_both_fail('{0a: 1}')
+
+    def test_number_normalization(self):
+        hook = lambda x, base=10: x
+        for s in ('0X1f', '1E5', '+1.5e+3', '-.5', '--1', '-+1', '1.'):
+            self.assertEqual(
+                json5.loads(s, backend='peg', parse_int=hook,
+                            parse_float=hook),
+                json5.loads(s, backend='scanner', parse_int=hook,
+                            parse_float=hook))
+        self.check_both_fail('1a')
+        self.check_both_fail('+0x1')
+        self.check_both_fail('0x')
+
+    def test_strings(self):
+        self.check_same('"a\\\r\nb\\\u2028c"')
+        self.check_same("['\\x41\\u00e9', \"'\", '\\\"']")
+        self.check_both_fail('"\\a"')
+        self.check_both_fail(u'"\u2028"')
+
+    def test_error_positions(self):
+        def position(s, backend):
+            try:
+                json5.loads(s, backend=backend)
+                self.fail()  # pragma: no cover
+            except json5.JSON5DecodeError as e:
+                return e.msg, e.pos
+
+        # Errors in strings and comments are reported the same way.
+        for s in ('"abc', '"\\x4g"', '[1, /* x', '[1] /* unterminated',
+                  '{a:1 /* x'):
+            self.assertEqual(position(s, 'peg'), position(s, 'scanner'))
+
+        # Otherwise, the scanner reports the first character that can't
+        # continue the document, and the PEG parser the furthest one that
+        # any alternative got to.
+        for s, peg, scanner in (
+                ('[1 2]', ('Unexpected "]"', 4), ('Unexpected "2"', 3)),
+                ('1 2', ('Unexpected end of input', 3),
+                 ('Unexpected "2"', 2)),
+                ('{a 1}', ('Unexpected "}"', 4), ('Unexpected "1"', 3)),
+                (']', ('Unexpected end of input', 1), ('Unexpected "]"', 0))):
+            self.assertEqual(position(s, 'peg'), peg)
+            self.assertEqual(position(s, 'scanner'), scanner)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, json5.loads, '1', backend='nope')
+
+
+class TestDecodeError(unittest.TestCase):
+    def error(self, s, **kwargs):
+        try:
+            json5.loads(s, **kwargs)
+            self.fail()  # pragma: no cover
+        except json5.JSON5DecodeError as e:
+            return e
+
+    def test_attributes(self):
+        e = self.error('{\n  a: 1\n  b: 2}')
+        self.assertIsInstance(e, ValueError)
+        self.assertEqual(str(e), '<string>:3 Unexpected "b" at column 3')
+        self.assertEqual(e.msg, 'Unexpected "b"')
+        self.assertEqual(e.fname, '<string>')
+        self.assertEqual((e.pos, e.lineno, e.colno), (11, 3, 3))
+        self.assertEqual(e.expected, (',', '}'))
+
+    def test_expected(self):
+        self.assertEqual(self.error('[1 2]').expected, (',', ']'))
+        self.assertEqual(self.error('{a 1}').expected, (':',))
+        self.assertEqual(self.error('{1: 1}').expected,
+                         ('string', 'identifier'))
+        self.assertEqual(self.error('"abc').expected, ('"',))
+        self.assertEqual(self.error('"\\x4g"').expected, ('hex digit',))
+        self.assertEqual(self.error('1 2').expected, ('end of input',))
+        self.assertEqual(self.error('[1, /* x').expected, ('*/',))
+        self.assertEqual(self.error('[1 2]', try_json=True).expected,
+                         (',', ']'))
+
+    def test_malformed_numbers(self):
+        e = self.error('[1e]')
+        self.assertEqual((e.msg, e.pos, e.expected),
+                         ('Unexpected "e"', 2, ('digit',)))
+        e = self.error('.')
+        self.assertEqual((e.msg, e.pos, e.expected),
+                         ('Unexpected "."', 0, ('value',)))
+
+    def test_peg_backend(self):
+        # The PEG parser reports errors one character further along here
+        # (see TestBackendConformance.test_error_positions).
+        e = self.error('[1\n 2]', backend='peg')
+        self.assertEqual(str(e), '<string>:2 Unexpected "]" at column 3')
+        self.assertEqual((e.pos, e.lineno, e.colno), (5, 2, 3))
+
+    def test_pickle(self):
+        e = self.error('\n[1 2]')
+        e2 = pickle.loads(pickle.dumps(e))
+        self.assertEqual(str(e2), str(e))
+        self.assertEqual((e2.pos, e2.lineno, e2.colno, e2.expected),
+                         (e.pos, e.lineno, e.colno, e.expected))
+
+
+class TestLoadCached(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as fp:
+            fp.write(contents)
+        return path
+
+    def entries(self):
+        return sorted(os.listdir(self.cache_dir))
+
+    def test_hit_and_miss(self):
+        path = self.write('a.json5', '{a: [1, 2.5, NaN], b: "x",}')
+        obj = json5.load_cached(path, cache_dir=self.cache_dir)
+        self.assertEqual(obj['a'][:2], [1, 2.5])
+        self.assertTrue(math.isnan(obj['a'][2]))
+        [entry] = self.entries()
+
+        # A stale entry for the same contents is returned as is.
+        with open(os.path.join(self.cache_dir, entry), 'wb') as fp:
+            fp.write(b'N')
+        self.assertIsNone(json5.load_cached(path, cache_dir=self.cache_dir))
+
+        self.write('a.json5', '[3]')
+        self.assertEqual(json5.load_cached(path, cache_dir=self.cache_dir),
+                         [3])
+        self.assertEqual(len(self.entries()), 2)
+
+    def test_corrupt_entry(self):
+        path = self.write('a.json5', '[1]')
+        json5.load_cached(path, cache_dir=self.cache_dir)
+        [entry] = self.entries()
+        with open(os.path.join(self.cache_dir, entry), 'wb') as fp:
+            fp.write(b'\xff')
+        self.assertEqual(json5.load_cached(path, cache_dir=self.cache_dir),
+                         [1])
+
+    def test_eviction(self):
+        a, b, c = [self.write(name, '"%s"' % (name * 100))
+                   for name in ('a', 'b', 'c')]
+        json5.load_cached(a, cache_dir=self.cache_dir, max_bytes=250)
+        [entry_a] = self.entries()
+        json5.load_cached(b, cache_dir=self.cache_dir, max_bytes=250)
+        [entry_b] = set(self.entries()) - set([entry_a])
+        os.utime(os.path.join(self.cache_dir, entry_a), (1, 1))
+        os.utime(os.path.join(self.cache_dir, entry_b), (2, 2))
+
+        # Using an entry makes it the most recently used one, so loading
+        # a third file evicts the other one.
+        json5.load_cached(a, cache_dir=self.cache_dir, max_bytes=250)
+        json5.load_cached(c, cache_dir=self.cache_dir, max_bytes=250)
+        entries = self.entries()
+        self.assertEqual(len(entries), 2)
+        self.assertIn(entry_a, entries)
+        self.assertNotIn(entry_b, entries)
+
+    def test_errors_are_not_cached(self):
+        path = self.write('a.json5', '[1')
+        self.assertRaises(ValueError, json5.load_cached, path,
+                          cache_dir=self.cache_dir)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_keys_and_strings_are_shared(self):
+        path = self.write('a.json5', '[{name: "auto"}, {name: "auto"}]')
+        for _ in range(2):
+            a, b = json5.load_cached(path, cache_dir=self.cache_dir)
+            self.assertIs(list(a)[0], list(b)[0])
+            self.assertIs(a['name'], b['name'])
+
+
+class TestSpans(unittest.TestCase):
+    maxDiff = None
+
+    def spans(self, doc):
+        return [(node.kind, node.value, tuple(span))
+                for node, span in doc.walk()]
+
+    def check_reparse(self, doc, start, end, text):
+        new = json5.spans.reparse(doc, start, end, text)
+        full = json5.spans.parse(new.text)
+        self.assertEqual(new.text, doc.text[:start] + text + doc.text[end:])
+        self.assertEqual(new.value, full.value)
+        self.assertEqual(self.spans(new), self.spans(full))
+        return new
+
+    def test_parse(self):
+        doc = json5.spans.parse(u'{a: [1, "x"],\n b: null}')
+        self.assertEqual(doc.value, {'a': [1, 'x'], 'b': None})
+        self.assertEqual(self.spans(doc), [
+            ('object', {'a': [1, 'x'], 'b': None}, (0, 23, 1, 1, 2, 10)),
+            ('key', 'a', (1, 2, 1, 2, 1, 3)),
+            ('array', [1, 'x'], (4, 12, 1, 5, 1, 13)),
+            ('number', 1, (5, 6, 1, 6, 1, 7)),
+            ('string', 'x', (8, 11, 1, 9, 1, 12)),
+            ('key', 'b', (15, 16, 2, 2, 2, 3)),
+            ('null', None, (18, 22, 2, 5, 2, 9)),
+        ])
+        key = doc.root.children[2]
+        self.assertEqual(doc.span(key), (15, 16, 2, 2, 2, 3))
+
+    def test_node_at(self):
+        doc = json5.spans.parse(u' [1, [true]] ')
+        self.assertEqual(doc.node_at(6)[0].value, True)
+        self.assertEqual(doc.node_at(5)[0].value, [True])
+        self.assertEqual(doc.node_at(3)[0].value, [1, [True]])
+        self.assertEqual(doc.node_at(0), (None, None))
+
+    def test_errors(self):
+        for s in ('', '[1,,]', '{a 1}', '[1] x', '"abc'):
+            with self.assertRaises(ValueError) as cm:
+                json5.loads(s)
+            with self.assertRaises(ValueError) as spans_cm:
+                json5.spans.parse(s)
+            self.assertEqual(str(cm.exception), str(spans_cm.exception))
+
+    def test_reparse_token(self):
+        doc = json5.spans.parse(u'{a: "abc", b: [1, 2]}')
+        new = self.check_reparse(doc, 6, 7, 'X')
+        self.assertEqual(new.value, {'a': 'aXc', 'b': [1, 2]})
+        # The nodes after the edit are moved; the ones before are shared.
+        self.assertIs(new.root.children[0], doc.root.children[0])
+        self.assertIs(new.root.children[3].children[0],
+                      doc.root.children[3].children[0])
+
+    def test_reparse_members(self):
+        doc = json5.spans.parse(u'[1, 2, /* c */ 3, {x: 4}]')
+        new = self.check_reparse(doc, 4, 4, '1.5, ')
+        self.assertEqual(new.value, [1, 1.5, 2, 3, {'x': 4}])
+        self.assertIs(new.root.children[0], doc.root.children[0])
+        new = self.check_reparse(new, 3, 11, '')
+        self.assertEqual(new.value, [1, 3, {'x': 4}])
+        self.check_reparse(new, 1, 2, '"a", 0')
+        self.check_reparse(new, 16, 16, 'y: 5, ')
+
+    def test_reparse_widens(self):
+        doc = json5.spans.parse(u'{a: [1, "b"], c: 2}')
+        # The edit changes where the string and then the array end.
+        self.check_reparse(doc, 9, 10, 'b", "')
+        self.check_reparse(doc, 8, 11, '"x", 3], d: [4')
+        self.check_reparse(doc, 0, 1, '{z: 0, ')
+
+    def test_reparse_errors(self):
+        doc = json5.spans.parse(u'[1, {a: 2}]')
+        with self.assertRaises(json5.JSON5DecodeError) as cm:
+            json5.spans.reparse(doc, 5, 6, '1')
+        self.assertEqual(str(cm.exception),
+                         '<string>:1 Unexpected "1" at column 6')
+
+
+class TestIterload(unittest.TestCase):
+    maxDiff = None
+
+    def iterload(self, s, chunk_size=1, **kwargs):
+        if isinstance(s, bytes):
+            fp = io.BytesIO(s)
+        else:
+            fp = io.StringIO(s)
+        return list(json5.iterload(fp, chunk_size=chunk_size, **kwargs))
+
+    def check_fail(self, s, err):
+        for chunk_size in (1, 3, 100):
+            try:
+                self.iterload(s, chunk_size)
+                self.fail()  # pragma: no cover
+            except ValueError as e:
+                self.assertEqual(err, str(e))
+
+    def test_sample_file(self):
+        path = os.path.join(os.path.dirname(__file__), '..', '..',
+                            'sample.json5')
+        with open(path) as fp:
+            s = fp.read()
+        for chunk_size in (1, 2, 7, 4096):
+            self.assertEqual(self.iterload(s, chunk_size), [json5.loads(s)])
+
+    def test_top_level_array_elements(self):
+        self.assertEqual(
+            self.iterload(u'// c\r\n[1, {a: [2,]}, "x", /* y */ 3,]'),
+            [1, {'a': [2]}, 'x', 3])
+        self.assertEqual(self.iterload('[]'), [])
+        self.assertEqual(self.iterload('[[]]'), [[]])
+
+    def test_elements_are_yielded_incrementally(self):
+        fp = io.StringIO(u'[{a: 1}, {b: 2}, {c: 3}]')
+        it = json5.iterload(fp, chunk_size=9)
+        self.assertEqual(next(it), {'a': 1})
+        self.assertLess(fp.tell(), 20)
+
+    def test_scalars(self):
+        self.assertEqual(self.iterload('0x1F'), [31])
+        self.assertEqual(self.iterload("'a\\\r\nb'"), ['ab'])
+        self.assertEqual(self.iterload('null'), [None])
+
+    def test_bytes(self):
+        self.assertEqual(self.iterload(u'["\xf6\u20ac"]'.encode('utf-8')),
+                         [u'\xf6\u20ac'])
+        self.assertEqual(
+            self.iterload(u'["\xf6"]'.encode('iso-8859-1'),
+                          encoding='iso-8859-1'),
+            [u'\xf6'])
+
+    def test_deep_nesting(self):
+        depth = 100000
+        [obj] = self.iterload('{a:' * depth + '1' + '}' * depth, 4096)
+        for _ in range(depth):
+            obj = obj['a']
+        self.assertEqual(obj, 1)
+
+    def test_hooks(self):
+        self.assertEqual(
+            self.iterload('[{a: 1.5, b: {}}]', object_pairs_hook=list,
+                          parse_float=lambda x: x),
+            [[('a', '1.5'), ('b', [])]])
+        self.assertEqual(
+            self.iterload('{a: 1}', object_hook=lambda d: [d]), [[{'a': 1}]])
+
+    def test_syntax_errors(self):
+        self.check_fail('', 'Empty strings are not legal JSON5')
+        self.check_fail('[1 2]', '<stream>:1 Unexpected "2" at column 4')
+        self.check_fail('14d', '<stream>:1 Unexpected "d" at column 3')
+        self.check_fail('[1,,]', '<stream>:1 Unexpected "," at column 4')
+        self.check_fail('{a:1,}x', '<stream>:1 Unexpected "x" at column 7')
+        self.check_fail('{"a"}', '<stream>:1 Unexpected "}" at column 5')
+        self.check_fail('\n\n  [1\n  2]',
+                        '<stream>:4 Unexpected "2" at column 3')
+        self.check_fail('[1, /* x',
+                        '<stream>:1 Unexpected end of input at column 9')
+        self.check_fail('"abc',
+                        '<stream>:1 Unexpected end of input at column 5')
+
+    def test_error_details(self):
+        fp = io.StringIO(u'[1,\n 2 3]')
+        try:
+            list(json5.iterload(fp, chunk_size=2))
+            self.fail()  # pragma: no cover
+        except json5.JSON5DecodeError as e:
+            self.assertEqual((e.pos, e.lineno, e.colno), (7, 2, 4))
+            self.assertEqual(e.expected, (',', ']'))
+
+
 class TestDump(unittest.TestCase):
     def test_basic(self):
         sio = io.StringIO()
         json5.dump(True, sio)
         self.assertEqual('true', sio.getvalue())
 
+    def test_compact_writes_in_pieces(self):
+        class Writer(object):
+            def __init__(self):
+                self.writes = []
+
+            def write(self, s):
+                self.writes.append(s)
+
+        obj = [{'a': [i, 'x']} for i in range(1000)]
+        w = Writer()
+        json5.dump(obj, w, compact=True)
+        self.assertGreater(len(w.writes), 1)
+        self.assertEqual(''.join(w.writes), json5.dumps(obj, compact=True))
+        self.assertEqual(json5.loads(''.join(w.writes)), obj)
+
 
 class TestDumps(unittest.TestCase):
     maxDiff = None
@@ -231,6 +748,8 @@ class TestDumps(unittest.TestCase):
 
     def test_numbers(self):
         self.check(15, '15')
+        self.check(1, '1')
+        self.check(0.0, '0.0')
 
     def test_null(self):
         self.check(None, 'null')
@@ -239,6 +758,67 @@ class TestDumps(unittest.TestCase):
         self.check({'foo': 1}, '{foo:1}')
         self.check({'foo bar': 1}, '{"foo bar":1}')
 
+    def test_deep_nesting(self):
+        obj = []
+        for _ in range(100000):
+            obj = [obj]
+        s = json5.dumps(obj, compact=True)
+        self.assertEqual(s, '[' * 100000 + '[]' + ']' * 100000)
+
+    def test_circular_reference(self):
+        obj = [1]
+        obj.append({'a': obj})
+        self.assertRaises(ValueError, json5.dumps, obj, compact=True)
+
+    def test_indent(self):
+        obj = {'b': [1, {}], 'a': []}
+        self.assertEqual(
+            json5.dumps(obj, compact=True, indent=2, sort_keys=True),
+            '{\n  a: [],\n  b: [\n    1,\n    {}\n  ]\n}')
+        self.assertEqual(json5.dumps([1], compact=True, indent='\t'),
+                         '[\n\t1\n]')
+
+    def test_keys(self):
+        self.check({'1a': 1}, '{"1a":1}')
+        self.check({'': 1}, '{"":1}')
+        self.check({1: 1, None: 2}, '{"1":1,null:2}')
+        self.check({'$a_1': 1}, '{$a_1:1}')
+        self.assertRaises(TypeError, json5.dumps, {(1,): 1}, compact=True)
+
+    def test_non_ascii_keys(self):
+        self.check({u'\u00e9t\u00e9': 1}, u'{\u00e9t\u00e9:1}')
+        self.check({u'\u00b2': 1}, u'{"\u00b2":1}')
+        self.check({u'\u0660a': 1}, u'{"\u0660a":1}')
+        self.check({u'a\u0660': 1}, u'{a\u0660:1}')
+        for key in (u'\u00b2', u'\u0660a', u'a\u0660', u'\u00bd', u'a\u00b2',
+                    u'\u2160', u'b\u0301', u'a\u200c', u'\u200ca',
+                    u'\u4e2d\u6587', u'\U0001d400', u'\U0001f600', u'\u00e9-'):
+            obj = {key: 1}
+            for backend in ('scanner', 'peg'):
+                self.assertEqual(
+                    json5.loads(json5.dumps(obj, compact=True),
+                                backend=backend), obj)
+
+    def test_quote(self):
+        obj = {'a b': "it's"}
+        self.assertEqual(json5.dumps(obj, compact=True, quote='"'),
+                         '{"a b":"it\'s"}')
+        self.assertEqual(json5.dumps(obj, compact=True, quote="'"),
+                         "{'a b':'it\\'s'}")
+        self.assertRaises(ValueError, json5.dumps, obj, compact=True,
+                          quote='`')
+
+    def test_roundtrip(self):
+        obj = [u'a\\b\n\t\x00\u2028"\'', 1.5, -2, True, None,
+               {'x y': {'z': []}}]
+        self.assertEqual(json5.loads(json5.dumps(obj, compact=True)), obj)
+        s = json5.dumps([float('inf'), float('-inf'), float('nan')],
+                        compact=True)
+        self.assertEqual(s, '[Infinity,-Infinity,NaN]')
+
+    def test_unserializable(self):
+        self.assertRaises(TypeError, json5.dumps, set(), compact=True)
+
     def test_strings(self):
         self.check("'single'", '"\'single\'"')
         self.check('"double"', "'\"double\"'")
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import sys
 import unittest
 
@@ -33,7 +34,7 @@ class CheckMixin(object):
             host.write_text_file(path, contents)
 
     def check_cmd(self, args, stdin=None, files=None,
-                  returncode=None, out=None, err=None):
+                  returncode=None, out=None, err=None, expected_files=None):
         host = self._host()
         orig_wd, tmpdir = None, None
         try:
@@ -44,6 +45,8 @@ class CheckMixin(object):
                 self._write_files(host, files)
             rv = self._call(host, args, stdin, returncode, out, err)
             actual_ret, actual_out, actual_err = rv
+            for path, contents in (expected_files or {}).items():
+                self.assertEqual(host.read_text_file(path), contents)
         finally:
             if tmpdir:
               host.rmtree(tmpdir)
@@ -77,6 +80,84 @@ class UnitTestMixin(object):
 class ToolTest(UnitTestMixin, CheckMixin, unittest.TestCase):
     maxDiff = None
 
+    def check_batch(self, args, files, returncode, results):
+        _, out, _ = self.check_cmd(['--batch', '-j', '1'] + args,
+                                   files=files, returncode=returncode)
+        actual = [json.loads(l) for l in out.splitlines()]
+        for r in actual:
+            self.assertGreaterEqual(r.pop('seconds'), 0)
+        self.assertEqual(actual, results)
+
+    def test_batch(self):
+        files = {
+            'a.json5': '{a: 1}',
+            'b.json5': '[1,\n 2 3]',
+            'c.json5': '',
+        }
+        self.check_batch(['a.json5', 'b.json5', 'c.json5'], files, 1, [
+            {'path': 'a.json5', 'ok': True},
+            {'path': 'b.json5', 'ok': False, 'lineno': 2, 'colno': 4,
+             'error': 'b.json5:2 Unexpected "3" at column 4'},
+            {'path': 'c.json5', 'ok': False,
+             'error': 'c.json5: Empty strings are not legal JSON5'},
+        ])
+
+    def test_batch_reformat(self):
+        files = {
+            'a.json5': '{"a": [1, 2,],}',
+            'b.json5': '{a:[1,2]}\n',
+        }
+        # Without --in-place, the files are only checked.
+        self.check_batch(['--reformat', 'a.json5', 'b.json5'], files, 0, [
+            {'path': 'a.json5', 'ok': True, 'reformatted': True},
+            {'path': 'b.json5', 'ok': True, 'reformatted': False},
+        ])
+        self.check_cmd(['--batch', '-j', '1', '--reformat', 'a.json5'],
+                       files=files, returncode=0,
+                       expected_files={'a.json5': '{"a": [1, 2,],}'})
+
+        self.check_cmd(['--batch', '-j', '1', '--reformat', '--in-place',
+                        'a.json5', 'b.json5'], files=files, returncode=0,
+                       expected_files={'a.json5': '{a:[1,2]}\n',
+                                       'b.json5': '{a:[1,2]}\n'})
+        self.check_cmd(['--batch', '-j', '1', '--reformat', '--in-place',
+                        '--json', 'a.json5'], files=files, returncode=0,
+                       expected_files={'a.json5': '{"a": [1, 2]}\n'})
+
+    def test_batch_reformat_keeps_comments(self):
+        files = {
+            'a.json5': '// keep me\n{a: 1, // c\n b: [1,2]}',
+            'b.json5': "{a: '// not a comment', b: \"/* nor this */\"}",
+        }
+        self.check_batch(['--reformat', '--in-place', 'a.json5', 'b.json5'],
+                         files, 1, [
+            {'path': 'a.json5', 'ok': False, 'reformatted': True,
+             'error': 'a.json5: not rewritten, since reformatting would '
+                      'remove its comments'},
+            {'path': 'b.json5', 'ok': True, 'reformatted': True},
+        ])
+        self.check_cmd(['--batch', '-j', '1', '--reformat', '--in-place',
+                        'a.json5', 'b.json5'], files=files, returncode=1,
+                       expected_files={
+                           'a.json5': files['a.json5'],
+                           'b.json5': "{a:'// not a comment',"
+                                      "b:'/* nor this */'}\n",
+                       })
+
+    def test_batch_in_place_needs_reformat(self):
+        self.check_cmd(['--batch', '--in-place', 'a.json5'], returncode=2,
+                       err='json5: error: --in-place needs --reformat\n')
+
+    def test_batch_jobs_must_be_positive(self):
+        for jobs in ('0', '-2', 'x'):
+            self.check_cmd(['--batch', '-j', jobs, 'a.json5'], returncode=2,
+                           err='json5: error: argument -j/--jobs: must be a '
+                               'positive integer, not %r\n\n' % jobs)
+
+    def test_batch_needs_files(self):
+        self.check_cmd(['--batch'], returncode=2,
+                       err='json5: error: --batch needs a list of files\n')
+
     def test_help(self):
         self.check_cmd(['--help'], returncode=0)
 
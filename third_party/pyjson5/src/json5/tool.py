@@ -19,17 +19,43 @@ Usage::
     $ echo '{foo:"bar"}' | python -m json5.tool
     { foo: "bar" }
     $
+
+With --batch, each file is parsed on its own (in parallel, with -j), and a
+JSON object describing the result is printed on its own line for each::
+
+    $ python -m json5.tool --batch a.json5 b.json5
+    {"ok": true, "path": "a.json5", "seconds": 0.0012}
+    {"colno": 5, "error": "b.json5:2 Unexpected end of input at column 5", "lineno": 2, "ok": false, "path": "b.json5", "seconds": 0.0003}
+    $
+
+With --batch --reformat, the result of each file that parses also says
+whether reformatting would change it. Only with --in-place as well are the
+files rewritten with their reformatted contents, and even then, a file with
+comments is reported as an error rather than rewritten, since the output
+doesn't keep them.
 """
 
-import os
+import argparse
+import json
+import re
 import sys
+import time
 
 from . import arg_parser
 from . import lib
+from .errors import JSON5DecodeError
 from .host import Host
 from .version import VERSION
 
 
+_timer = getattr(time, 'perf_counter', time.time)
+
+# In a document that parses, any '//' or '/*' outside of a string starts a
+# comment.
+_STRING_OR_COMMENT = re.compile(
+    r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|(/[/*])', re.S)
+
+
 def main(argv=None, host=None):
     host = host or Host()
 
@@ -39,6 +65,19 @@ def main(argv=None, host=None):
     parser.add_argument('--json', dest='as_json', action='store_const',
                         const=True, default=False,
                         help='output as json')
+    parser.add_argument('--batch', action='store_true',
+                        help='parse each file separately and print one line '
+                             'of JSON with the result for each')
+    parser.add_argument('--reformat', action='store_true',
+                        help='with --batch, report whether reformatting '
+                             'would change each file')
+    parser.add_argument('--in-place', action='store_true',
+                        help='with --batch --reformat, rewrite each file '
+                             'with its reformatted contents (files with '
+                             'comments are not rewritten)')
+    parser.add_argument('-j', '--jobs', type=_positive_int, default=None,
+                        help='with --batch, the number of files to parse '
+                             'in parallel (default: the number of CPUs)')
     parser.add_argument('files', nargs='*', default=[],
                         help=parser.SUPPRESS)
     args = parser.parse_args(argv)
@@ -50,6 +89,9 @@ def main(argv=None, host=None):
         host.print_(VERSION)
         return 0
 
+    if args.batch:
+        return _batch(host, args)
+
     if args.cmd:
         inp = args.cmd
     else:
@@ -59,5 +101,92 @@ def main(argv=None, host=None):
     return 0
 
 
+def _positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            'must be a positive integer, not %r' % value)
+    return number
+
+
+def _batch(host, args):
+    if args.cmd or not args.files:
+        host.print_('json5: error: --batch needs a list of files',
+                    stream=host.stderr)
+        return 2
+    if args.in_place and not args.reformat:
+        host.print_('json5: error: --in-place needs --reformat',
+                    stream=host.stderr)
+        return 2
+
+    # multiprocessing is slow to import, and only needed for --batch.
+    import multiprocessing
+
+    jobs = args.jobs or multiprocessing.cpu_count()
+    work = [(path, args.as_json, args.reformat, args.in_place)
+            for path in args.files]
+    if jobs == 1 or len(work) == 1:
+        results = (_check_file(host, *w) for w in work)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(jobs, len(work)))
+        results = pool.imap(_check_file_in_worker, work)
+
+    status = 0
+    try:
+        for result in results:
+            if not result['ok']:
+                status = 1
+            host.print_(json.dumps(result, sort_keys=True))
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    return status
+
+
+def _check_file_in_worker(work):
+    return _check_file(Host(), *work)
+
+
+def _check_file(host, path, as_json, reformat, in_place):
+    start = _timer()
+    result = {'path': path, 'ok': True}
+    try:
+        contents = host.read_text_file(path)
+        obj = lib.loads(contents)
+        if reformat:
+            output = lib.dumps(obj, compact=True, as_json=as_json) + '\n'
+            result['reformatted'] = output != contents
+            if result['reformatted'] and in_place:
+                if _has_comments(contents):
+                    result['ok'] = False
+                    result['error'] = ('%s: not rewritten, since reformatting '
+                                       'would remove its comments' % path)
+                else:
+                    host.write_text_file(path, output)
+    except JSON5DecodeError as e:
+        result['ok'] = False
+        result['error'] = '%s:%d %s at column %d' % (path, e.lineno, e.msg,
+                                                     e.colno)
+        result['lineno'] = e.lineno
+        result['colno'] = e.colno
+    except (IOError, OSError, ValueError) as e:
+        result['ok'] = False
+        result['error'] = '%s: %s' % (path, e)
+    result['seconds'] = round(_timer() - start, 6)
+    return result
+
+
+def _has_comments(contents):
+    for m in _STRING_OR_COMMENT.finditer(contents):
+        if m.group(1):
+            return True
+    return False
+
+
 if __name__ == '__main__':  # pragma: no cover
     sys.exit(main())